@@ -1,7 +1,7 @@
-from transformers import pipeline
 import logging
 import sys
 import re
+from inference_backends import build_zero_shot_pipeline
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', 
@@ -44,11 +44,14 @@ DEPARTMENT_MAPPING = {
     "training": "Training"
 }
 
-def load_classifier(model_name="facebook/bart-large-mnli"):
-    """Load the zero-shot classification model."""
+def load_classifier(model_name="facebook/bart-large-mnli", backend=None):
+    """Load the zero-shot classification model.
+    
+    `backend` is one of inference_backends.BACKENDS and defaults to CLASSIFIER_BACKEND.
+    """
     try:
         print("Loading classifier model...")
-        return pipeline("zero-shot-classification", model=model_name)
+        return build_zero_shot_pipeline(model_name, backend=backend)
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         raise
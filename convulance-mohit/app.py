@@ -1,34 +1,69 @@
-from fastapi import FastAPI, HTTPException, Query, Depends
-from pydantic import BaseModel, Field
-from typing import Optional
-import uvicorn
-import logging
 import os
+import time
+
+# Start of the startup profile, taken before the heavy imports below
+IMPORT_STARTED = time.perf_counter()
+# transformers would otherwise also import TensorFlow when it is installed, for nothing
+os.environ.setdefault("USE_TF", "0")
+
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional
+import anyio
+import asyncio
+import json
+import logging
 import warnings
-import tensorflow as tf
 import main_model
-from main_model import is_corporate_related, process_user_query, load_classifier
+from main_model import is_corporate_related_batch, process_user_query, process_user_queries, load_classifier
+from batching import BoundedExecutor, MicroBatcher, QueueFullError
+from authorization_audit import AUDIT_FORMATS, MEDIA_TYPES, iter_audit, stream_audit
+from inference_backends import import_backend
+from inference_workers import INFERENCE_WORKERS, TORCH_THREADS_PER_WORKER, InferenceWorkerPool
 
 # Suppress warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='torch.utils._pytree')
 warnings.filterwarnings('ignore', category=DeprecationWarning)
 
-# Suppress TensorFlow messages
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 0=all, 1=INFO, 2=WARNING, 3=ERROR
-tf.get_logger().setLevel('ERROR')
-
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app with metadata for documentation
-app = FastAPI(
-    title="Employee Query Classifier",
-    description="API to determine if a query is appropriate for the employee dataset",
-    version="1.0.0",
-    docs_url="/",  # This will show the documentation on the home page
-    redoc_url="/redoc"  # Alternative documentation at /redoc
-)
+# Micro-batching of concurrent classification requests
+ENABLE_BATCHING = os.getenv("ENABLE_BATCHING", "True").lower() == "true"
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "16"))
+batcher = None
+
+# Bounded inference queue: requests arriving while it is full are rejected with 503 and Retry-After
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "64"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+inference_executor = None
+
+# Batch user query endpoint: items per request, pairs classified per streamed chunk, and how long a
+# chunk waits for room in the inference queue before its items are answered with errors
+MAX_USER_QUERY_BATCH = int(os.getenv("MAX_USER_QUERY_BATCH", "10000"))
+USER_QUERY_BATCH_CHUNK = int(os.getenv("USER_QUERY_BATCH_CHUNK", "32"))
+BATCH_QUEUE_WAIT_SECONDS = float(os.getenv("BATCH_QUEUE_WAIT_SECONDS", "30"))
+
+# Default time budget of a user query in milliseconds, e.g. 300 for the chat UI (unset: no deadline);
+# requests over budget skip the topic pass or classify with the keyword rules only
+REQUEST_BUDGET_MS = float(os.environ["REQUEST_BUDGET_MS"]) if os.getenv("REQUEST_BUDGET_MS") else None
+
+# Forked inference workers sharing the model weights (INFERENCE_WORKERS=0 keeps inference in this process)
+worker_pool = None
+
+# FAST_START answers liveness at once and loads the model in the background; otherwise the server
+# only starts listening once it is ready. Either way the first WARMUP_QUERIES example queries go
+# through the model (and each inference worker) before /api/health/ready reports ready.
+FAST_START = os.getenv("FAST_START", "False").lower() == "true"
+WARMUP_QUERIES = int(os.getenv("WARMUP_QUERIES", "8"))
+# Startup phase, seconds spent in each, and the error that stopped it if any
+startup_state = {"phase": "starting", "ready": False, "error": None, "profile": {}}
 
 # Input and Response Models
 class QueryRequest(BaseModel):
@@ -37,18 +72,25 @@ class QueryRequest(BaseModel):
 class UserQueryRequest(BaseModel):
     user_id: int
     query: str
+    budget_ms: Optional[float] = Field(None, gt=0, description="Time budget for the response, defaults to REQUEST_BUDGET_MS")
 
 class QueryResponse(BaseModel):
     query: str
     is_appropriate: bool
     label: str
     confidence: float
+    # The query was over MAX_QUERY_TOKENS and classified from a shortened version
+    truncated: bool = False
 
 class UserQueryResponse(BaseModel):
     query: str
-    is_appropriate: bool
-    label: str
-    confidence: float
+    # None when the query was not classified (errors)
+    is_appropriate: Optional[bool] = None
+    label: Optional[str] = None
+    confidence: Optional[float] = None
+    truncated: Optional[bool] = None
+    # How much of the classifier ran within the time budget: full, domain_only or keywords_only
+    degraded_mode: Optional[str] = None
     user_id: int
     user_dept: Optional[str] = None
     user_name: Optional[str] = None
@@ -57,68 +99,352 @@ class UserQueryResponse(BaseModel):
     requested_dept: Optional[str] = None
     is_authorized: Optional[bool] = None
     auth_reason: Optional[str] = None
+    stages: List[str] = []
 
-# Startup Event
-@app.on_event("startup")
-async def startup_event():
+@contextmanager
+def startup_phase(name):
+    """Time a startup phase into startup_state["profile"]."""
+    startup_state["phase"] = name
+    started = time.perf_counter()
     try:
-        logger.info("Loading classification model...")
-        # Load the classifier and set it in the main_model module
-        main_model.classifier = load_classifier()
-        logger.info("Classification model loaded successfully")
+        yield
+    finally:
+        startup_state["profile"][name] = round(time.perf_counter() - started, 3)
+
+def timed_load(name, load):
+    """Run a loading function, recording its duration in the startup profile."""
+    started = time.perf_counter()
+    result = load()
+    startup_state["profile"][name] = round(time.perf_counter() - started, 3)
+    return result
+
+def load_model():
+    timed_load("model_imports", import_backend)
+    return timed_load("model", load_classifier)
+
+async def start_service():
+    """Load the model and the user directory, start inference, warm up and mark the service ready."""
+    global batcher, worker_pool, inference_executor
+    startup_state["profile"]["import"] = round(time.perf_counter() - IMPORT_STARTED, 3)
+    try:
+        with startup_phase("load"):
+            logger.info("Loading classification model...")
+            # Independent of each other, so the user data loads while the model does
+            main_model.classifier, _, _ = await asyncio.gather(
+                asyncio.to_thread(load_model),
+                asyncio.to_thread(timed_load, "user_directory", main_model.get_user_directory),
+                asyncio.to_thread(main_model.get_decision_log)
+            )
+            logger.info("Classification model loaded successfully")
+            if main_model.CLASSIFICATION_MODE == "embedding":
+                # Embed the label hypotheses now rather than on the first request
+                await asyncio.to_thread(main_model.get_label_embedding_classifier)
+        
+        if INFERENCE_WORKERS > 0:
+            with startup_phase("workers"):
+                worker_pool = InferenceWorkerPool(
+                    INFERENCE_WORKERS, torch_threads=TORCH_THREADS_PER_WORKER, warmup_queries=WARMUP_QUERIES
+                )
+                await asyncio.to_thread(worker_pool.start)
+        
+        # Only after forking the workers: a process whose thread pools already ran should not fork.
+        # With workers, every model pass runs in them and they warm up themselves.
+        if WARMUP_QUERIES > 0 and worker_pool is None:
+            with startup_phase("warmup"):
+                await asyncio.to_thread(main_model.warm_up_classifier, main_model.classifier, WARMUP_QUERIES)
     except Exception as e:
         logger.error(f"Failed to load classification model: {e}")
-        raise HTTPException(status_code=500, detail="Failed to load classification model")
+        startup_state["phase"] = "failed"
+        startup_state["error"] = str(e)
+        raise
+    
+    # Inference runs on dedicated threads, one per worker process, so the event loop stays free
+    inference_executor = BoundedExecutor(max_workers=max(1, INFERENCE_WORKERS), max_queue_depth=MAX_QUEUE_DEPTH)
+    
+    if ENABLE_BATCHING:
+        batcher = MicroBatcher(
+            classify_batch,
+            window_ms=BATCH_WINDOW_MS,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_concurrent_batches=inference_executor.max_workers,
+            max_queue_depth=MAX_QUEUE_DEPTH,
+            executor=inference_executor
+        )
+        await batcher.start()
+    
+    main_model.queue_wait_estimator = estimate_queue_wait
+    startup_state["profile"]["ready"] = round(time.perf_counter() - IMPORT_STARTED, 3)
+    startup_state["phase"] = "ready"
+    startup_state["ready"] = True
+    logger.info(f"Service ready, startup profile (seconds): {startup_state['profile']}")
+
+async def stop_service():
+    global batcher, worker_pool, inference_executor
+    startup_state["ready"] = False
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+    if inference_executor is not None:
+        inference_executor.shutdown()
+        inference_executor = None
+    if worker_pool is not None:
+        worker_pool.stop()
+        worker_pool = None
+    main_model.queue_wait_estimator = None
+    if main_model.decision_log is not None:
+        # Write the decisions still queued before the process exits
+        main_model.decision_log.close()
+        main_model.decision_log = None
+
+@asynccontextmanager
+async def lifespan(app):
+    startup = None
+    if FAST_START:
+        # Failures are kept in startup_state and fail the liveness probe
+        startup = asyncio.create_task(start_service())
+        startup.add_done_callback(lambda task: task.cancelled() or task.exception())
+    else:
+        await start_service()
+    try:
+        yield
+    finally:
+        if startup is not None and not startup.done():
+            startup.cancel()
+        await stop_service()
+
+def require_ready():
+    """Dependency of the query endpoints: 503 with Retry-After until startup has finished."""
+    if not startup_state["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service is starting ({startup_state['phase']})",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+# Initialize FastAPI app with metadata for documentation
+app = FastAPI(
+    title="Employee Query Classifier",
+    description="API to determine if a query is appropriate for the employee dataset",
+    version="1.0.0",
+    docs_url="/",  # This will show the documentation on the home page
+    redoc_url="/redoc",  # Alternative documentation at /redoc
+    lifespan=lifespan
+)
+
+def classify_batch(queries):
+    """Classify a list of queries, sending the NLI passes to the inference workers when they are enabled."""
+    if worker_pool is None:
+        return is_corporate_related_batch(queries, main_model.classifier)
+    return is_corporate_related_batch(queries, main_model.classifier, classify_nli=worker_pool.classify_batch)
+
+async def classify(query):
+    """Classify a query off the event loop, through the micro-batcher when it is enabled.
+    
+    Raises HTTPException 503 with a Retry-After header when the inference queue is full.
+    """
+    try:
+        if batcher is not None:
+            return await batcher.submit(query)
+        results = await inference_executor.run(classify_batch, [query])
+        return results[0]
+    except QueueFullError as e:
+        logger.warning(f"Rejecting query, {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+def classify_degraded_query(query, degraded_mode):
+    """main_model.classify_degraded, with the domain pass in an inference worker when they are enabled."""
+    classify_domain = worker_pool.domain_pass if worker_pool is not None else None
+    return main_model.classify_degraded(query, main_model.classifier, degraded_mode, classify_domain=classify_domain)
+
+async def classify_degraded(query, degraded_mode):
+    """Classify a query in a degraded mode off the event loop.
+    
+    The domain pass is bounded by the inference queue like full
+    classifications; when the queue is full the query falls back to
+    keywords_only, which runs no model, instead of being shed.
+    
+    Returns:
+        tuple: (classification, the DEGRADED_MODES entry actually used)
+    """
+    if degraded_mode == "domain_only":
+        try:
+            return await inference_executor.run(classify_degraded_query, query, degraded_mode)
+        except QueueFullError as e:
+            logger.warning(f"Falling back to keywords_only, {e}")
+            degraded_mode = "keywords_only"
+    return await run_in_threadpool(classify_degraded_query, query, degraded_mode)
+
+def estimate_queue_wait():
+    """Seconds a new classification is expected to wait for an inference thread, from the work queued ahead of it."""
+    batch_seconds = main_model.pass_latency.estimate("full")
+    batches_ahead = inference_executor.queue_depth() if inference_executor is not None else 0
+    wait = 0.0
+    if batcher is not None:
+        batches_ahead += batcher.queue_depth() / batcher.max_batch_size
+        wait += batcher.window_ms / 1000
+    workers = inference_executor.max_workers if inference_executor is not None else 1
+    return wait + batches_ahead * batch_seconds / workers
+
+def request_deadline(budget_ms=None):
+    """time.monotonic() deadline for a request arriving now, from its budget or REQUEST_BUDGET_MS (None for none)."""
+    budget_ms = budget_ms if budget_ms is not None else REQUEST_BUDGET_MS
+    return None if budget_ms is None else time.monotonic() + budget_ms / 1000
+
+async def run_user_query(user_id, query, deadline=None):
+    """Run process_user_query off the event loop in the configured PIPELINE_ORDER.
+    
+    With auth_first the query is only classified if the cheap stages leave its
+    status open; errors from that classification (e.g. 503 when the
+    inference queue is full) are raised here rather than turned into a result.
+    With a deadline, a classification not expected to finish in time runs
+    degraded (see main_model.select_degraded_mode and classify_degraded).
+    """
+    if main_model.PIPELINE_ORDER != "auth_first":
+        degraded_mode = main_model.select_degraded_mode(deadline)
+        if degraded_mode == "full":
+            classification = await classify(query)
+        else:
+            classification, degraded_mode = await classify_degraded(query, degraded_mode)
+        return await run_in_threadpool(
+            process_user_query, user_id, query, classification=classification, deadline=deadline,
+            degraded_mode=degraded_mode
+        )
+    
+    errors = []
+    def classify_from_thread(query):
+        try:
+            return anyio.from_thread.run(classify, query)
+        except HTTPException as e:
+            errors.append(e)
+            raise
+    
+    def classify_degraded_from_thread(query, degraded_mode):
+        return anyio.from_thread.run(classify_degraded, query, degraded_mode)
+    
+    result = await run_in_threadpool(
+        process_user_query, user_id, query, classify=classify_from_thread, deadline=deadline,
+        degraded_classify=classify_degraded_from_thread
+    )
+    if errors:
+        raise errors[0]
+    return result
+
+async def classify_chunk(queries, wait_until):
+    """Classify a chunk of a batch request, waiting for room in the inference queue until `wait_until`.
+    
+    Raises QueueFullError once the queue is still full at that time.monotonic() value.
+    """
+    while True:
+        try:
+            return await inference_executor.run(classify_batch, queries)
+        except QueueFullError:
+            if time.monotonic() + RETRY_AFTER_SECONDS > wait_until:
+                raise
+            await asyncio.sleep(RETRY_AFTER_SECONDS)
+
+def queue_full_result(user_id, query, error):
+    """Batch line for a request whose chunk could not get into the inference queue, like a 503 for it alone."""
+    return {
+        "status": "error",
+        "message": f"Service unavailable: {error}; retry after {RETRY_AFTER_SECONDS}s",
+        "query": query,
+        "is_appropriate": False,
+        "user_id": user_id,
+        "stages": []
+    }
+
+def parse_user_query_batch(body, content_type):
+    """Parse a JSON list or an NDJSON body into UserQueryRequest items, raising HTTPException 422 on bad items."""
+    try:
+        if "ndjson" in content_type or not body.lstrip().startswith(b"["):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON: {e}")
+    
+    if len(items) > MAX_USER_QUERY_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_USER_QUERY_BATCH} items per batch")
+    requests = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise TypeError("expected an object with user_id and query")
+            requests.append(UserQueryRequest(**item))
+        except (ValidationError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid item {index}: {e}")
+    return requests
+
+async def stream_user_query_batch(requests):
+    """Yield one NDJSON UserQueryResponse line per request, in request order, a chunk at a time.
+    
+    A chunk whose queries wait more than BATCH_QUEUE_WAIT_SECONDS for the
+    inference queue gets an error line per request instead.
+    """
+    for start in range(0, len(requests), USER_QUERY_BATCH_CHUNK):
+        chunk = [(item.user_id, item.query) for item in requests[start:start + USER_QUERY_BATCH_CHUNK]]
+        wait_until = time.monotonic() + BATCH_QUEUE_WAIT_SECONDS
+        
+        def classify_from_thread(queries):
+            return anyio.from_thread.run(classify_chunk, queries, wait_until)
+        
+        try:
+            results = await run_in_threadpool(process_user_queries, chunk, classify_from_thread, main_model.PIPELINE_ORDER)
+        except QueueFullError as e:
+            logger.warning(f"Batch chunk of {len(chunk)} requests shed after {BATCH_QUEUE_WAIT_SECONDS}s: {e}")
+            results = [queue_full_result(user_id, query, e) for user_id, query in chunk]
+        lines = []
+        for result in results:
+            if result.get("requested_dept") is None:
+                result["requested_dept"] = ""
+            lines.append(json.dumps(jsonable_encoder(UserQueryResponse(**result))) + "\n")
+        yield "".join(lines)
 
 # API Routes
-@app.post("/api/classify", response_model=QueryResponse, tags=["Classification"])
+@app.post("/api/classify", response_model=QueryResponse, tags=["Classification"], dependencies=[Depends(require_ready)])
 async def classify_query(request: QueryRequest):
-    if main_model.classifier is None:
-        raise HTTPException(status_code=503, detail="Model not loaded yet")
-    
     try:
         logger.info(f"Processing query: {request.query}")
-        is_related, predicted_label, confidence, _ = is_corporate_related(
-            request.query, 
-            main_model.classifier
-        )
+        result = await classify(request.query)
+        is_related, predicted_label, confidence, _ = result
         return {
             "query": request.query,
             "is_appropriate": is_related,
             "label": predicted_label,
-            "confidence": float(confidence)
+            "confidence": float(confidence),
+            "truncated": result.truncated
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/classify", response_model=QueryResponse, tags=["Classification"])
+@app.get("/api/classify", response_model=QueryResponse, tags=["Classification"], dependencies=[Depends(require_ready)])
 async def classify_query_get(query: str = Query(..., description="The query text to classify")):
-    if main_model.classifier is None:
-        raise HTTPException(status_code=503, detail="Model not loaded yet")
-    
     try:
         logger.info(f"Processing query: {query}")
-        is_related, predicted_label, confidence, _ = is_corporate_related(
-            query, 
-            main_model.classifier
-        )
+        result = await classify(query)
+        is_related, predicted_label, confidence, _ = result
         return {
             "query": query,
             "is_appropriate": is_related,
             "label": predicted_label,
-            "confidence": float(confidence)
+            "confidence": float(confidence),
+            "truncated": result.truncated
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/user-query", response_model=UserQueryResponse, tags=["User Queries"])
+@app.post("/api/user-query", response_model=UserQueryResponse, tags=["User Queries"], dependencies=[Depends(require_ready)])
 async def process_authenticated_query(request: UserQueryRequest):
     """Process a query with user authentication and authorization"""
     try:
         logger.info(f"Processing user query: User ID {request.user_id}, Query: {request.query}")
-        result = process_user_query(request.user_id, request.query)
+        result = await run_user_query(request.user_id, request.query, request_deadline(request.budget_ms))
         
         if result.get("status") == "error":
             # Return a 404 if user not found or other client errors
@@ -145,15 +471,16 @@ async def process_authenticated_query(request: UserQueryRequest):
         logger.error(f"Error processing user query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/user-query", response_model=UserQueryResponse, tags=["User Queries"])
+@app.get("/api/user-query", response_model=UserQueryResponse, tags=["User Queries"], dependencies=[Depends(require_ready)])
 async def process_authenticated_query_get(
     user_id: int = Query(..., description="The ID of the user making the query"),
-    query: str = Query(..., description="The query text to classify")
+    query: str = Query(..., description="The query text to classify"),
+    budget_ms: Optional[float] = Query(None, gt=0, description="Time budget for the response, defaults to REQUEST_BUDGET_MS")
 ):
     """Process a query with user authentication and authorization (GET method)"""
     try:
         logger.info(f"Processing user query (GET): User ID {user_id}, Query: {query}")
-        result = process_user_query(user_id, query)
+        result = await run_user_query(user_id, query, request_deadline(budget_ms))
         
         if result.get("status") == "error":
             # Return a 404 if user not found
@@ -180,14 +507,86 @@ async def process_authenticated_query_get(
         logger.error(f"Error processing user query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/user-query/batch", tags=["User Queries"], dependencies=[Depends(require_ready)])
+async def process_authenticated_query_batch(request: Request):
+    """Process a JSON list or an NDJSON body of user queries, streaming one UserQueryResponse per line as NDJSON
+    
+    Responses come back in request order. Unknown users get a line with status "error" rather than a 404.
+    """
+    requests = parse_user_query_batch(await request.body(), request.headers.get("content-type", ""))
+    logger.info(f"Processing batch of {len(requests)} user queries")
+    return StreamingResponse(stream_user_query_batch(requests), media_type="application/x-ndjson")
+
+@app.get("/api/health/live", tags=["Health"])
+async def liveness():
+    """Liveness probe: the process is serving, even while it is still starting. 503 once startup has failed."""
+    if startup_state["error"] is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup_state["error"]})
+    return {"status": "alive"}
+
+@app.get("/api/health/ready", tags=["Health"])
+async def readiness():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 until then"""
+    content = {
+        "status": "ready" if startup_state["ready"] else startup_state["phase"],
+        "startup_seconds": startup_state["profile"]
+    }
+    return JSONResponse(status_code=200 if startup_state["ready"] else 503, content=content)
+
 @app.get("/api/health", tags=["Health"])
 async def health_check():
+    cache = main_model.get_classification_cache()
     return {
         "status": "healthy",
-        "model_loaded": main_model.classifier is not None
+        "ready": startup_state["ready"],
+        "startup_seconds": startup_state["profile"],
+        "model_loaded": main_model.classifier is not None,
+        "batching": batcher.stats() if batcher is not None else None,
+        "inference_queue": inference_executor.stats() if inference_executor is not None else None,
+        "inference_workers": worker_pool.stats() if worker_pool is not None else None,
+        "cache": cache.stats() if cache is not None else None,
+        "semantic_cache": main_model.semantic_cache.stats() if main_model.semantic_cache is not None else None,
+        "cascade": main_model.cascade_tiers.stats() if main_model.CLASSIFICATION_MODE == "cascade" else None,
+        "decision_log": main_model.decision_log.stats() if main_model.decision_log is not None else None,
+        "degradation": {**main_model.degradation.stats(), "pass_ms": main_model.pass_latency.stats()}
     }
 
+@app.post("/api/admin/cache/clear", tags=["Admin"])
+async def clear_classification_cache():
+    """Clear the classification result caches, e.g. after the label sets change"""
+    if main_model.semantic_cache is not None:
+        main_model.semantic_cache.clear()
+    cache = main_model.get_classification_cache()
+    if cache is None:
+        return {"cleared": False, "entries_removed": 0}
+    return {"cleared": True, "entries_removed": cache.clear()}
+
+@app.get("/api/admin/authorization-audit", tags=["Admin"])
+async def authorization_audit(
+    departments: Optional[List[str]] = Query(None, description="Requested departments (default: all departments)"),
+    authorized_only: bool = Query(False, description="Only return users who are authorized"),
+    format: str = Query("csv", description="Output format: csv or parquet")
+):
+    """Evaluate every user in the directory against the requested departments, streamed as CSV or Parquet"""
+    if format not in AUDIT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {AUDIT_FORMATS}")
+    policy = main_model.get_authorization_policy()
+    departments = departments or list(policy.departments)
+    unknown = [dept for dept in departments if dept not in policy.department_bits]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown departments: {unknown}")
+    
+    columns = await run_in_threadpool(main_model.get_user_directory().columns)
+    # A sync generator, so Starlette encodes each batch on a worker thread
+    return StreamingResponse(
+        stream_audit(iter_audit(policy, columns, departments, authorized_only=authorized_only), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="authorization_audit.{format}"'}
+    )
+
 if __name__ == "__main__":
+    import uvicorn
+    
     # Control auto-reload with an environment variable (default: disabled for production)
     debug_mode = os.getenv("DEBUG", "False").lower() == "true"
     uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=debug_mode)
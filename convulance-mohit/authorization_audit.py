@@ -0,0 +1,254 @@
+"""Bulk authorization audit: every user in the directory against a set of departments.
+
+Decisions are computed with NumPy masks over the whole directory, one
+requested department at a time, and streamed as CSV or Parquet:
+
+    python authorization_audit.py --departments "Human Resources" --authorized-only --output hr_access.csv
+    python authorization_audit.py --format parquet --output audit.parquet
+"""
+import argparse
+import io
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from authorization_policy import (
+    AUTHORIZED_DECISIONS, CROSS_DEPARTMENT, CROSS_DEPARTMENT_RESTRICTED, LOCALHOST, NEW_EMPLOYEE,
+    NO_AUTHORIZATION, OWN_DEPARTMENT, REASONS, SPECIAL_ROLE, SPECIAL_ROLE_RESTRICTED, VIOLATIONS, load_policy
+)
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FORMATS = ("csv", "parquet")
+MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+AUDIT_COLUMNS = ("user_id", "user_dept", "requested_dept", "authorized", "reason")
+
+# Users evaluated per output batch
+CHUNK_SIZE = 262144
+
+
+def _special_role_masks(policy, id_int):
+    """Special-role department bitmask of every user (0 for users without a role)."""
+    if not policy.special_roles:
+        return np.zeros(len(id_int), dtype=np.int64)
+    role_ids = np.array(sorted(policy.special_roles), dtype=np.int64)
+    role_masks = np.array([policy.special_roles[i] for i in role_ids], dtype=np.int64)
+    positions = np.minimum(np.searchsorted(role_ids, id_int), len(role_ids) - 1)
+    return np.where(role_ids[positions] == id_int, role_masks[positions], 0)
+
+
+def decision_codes(policy, users, requested_dept, current_month):
+    """Decision code (see authorization_policy) of every user for one requested department.
+
+    `users` holds the arrays from UserDirectory.columns() plus the derived
+    `dept_code`, `dept_vocabulary`, `localhost` and `role_mask` arrays
+    (see prepare_users). Users from the directory always come with employee
+    details, so every rule applies.
+    """
+    requested_bit = policy.department_bits.get(requested_dept, 0)
+    vocabulary = users["dept_vocabulary"]
+    requested_code = vocabulary.index(requested_dept) if requested_dept in vocabulary else -1
+
+    violations = users["past_violations"]
+    has_violations = violations > 0
+    join_month = users["join_month"]
+    new_employee = (join_month >= 0) & (current_month - join_month < policy.new_employee_months)
+    own = users["dept_code"] == requested_code
+    special = (users["role_mask"] & requested_bit) != 0
+    cross = (users["cross_mask"] & requested_bit) != 0
+
+    return np.select(
+        [
+            violations >= policy.max_violations,
+            has_violations & ~own & new_employee,
+            users["localhost"],
+            own,
+            special & has_violations & (violations >= policy.special_role_max_violations),
+            special,
+            cross & has_violations,
+            cross,
+        ],
+        [
+            VIOLATIONS, NEW_EMPLOYEE, LOCALHOST, OWN_DEPARTMENT,
+            SPECIAL_ROLE_RESTRICTED, SPECIAL_ROLE, CROSS_DEPARTMENT_RESTRICTED, CROSS_DEPARTMENT,
+        ],
+        default=NO_AUTHORIZATION
+    ).astype(np.int8)
+
+
+def prepare_users(policy, columns):
+    """Add the per-user arrays decision_codes needs to a UserDirectory.columns() dict."""
+    users = dict(columns)
+    depts = np.array(["" if dept is None else dept for dept in columns["dept"]], dtype=object)
+    vocabulary, dept_code = np.unique(depts.astype(str), return_inverse=True)
+    users["dept_vocabulary"] = [None if dept == "" else dept for dept in vocabulary.tolist()]
+    users["dept_code"] = dept_code
+    users["cross_mask"] = np.array(
+        [policy.cross_access.get(dept, 0) for dept in users["dept_vocabulary"]], dtype=np.int64
+    )[dept_code]
+    users["localhost"] = np.fromiter(
+        (ip in policy.localhost_addresses for ip in columns["ip_address"]), dtype=bool, count=len(depts)
+    )
+    users["role_mask"] = _special_role_masks(policy, columns["id_int"])
+    return users
+
+
+def _reasons(codes, violations, dept_code, vocabulary, requested_dept):
+    """Reason of every decision as indices into a table of texts, each formatted once.
+
+    Returns:
+        tuple: (indices, texts)
+    """
+    uses_violations = (codes == VIOLATIONS) | (codes == SPECIAL_ROLE_RESTRICTED)
+    uses_dept = (codes == CROSS_DEPARTMENT) | (codes == NO_AUTHORIZATION)
+    parameter = np.where(uses_violations, violations, np.where(uses_dept, dept_code, 0)).astype(np.int64)
+    offset = int(parameter.min()) if len(parameter) else 0
+    span = int(parameter.max()) - offset + 1 if len(parameter) else 1
+    keys, inverse = np.unique(codes.astype(np.int64) * span + (parameter - offset), return_inverse=True)
+    table = []
+    for key in keys.tolist():
+        code, value = divmod(key, span)
+        value += offset
+        if code in (VIOLATIONS, SPECIAL_ROLE_RESTRICTED):
+            table.append(REASONS[code].format(violations=value))
+        elif code in (CROSS_DEPARTMENT, NO_AUTHORIZATION):
+            table.append(REASONS[code].format(dept=vocabulary[value], requested=requested_dept))
+        else:
+            table.append(REASONS[code].format(requested=requested_dept))
+    return inverse.astype(np.int32), table
+
+
+def iter_audit(policy, columns, departments, authorized_only=False, today=None, chunk_size=CHUNK_SIZE):
+    """Yield the decision matrix as pyarrow record batches, department by department.
+
+    Department and reason columns are dictionary-encoded, so each distinct
+    text is built once per batch rather than once per row.
+
+    Args:
+        policy: Compiled AuthorizationPolicy
+        columns (dict): Arrays from UserDirectory.columns()
+        departments (list): Requested departments to evaluate
+        authorized_only (bool): Only yield users who are authorized
+        today (datetime): Date new-employee status is computed for, defaults to now
+        chunk_size (int): Users per batch
+
+    Yields:
+        pyarrow.RecordBatch: Columns AUDIT_COLUMNS
+    """
+    import pyarrow as pa
+
+    today = today or datetime.now()
+    current_month = today.year * 12 + today.month - 1
+    users = prepare_users(policy, columns)
+    dept_vocabulary = users.pop("dept_vocabulary")
+    vocabulary = pa.array(dept_vocabulary, type=pa.string())
+    # One id type for the whole output, so every batch has the same schema
+    if all(isinstance(user_id, int) for user_id in columns["id"]):
+        users["output_id"] = columns["id"].astype(np.int64)
+    else:
+        users["output_id"] = columns["id"].astype(str)
+    authorized_codes = np.array(sorted(AUTHORIZED_DECISIONS), dtype=np.int8)
+    total = len(columns["id"])
+
+    for requested_dept in departments:
+        for start in range(0, total, chunk_size):
+            block = {name: values[start:start + chunk_size] for name, values in users.items()}
+            block["dept_vocabulary"] = dept_vocabulary
+            codes = decision_codes(policy, block, requested_dept, current_month)
+            authorized = np.isin(codes, authorized_codes)
+            if authorized_only:
+                block = {name: values[authorized] if isinstance(values, np.ndarray) else values
+                         for name, values in block.items()}
+                codes = codes[authorized]
+                authorized = authorized[authorized]
+            reason_indices, reason_texts = _reasons(
+                codes, block["past_violations"], block["dept_code"], dept_vocabulary, requested_dept
+            )
+            yield pa.record_batch(
+                [
+                    pa.array(block["output_id"]),
+                    pa.DictionaryArray.from_arrays(block["dept_code"].astype(np.int32), vocabulary),
+                    pa.DictionaryArray.from_arrays(
+                        np.zeros(len(codes), dtype=np.int32), pa.array([requested_dept], type=pa.string())
+                    ),
+                    pa.array(authorized),
+                    pa.DictionaryArray.from_arrays(reason_indices, pa.array(reason_texts, type=pa.string())),
+                ],
+                names=list(AUDIT_COLUMNS)
+            )
+
+
+class _DrainBuffer(io.RawIOBase):
+    """Write-only stream whose contents are taken out as they are produced."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_audit(batches, fmt="csv"):
+    """Encode audit record batches as CSV or Parquet, yielding bytes as each batch is written."""
+    import pyarrow.csv
+    import pyarrow.parquet
+
+    if fmt not in AUDIT_FORMATS:
+        raise ValueError(f"Unknown audit format '{fmt}', expected one of {AUDIT_FORMATS}")
+
+    sink = _DrainBuffer()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            if fmt == "csv":
+                writer = pyarrow.csv.CSVWriter(sink, batch.schema)
+            else:
+                writer = pyarrow.parquet.ParquetWriter(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate authorization for every user against a set of departments")
+    parser.add_argument("--data", default="MOCK_DATA.csv", help="User CSV")
+    parser.add_argument("--policy", default="authorization_policy.json", help="Authorization policy JSON")
+    parser.add_argument("--departments", nargs="+", help="Requested departments (default: all in the policy)")
+    parser.add_argument("--authorized-only", action="store_true", help="Only output users who are authorized")
+    parser.add_argument("--format", choices=AUDIT_FORMATS, default="csv")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from user_directory import UserDirectory
+
+    policy = load_policy(args.policy)
+    departments = args.departments or list(policy.departments)
+    columns = UserDirectory(args.data).columns()
+    with open(args.output, "wb") as f:
+        for chunk in stream_audit(iter_audit(policy, columns, departments, args.authorized_only), args.format):
+            f.write(chunk)
+    logger.info(f"Wrote audit of {len(columns['id'])} users x {len(departments)} departments to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
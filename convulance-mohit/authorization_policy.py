@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# Decisions, in the order the rules are applied, with their reason templates
+VIOLATIONS, NEW_EMPLOYEE, LOCALHOST, OWN_DEPARTMENT, SPECIAL_ROLE_RESTRICTED, SPECIAL_ROLE, \
+    CROSS_DEPARTMENT_RESTRICTED, CROSS_DEPARTMENT, NO_AUTHORIZATION = range(9)
+
+REASONS = {
+    VIOLATIONS: "Access denied due to {violations} past security violations",
+    NEW_EMPLOYEE: "New employees with past violations can only access their own department",
+    LOCALHOST: "Localhost connection with elevated access",
+    OWN_DEPARTMENT: "Access to own department data",
+    SPECIAL_ROLE_RESTRICTED: "Special role restricted due to {violations} violations",
+    SPECIAL_ROLE: "Special role authorization for {requested}",
+    CROSS_DEPARTMENT_RESTRICTED: "Cross-department access restricted due to past violations",
+    CROSS_DEPARTMENT: "Cross-department authorization from {dept} to {requested}",
+    NO_AUTHORIZATION: "No authorization from {dept} to {requested}",
+}
+AUTHORIZED_DECISIONS = frozenset({LOCALHOST, OWN_DEPARTMENT, SPECIAL_ROLE, CROSS_DEPARTMENT})
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_date(value):
+    """Parse YYYY-MM-DD, DD/MM/YYYY or MM/DD/YYYY (tried in that order), returning None if none fit."""
+    if "-" in value:
+        parts = value.split("-")
+        orders = [(0, 1, 2)]
+    else:
+        parts = value.split("/")
+        orders = [(2, 1, 0), (2, 0, 1)]
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return None
+    for year, month, day in orders:
+        try:
+            return date(int(parts[year]), int(parts[month]), int(parts[day]))
+        except ValueError:
+            continue
+    return None
+
+
+def months_employed(employee_info, today=None):
+    """Months since the employee joined, from `months_employed` or else `join_date` (None if unknown)."""
+    months = employee_info.get("months_employed")
+    if months is not None:
+        return months
+    join_date = employee_info.get("join_date", "")
+    if not join_date:
+        return None
+    if isinstance(join_date, str):
+        join_date = _parse_date(join_date)
+        if join_date is None:
+            return None
+    today = today or datetime.now()
+    return (today.year - join_date.year) * 12 + (today.month - join_date.month)
+
+
+class AuthorizationPolicy:
+    """Authorization rules compiled into department bitmasks.
+
+    Each department gets one bit. Cross-department access and special roles
+    become a bitmask of the departments they grant, so a check is a couple of
+    dict lookups and a bitwise AND. Rules are applied in this order:
+
+    1. Too many past violations: denied
+    2. New employee with past violations: own department only
+    3. Localhost connection: allowed
+    4. Own department: allowed
+    5. Special role for the requested department (unless restricted by violations)
+    6. Cross-department access (denied with any past violations)
+
+    Args:
+        config (dict): Policy as stored in authorization_policy.json
+    """
+
+    def __init__(self, config):
+        self.departments = tuple(config["departments"])
+        self.department_bits = {dept: 1 << i for i, dept in enumerate(self.departments)}
+        self.all_departments = (1 << len(self.departments)) - 1
+        self.max_violations = int(config.get("max_violations", 3))
+        self.new_employee_months = int(config.get("new_employee_months", 3))
+        self.special_role_max_violations = int(config.get("special_role_max_violations", 2))
+        self.localhost_addresses = frozenset(config.get("localhost_addresses", ["127.0.0.1", "localhost"]))
+        self.cross_access = {
+            dept: self._mask(granted) for dept, granted in config.get("cross_department_access", {}).items()
+        }
+        self.special_roles = {
+            int(employee_id): self._mask(granted) for employee_id, granted in config.get("special_roles", {}).items()
+        }
+
+    def _mask(self, departments):
+        """Bitmask of a department list, or of every department for "*"."""
+        if departments == "*":
+            return self.all_departments
+        unknown = [dept for dept in departments if dept not in self.department_bits]
+        if unknown:
+            raise ValueError(f"Unknown departments in authorization policy: {unknown}")
+        mask = 0
+        for dept in departments:
+            mask |= self.department_bits[dept]
+        return mask
+
+    def is_new_employee(self, employee_info):
+        try:
+            months = months_employed(employee_info)
+        except (AttributeError, TypeError) as e:
+            logger.warning(f"Error processing join date: {e}")
+            return False
+        return months is not None and months < self.new_employee_months
+
+    def authorize(self, employee_id, employee_dept, requested_dept, employee_info=None):
+        """Decide whether an employee may access a department's data.
+
+        Takes the same arguments and returns the same (authorized, reason)
+        pair as main_model.check_authorization.
+        """
+        if not requested_dept:
+            return False, "No specific department detected in the query"
+
+        past_violations = 0
+        if employee_info:
+            past_violations = _int_or_none(employee_info.get("past_violations", 0)) or 0
+
+            if past_violations >= self.max_violations:
+                logger.warning(f"Employee {employee_id} has {past_violations} past violations - access denied")
+                return False, REASONS[VIOLATIONS].format(violations=past_violations)
+
+            if past_violations > 0 and employee_dept != requested_dept and self.is_new_employee(employee_info):
+                return False, REASONS[NEW_EMPLOYEE]
+
+            if employee_info.get("ip_address", "") in self.localhost_addresses:
+                return True, REASONS[LOCALHOST]
+
+        if employee_dept == requested_dept:
+            return True, REASONS[OWN_DEPARTMENT]
+
+        requested = self.department_bits.get(requested_dept, 0)
+
+        if self.special_roles.get(_int_or_none(employee_id), 0) & requested:
+            if past_violations > 0 and past_violations >= self.special_role_max_violations:
+                return False, REASONS[SPECIAL_ROLE_RESTRICTED].format(violations=past_violations)
+            return True, REASONS[SPECIAL_ROLE].format(requested=requested_dept)
+
+        if self.cross_access.get(employee_dept, 0) & requested:
+            if past_violations > 0:
+                return False, REASONS[CROSS_DEPARTMENT_RESTRICTED]
+            return True, REASONS[CROSS_DEPARTMENT].format(dept=employee_dept, requested=requested_dept)
+
+        return False, REASONS[NO_AUTHORIZATION].format(dept=employee_dept, requested=requested_dept)
+
+
+def load_policy(path):
+    """Load and compile an authorization policy JSON file."""
+    with open(path, encoding="utf-8") as f:
+        return AuthorizationPolicy(json.load(f))
+
+
+class PolicyStore:
+    """Holds the compiled policy and recompiles it when the file changes.
+
+    Like UserDirectory, the file's modification time is checked at most every
+    `check_interval` seconds and a new policy replaces the old one only once it
+    compiled successfully.
+
+    Args:
+        path (str): Policy JSON file
+        check_interval (float): Minimum seconds between modification time checks
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._policy = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        with self._reload_lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            self._policy = load_policy(self.path)
+            self._mtime = mtime
+            logger.info(f"Loaded authorization policy from {self.path}")
+
+    def get(self):
+        """Return the current compiled policy, reloading it first if the file changed."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != self._mtime:
+                    # A file that fails to load is retried only once it changes again
+                    self._mtime = mtime
+                    self.reload()
+            except Exception as e:
+                logger.error(f"Error reloading authorization policy from {self.path}, keeping the loaded policy: {e}")
+        return self._policy
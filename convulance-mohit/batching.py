@@ -0,0 +1,268 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Number of recent queue wait times kept for the wait-time metrics
+WAIT_SAMPLES = 1024
+
+
+class QueueFullError(Exception):
+    """Raised when a request arrives while the inference queue is at its maximum depth."""
+
+
+def _wait_stats(waits):
+    """Summarize recent queue wait times (seconds) in milliseconds."""
+    if not waits:
+        return {"mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(waits)
+    return {
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+class BoundedExecutor:
+    """Thread pool for blocking inference calls with a bounded queue.
+
+    At most `max_workers` calls run at once and at most `max_queue_depth` more
+    wait for a thread. Further calls are rejected with QueueFullError right
+    away instead of queueing behind work that is already late.
+
+    Args:
+        max_workers (int): Number of inference threads
+        max_queue_depth (int): Maximum number of calls waiting for a thread
+    """
+
+    def __init__(self, max_workers=1, max_queue_depth=64):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._waits = collections.deque(maxlen=WAIT_SAMPLES)
+        self._stats = {"completed": 0, "rejected": 0}
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on an inference thread, raising QueueFullError when the queue is full."""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue_depth:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"Inference queue is full ({self.max_queue_depth} waiting)")
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._call, time.perf_counter(), fn, args
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _call(self, enqueued_at, fn, args):
+        with self._lock:
+            self._waits.append(time.perf_counter() - enqueued_at)
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._stats["completed"] += 1
+
+    def queue_depth(self):
+        """Calls waiting for an inference thread (a cheap read for per-request decisions, unlike stats)."""
+        return self._pending - self._running
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "queued": self._pending - self._running,
+                "running": self._running,
+                **self._stats,
+                "wait": _wait_stats(self._waits),
+            }
+
+
+class MicroBatcher:
+    """Collect concurrent classification requests and run them as one batch.
+
+    Requests are queued as they arrive. The worker waits up to `window_ms`
+    after the first queued request (or until `max_batch_size` requests are
+    queued), runs `classify_batch` on the whole batch in a worker thread and
+    resolves each caller's future with its own result. Up to
+    `max_concurrent_batches` batches run at once (e.g. one per inference worker
+    process); the next batch keeps filling while they all are busy. With
+    `max_queue_depth` set, requests arriving while that many are already
+    queued are rejected with QueueFullError.
+
+    Args:
+        classify_batch (callable): Takes a list of queries, returns a list of results in the same order
+        window_ms (float): How long to wait for more requests after the first one arrives
+        max_batch_size (int): Maximum number of requests per batch
+        max_concurrent_batches (int): Maximum number of batches being classified at the same time
+        max_queue_depth (int): Maximum number of queued requests (None for unbounded)
+        executor (BoundedExecutor): Runs the batches; defaults to the event loop's default executor
+    """
+
+    def __init__(self, classify_batch, window_ms=5.0, max_batch_size=16, max_concurrent_batches=1,
+                 max_queue_depth=None, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_concurrent_batches < 1:
+            raise ValueError("max_concurrent_batches must be at least 1")
+        self.classify_batch = classify_batch
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.max_concurrent_batches = max_concurrent_batches
+        self.max_queue_depth = max_queue_depth
+        self.executor = executor
+        self._queue = None
+        self._worker = None
+        self._in_flight = set()
+        self._waits = collections.deque(maxlen=WAIT_SAMPLES)
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "rejected": 0,
+            "last_batch_size": 0,
+            "last_batch_seconds": 0.0,
+            "size_histogram": {},
+        }
+
+    async def start(self):
+        """Start the background worker on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+            logger.info(f"Micro-batching started (window={self.window_ms}ms, max_batch_size={self.max_batch_size}, "
+                        f"max_concurrent_batches={self.max_concurrent_batches})")
+
+    async def stop(self):
+        """Stop the background worker, finishing running batches and failing any requests still queued."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, query):
+        """Queue a query and wait for its classification result, raising QueueFullError when the queue is full."""
+        if self._worker is None:
+            raise RuntimeError("Batcher is not running")
+        if self.max_queue_depth is not None and self._queue.qsize() >= self.max_queue_depth:
+            self._stats["rejected"] += 1
+            raise QueueFullError(f"Batching queue is full ({self.max_queue_depth} waiting)")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((query, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """Wait for the first request, then gather more until the window closes or the batch is full."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+        while True:
+            # Only start collecting once a slot is free, so batches fill up while all slots are busy
+            await slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                slots.release()
+                raise
+            task = asyncio.create_task(self._process(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _process(self, batch):
+        queries = [query for query, _, _ in batch]
+        start = time.perf_counter()
+        self._waits.extend(start - enqueued_at for _, _, enqueued_at in batch)
+        try:
+            if self.executor is not None:
+                results = await self.executor.run(self.classify_batch, queries)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(None, self.classify_batch, queries)
+        except Exception as e:
+            logger.error(f"Error running classification batch: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._record(len(batch), time.perf_counter() - start)
+
+        for (_, future, _), result in zip(batch, results):
+            # The caller may have gone away (e.g. client disconnect)
+            if not future.done():
+                future.set_result(result)
+
+    def _record(self, batch_size, seconds):
+        self._stats["batches"] += 1
+        self._stats["items"] += batch_size
+        self._stats["last_batch_size"] = batch_size
+        self._stats["last_batch_seconds"] = seconds
+        histogram = self._stats["size_histogram"]
+        histogram[batch_size] = histogram.get(batch_size, 0) + 1
+
+    def queue_depth(self):
+        """Requests waiting for the next batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        """Return batch counters and occupancy (batch size as a fraction of max_batch_size)."""
+        batches = self._stats["batches"]
+        mean_batch_size = self._stats["items"] / batches if batches else 0.0
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "max_queue_depth": self.max_queue_depth,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "rejected": self._stats["rejected"],
+            "wait": _wait_stats(self._waits),
+            "in_flight_batches": len(self._in_flight),
+            "batches": batches,
+            "items": self._stats["items"],
+            "mean_batch_size": mean_batch_size,
+            "mean_occupancy": mean_batch_size / self.max_batch_size,
+            "last_batch_size": self._stats["last_batch_size"],
+            "last_occupancy": self._stats["last_batch_size"] / self.max_batch_size,
+            "last_batch_seconds": self._stats["last_batch_seconds"],
+            "size_histogram": dict(sorted(self._stats["size_histogram"].items())),
+        }
@@ -0,0 +1,1071 @@
+"""Benchmarks for the employee query classifier.
+
+Run from this directory, for example:
+
+    python benchmarks.py modes
+    python benchmarks.py --model facebook/bart-large-mnli modes --repeats 5
+    python benchmarks.py labels --counts 12 100 500
+    python benchmarks.py keywords --sizes 10 100 1000 10000
+    python benchmarks.py semantic-report --log queries.jsonl --thresholds 0.85 0.9 0.95
+    python benchmarks.py backends --onnx-dir onnx_model
+    python benchmarks.py workers --workers 1 2 4 8 --torch-threads 1
+    python benchmarks.py users --sizes 1000 100000 1000000
+    python benchmarks.py authorization
+    python benchmarks.py audit --sizes 1000 1000000
+    python benchmarks.py pipeline --requests 20
+    python benchmarks.py long-queries --queries 200 --long-fraction 0.05
+    python benchmarks.py departments --alias-counts 25 250 1000
+    python benchmarks.py decision-log --requests 5000
+    python benchmarks.py deadlines --budgets 300 150 --concurrency 8
+    python benchmarks.py startup --snapshot model_snapshot --repeats 3
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import multiprocessing
+import random
+import re
+import resource
+import socket
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import main_model
+from authorization_audit import iter_audit, stream_audit
+from decision_log import DecisionLog, count_decisions, decision_segments
+from degradation import DegradationCounter
+from department_resolver import FUZZY_THRESHOLD, DepartmentResolver
+from embeddings import encode, load_sentence_encoder
+from inference_backends import BACKENDS
+from inference_workers import InferenceWorkerPool
+from keyword_matcher import KeywordMatcher
+from label_embeddings import LabelEmbeddingClassifier
+from query_log import load_query_log
+from tests.legacy import legacy_check_authorization, legacy_extract_requested_department
+from tests.synthetic import department_query_corpus, synthetic_departments, write_synthetic_users
+from user_directory import UserDirectory
+
+# Paraphrased queries added to the example queries for the semantic cache report
+PARAPHRASE_QUERIES = [
+    "show engineering employees",
+    "list the employees in engineering",
+    "who works in the engineering department?",
+    "What is the company holiday policy?",
+    "what's our holiday policy at the company",
+    "Tell me the holiday policy of the company",
+    "How many employees joined after 2022?",
+    "Show me staff who joined after 2022",
+    "What is the sales revenue for last quarter?",
+    "sales revenue last quarter",
+    "How do I file a complaint?",
+    "How can I submit a complaint?",
+]
+
+
+def _disable_caches():
+    """Turn off the result caches so every call measures real inference."""
+    main_model.CLASSIFICATION_CACHE_SIZE = 0
+    main_model.SEMANTIC_CACHE_THRESHOLD = None
+    main_model.classification_cache = None
+    main_model.semantic_cache = None
+
+
+def _resident_memory_mb():
+    """Current resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _percentile(values, pct):
+    """Return the pct-th percentile of values (nearest-rank)."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _print_latency_row(name, latencies_ms, extra=""):
+    print(f"{name:<20} mean={statistics.mean(latencies_ms):8.2f}ms  "
+          f"p50={_percentile(latencies_ms, 50):8.2f}ms  "
+          f"p95={_percentile(latencies_ms, 95):8.2f}ms  {extra}")
+
+
+def benchmark_classification_modes(classifier, queries=None, repeats=3, modes=("sequential", "fused", "embedding")):
+    """Compare latency and decisions of the classification modes.
+
+    Every query is classified `repeats` times in each mode after one warm-up
+    call. Decisions are compared against the sequential mode, which is
+    always measured.
+    """
+    queries = queries or main_model.EXAMPLE_QUERIES
+    decisions = {}
+    _disable_caches()
+
+    print("\n===== CLASSIFICATION MODE BENCHMARK =====")
+    print(f"{len(queries)} queries x {repeats} repeats")
+
+    for mode in ["sequential"] + [mode for mode in modes if mode != "sequential"]:
+        main_model.is_corporate_related(queries[0], classifier, mode=mode)  # warm-up
+        latencies = []
+        results = []
+        for query in queries:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = main_model.is_corporate_related(query, classifier, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+            results.append(result)
+        decisions[mode] = results
+        _print_latency_row(mode, latencies)
+
+    baseline = decisions["sequential"]
+    for mode, results in decisions.items():
+        if mode == "sequential":
+            continue
+        same_decision = sum(a[0] == b[0] for a, b in zip(baseline, results))
+        same_label = sum(a[0] == b[0] and a[1] == b[1] for a, b in zip(baseline, results))
+        print(f"{mode} vs sequential: decision agreement {same_decision}/{len(queries)}, "
+              f"decision+label agreement {same_label}/{len(queries)}")
+        for query, a, b in zip(queries, baseline, results):
+            if a[:2] != b[:2]:
+                print(f"  differs: {query!r}: sequential={a[:2]} {mode}={b[:2]}")
+
+    print("\n===== END OF BENCHMARK =====")
+    return decisions
+
+
+def _synthetic_labels(count, seed=0):
+    """The default topic labels padded with random two-word labels to `count` labels."""
+    rng = random.Random(seed)
+    labels = list(main_model.CORPORATE_LABELS + main_model.NON_CORPORATE_LABELS)
+    while len(labels) < count:
+        words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))) for _ in range(2)]
+        labels.append(" ".join(words))
+    return labels
+
+
+def benchmark_label_scaling(classifier, encoder, counts=(12, 100, 500), queries=None, repeats=3):
+    """Show how the topic pass's cost grows with the number of candidate labels.
+
+    The NLI pipeline scores one premise/hypothesis pair per label, while the
+    label-embedding classifier embeds the query once and multiplies it with
+    the precomputed label matrix.
+    """
+    queries = queries or main_model.EXAMPLE_QUERIES[:5]
+    domain_hypotheses = [main_model.DOMAIN_HYPOTHESIS_TEMPLATE.format(label) for label in main_model.DOMAIN_LABELS]
+
+    print("\n===== LABEL SCALING BENCHMARK =====")
+    print(f"{len(queries)} queries x {repeats} repeats, time per query")
+
+    for count in counts:
+        labels = _synthetic_labels(count)
+        start = time.perf_counter()
+        embedding_classifier = LabelEmbeddingClassifier(
+            encoder, domain_hypotheses, [main_model.TOPIC_HYPOTHESIS_TEMPLATE.format(label) for label in labels]
+        )
+        build_ms = (time.perf_counter() - start) * 1000
+
+        nli = []
+        embedding = []
+        for query in queries:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                main_model.classify_query(
+                    classifier, query, labels, hypothesis_template=main_model.TOPIC_HYPOTHESIS_TEMPLATE,
+                    multi_label=True, batch_size=len(labels)
+                )
+                nli.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                embedding_classifier.score([query])
+                embedding.append((time.perf_counter() - start) * 1000)
+
+        print(f"{len(labels):>5} labels  nli={statistics.mean(nli):10.2f}ms  "
+              f"embedding={statistics.mean(embedding):8.2f}ms  label matrix build={build_ms:8.1f}ms")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def _legacy_keyword_scan(query, keywords_by_category):
+    """The per-keyword regex loop the keyword matcher replaced, kept for comparison."""
+    for category, keywords in keywords_by_category.items():
+        for keyword in keywords:
+            if re.search(r'\b' + keyword + r'\b', query.lower()):
+                return keyword, category
+    return None
+
+
+def _synthetic_keywords(count, seed=0):
+    """The default non-corporate keywords padded with random words to `count` terms."""
+    rng = random.Random(seed)
+    keywords = {category: list(words) for category, words in main_model.NON_CORPORATE_KEYWORDS.items()}
+    existing = {word for words in keywords.values() for word in words}
+    categories = list(keywords)
+    while len(existing) < count:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        if word not in existing:
+            existing.add(word)
+            keywords[rng.choice(categories)].append(word)
+    return keywords
+
+
+def benchmark_keyword_matching(sizes=(10, 100, 1000, 10000), queries=None, repeats=20):
+    """Show how keyword screening time scales with the number of keywords.
+
+    Compares the per-keyword regex loop with the compiled KeywordMatcher on the
+    example queries, and checks that both find the same keyword.
+    """
+    queries = [query.lower() for query in (queries or main_model.EXAMPLE_QUERIES)]
+
+    print("\n===== KEYWORD MATCHING BENCHMARK =====")
+    print(f"{len(queries)} queries x {repeats} repeats, time per query")
+
+    for size in sizes:
+        keywords = _synthetic_keywords(size)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # The legacy loop gets slow with large lists, so run it fewer times
+        legacy_repeats = max(1, repeats * 100 // max(size, 100))
+        start = time.perf_counter()
+        for _ in range(legacy_repeats):
+            legacy_hits = [_legacy_keyword_scan(query, keywords) for query in queries]
+        legacy_us = (time.perf_counter() - start) / (legacy_repeats * len(queries)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            matcher_hits = [matcher.first(query) for query in queries]
+        matcher_us = (time.perf_counter() - start) / (repeats * len(queries)) * 1e6
+
+        agree = sum(a == b for a, b in zip(legacy_hits, matcher_hits))
+        print(f"{len(matcher):>6} keywords  legacy={legacy_us:10.1f}us  matcher={matcher_us:8.1f}us  "
+              f"build={build_ms:8.1f}ms  agreement={agree}/{len(queries)}")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def _backend_worker(model_name, backend, onnx_dir, queries, repeats, results):
+    """Measure one backend in a fresh process so its memory use is not mixed with others."""
+    _disable_caches()
+    import transformers  # noqa: F401 - imported up front so the memory delta covers the model only
+    from inference_backends import build_zero_shot_pipeline
+
+    baseline_mb = _resident_memory_mb()
+    start = time.perf_counter()
+    try:
+        classifier = build_zero_shot_pipeline(model_name, backend=backend, onnx_dir=onnx_dir)
+    except Exception as e:
+        results.put({"backend": backend, "error": str(e)})
+        return
+    load_seconds = time.perf_counter() - start
+    loaded_mb = _resident_memory_mb()
+
+    main_model.is_corporate_related(queries[0], classifier)  # warm-up
+    latencies = []
+    decisions = []
+    for query in queries:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = main_model.is_corporate_related(query, classifier)
+            latencies.append((time.perf_counter() - start) * 1000)
+        decisions.append(list(result[:2]))
+
+    results.put({
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "model_memory_mb": loaded_mb - baseline_mb,
+        "resident_memory_mb": _resident_memory_mb(),
+        "latencies_ms": latencies,
+        "decisions": decisions,
+    })
+
+
+def benchmark_backends(model_name, backends=BACKENDS, onnx_dir=None, queries=None, repeats=3):
+    """Report latency, resident memory and label agreement for each inference backend.
+
+    Each backend runs in its own process. Agreement is measured against the
+    first backend in the list (torch-fp32 by default).
+    """
+    queries = queries or main_model.EXAMPLE_QUERIES
+    context = multiprocessing.get_context("spawn")
+    reports = []
+
+    print("\n===== INFERENCE BACKEND BENCHMARK =====")
+    print(f"{len(queries)} queries x {repeats} repeats")
+
+    for backend in backends:
+        results = context.Queue()
+        process = context.Process(
+            target=_backend_worker, args=(model_name, backend, onnx_dir, queries, repeats, results)
+        )
+        process.start()
+        try:
+            report = results.get()
+        finally:
+            process.join()
+        reports.append(report)
+
+    for report in reports:
+        if "error" in report:
+            print(f"{report['backend']:<20} failed: {report['error']}")
+    reports = [report for report in reports if "error" not in report]
+    if not reports:
+        return reports
+
+    baseline = reports[0]["decisions"]
+    for report in reports:
+        same_decision = sum(a[0] == b[0] for a, b in zip(baseline, report["decisions"]))
+        same_label = sum(a == b for a, b in zip(baseline, report["decisions"]))
+        _print_latency_row(
+            report["backend"], report["latencies_ms"],
+            f"load={report['load_seconds']:.1f}s  model={report['model_memory_mb']:.0f}MB  "
+            f"rss={report['resident_memory_mb']:.0f}MB  "
+            f"decision agreement={same_decision}/{len(queries)}  label agreement={same_label}/{len(queries)}"
+        )
+
+    print("\n===== END OF BENCHMARK =====")
+    return reports
+
+
+def benchmark_worker_scaling(model_name, worker_counts=(1, 2, 4), torch_threads=1, queries=None, repeats=5):
+    """Report classification throughput as the number of inference worker processes grows.
+
+    The model is loaded once in this process and every pool forks from it, so
+    workers share the weights the same way they do in the API. Every query is
+    submitted `repeats` times at once as single-query tasks.
+    """
+    queries = queries or main_model.EXAMPLE_QUERIES
+    queries = [query for query in queries if not main_model._keyword_rejection(query.strip())]
+    _disable_caches()
+    # No inference runs in this process, so forking stays safe for every pool size
+    main_model.classifier = main_model.load_classifier(model_name)
+
+    print("\n===== INFERENCE WORKER SCALING BENCHMARK =====")
+    print(f"{len(queries)} queries x {repeats} repeats, {torch_threads} torch thread(s) per worker")
+
+    baseline = None
+    for count in worker_counts:
+        pool = InferenceWorkerPool(count, torch_threads=torch_threads)
+        pool.start()
+        try:
+            # Warm up every worker
+            for future in [pool.submit([queries[0]]) for _ in range(count)]:
+                future.result()
+
+            start = time.perf_counter()
+            futures = [pool.submit([query]) for query in queries for _ in range(repeats)]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.stop()
+
+        throughput = len(futures) / elapsed
+        baseline = baseline or throughput
+        print(f"{count:>3} workers  {throughput:8.1f} queries/s  speedup={throughput / baseline:5.2f}x")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def benchmark_user_directory(sizes=(1000, 100000, 1000000), lookups=10000, legacy_max_size=100000):
+    """Report load time, memory and lookup latency of the user directory at different sizes.
+
+    The per-request pandas path (read the CSV, then scan for the id) is
+    measured for sizes up to `legacy_max_size`.
+    """
+    rng = random.Random(0)
+
+    print("\n===== USER DIRECTORY BENCHMARK =====")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"users_{size}.csv")
+            write_synthetic_users(path, size)
+            ids = [rng.randint(1, size) for _ in range(lookups)]
+
+            baseline_mb = _resident_memory_mb()
+            start = time.perf_counter()
+            directory = UserDirectory(path)
+            load_seconds = time.perf_counter() - start
+            memory_mb = _resident_memory_mb() - baseline_mb
+
+            latencies = []
+            for user_id in ids:
+                start = time.perf_counter()
+                directory.get(user_id)
+                latencies.append((time.perf_counter() - start) * 1e6)
+
+            legacy = ""
+            if size <= legacy_max_size:
+                legacy_repeats = 5
+                start = time.perf_counter()
+                for user_id in ids[:legacy_repeats]:
+                    main_model.get_user_by_id(user_id, main_model.load_user_data(path))
+                legacy = f"  legacy per request={(time.perf_counter() - start) / legacy_repeats * 1000:8.1f}ms"
+
+            print(f"{size:>8} users  load={load_seconds:6.2f}s  memory={memory_mb:7.1f}MB  "
+                  f"lookup p50={_percentile(latencies, 50):6.2f}us  p99={_percentile(latencies, 99):6.2f}us{legacy}")
+            del directory
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def benchmark_authorization(path="MOCK_DATA.csv", repeats=5):
+    """Time the legacy branch chain against the compiled policy over every user x department pair."""
+    directory = UserDirectory(path)
+    users = [user for user in (directory.get(user_id) for user_id in range(1, len(directory) + 1)) if user]
+    policy = main_model.get_authorization_policy()
+
+    print("\n===== AUTHORIZATION BENCHMARK =====")
+    print(f"{len(users)} users x {len(main_model.DEPARTMENTS)} departments x {repeats} repeats, logging disabled")
+
+    logging.disable(logging.CRITICAL)
+    try:
+        for name, check in (("legacy", legacy_check_authorization), ("compiled", policy.authorize)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                for user in users:
+                    for dept in main_model.DEPARTMENTS:
+                        check(user["id"], user["dept"], dept, user)
+            per_check = (time.perf_counter() - start) / (repeats * len(users) * len(main_model.DEPARTMENTS))
+            print(f"{name:<10} {per_check * 1e6:8.2f}us per check")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def benchmark_audit(sizes=(1000, 100000, 1000000), formats=("csv", "parquet")):
+    """Time the full users x departments audit, written to a temporary file, at different directory sizes."""
+    policy = main_model.get_authorization_policy()
+    departments = list(policy.departments)
+
+    print("\n===== AUTHORIZATION AUDIT BENCHMARK =====")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"users_{size}.csv")
+            write_synthetic_users(path, size)
+            start = time.perf_counter()
+            columns = UserDirectory(path).columns()
+            load_seconds = time.perf_counter() - start
+
+            for fmt in formats:
+                output = os.path.join(tmp, f"audit.{fmt}")
+                start = time.perf_counter()
+                with open(output, "wb") as f:
+                    for chunk in stream_audit(iter_audit(policy, columns, departments), fmt):
+                        f.write(chunk)
+                seconds = time.perf_counter() - start
+                print(f"{size:>8} users x {len(departments)} departments  {fmt:<8} {seconds:7.2f}s  "
+                      f"({size * len(departments) / seconds / 1e6:5.2f}M decisions/s, "
+                      f"{os.path.getsize(output) / 1e6:7.1f}MB, directory load {load_seconds:.2f}s)")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def _department_queries():
+    """Queries naming each department, so the authorization stage runs."""
+    return [f"Show me the performance reviews in the {dept} department" for dept in main_model.DEPARTMENTS]
+
+
+def _pipeline_requests(directory, denied, count, seed=0):
+    """Pick (user_id, query) pairs that the authorization policy denies, or allows."""
+    rng = random.Random(seed)
+    users = [user for user in (directory.get(user_id) for user_id in range(1, len(directory) + 1)) if user]
+    queries = _department_queries()
+    requests = []
+    logging.disable(logging.CRITICAL)
+    try:
+        for _ in range(count * 1000):
+            if len(requests) == count:
+                break
+            user = rng.choice(users)
+            query = rng.choice(queries)
+            dept = main_model.extract_requested_department(query)
+            authorized, _ = main_model.check_authorization(user["id"], user["dept"], dept, user)
+            if authorized != denied:
+                requests.append((user["id"], query))
+    finally:
+        logging.disable(logging.NOTSET)
+    return requests
+
+
+def benchmark_pipeline_order(model_name, requests=20, repeats=3):
+    """Latency of process_user_query in both orders, for requests the policy denies and allows.
+
+    Caches are disabled, so every classification that runs is real inference.
+    """
+    _disable_caches()
+    classifier = main_model.load_classifier(model_name)
+    main_model.classifier = classifier
+    directory = main_model.get_user_directory()
+    groups = {
+        "denied": _pipeline_requests(directory, denied=True, count=requests),
+        "allowed": _pipeline_requests(directory, denied=False, count=requests),
+    }
+
+    print("\n===== PIPELINE ORDER BENCHMARK =====")
+    print(f"{requests} requests per group x {repeats} repeats")
+
+    main_model.process_user_query(*groups["allowed"][0], order="classify_first")  # warm-up
+    logging.disable(logging.CRITICAL)
+    try:
+        for group, pairs in groups.items():
+            means = {}
+            for order in main_model.PIPELINE_ORDERS:
+                latencies = []
+                for user_id, query in pairs:
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        main_model.process_user_query(user_id, query, order=order)
+                        latencies.append((time.perf_counter() - start) * 1000)
+                means[order] = statistics.mean(latencies)
+                _print_latency_row(f"{group} {order}", latencies)
+            print(f"{group}: auth_first saves {means['classify_first'] - means['auth_first']:.2f}ms per request")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def benchmark_deadlines(model_name, budgets_ms=(300,), concurrency=8, requests=200, seed=0):
+    """Latency, deadline misses and decision agreement of user queries under load, with and without a budget.
+
+    `concurrency` threads send requests while one inference thread serves
+    the full classifications, so requests queue like they do behind the API.
+    Caches are disabled. Each budget is compared with a run without deadlines
+    on the same requests: p50/p95/p99 latency, share of requests over budget,
+    share answered in each degraded mode and how often the approved/refused
+    decision matches the full classification.
+    """
+    _disable_caches()
+    classifier = main_model.load_classifier(model_name)
+    main_model.classifier = classifier
+    directory = main_model.get_user_directory()
+    rng = random.Random(seed)
+    queries = _department_queries() + main_model.EXAMPLE_QUERIES + PARAPHRASE_QUERIES
+    pairs = [(rng.randint(1, len(directory)), rng.choice(queries)) for _ in range(requests)]
+
+    inference = threading.Lock()
+    waiting = [0]
+    waiting_lock = threading.Lock()
+
+    def classify(query):
+        with waiting_lock:
+            waiting[0] += 1
+        with inference:
+            with waiting_lock:
+                waiting[0] -= 1
+            return main_model.is_corporate_related(query, classifier)
+
+    def run(budget_ms):
+        def request(pair):
+            start = time.monotonic()
+            deadline = None if budget_ms is None else start + budget_ms / 1000
+            result = main_model.process_user_query(*pair, classify=classify, order="classify_first", deadline=deadline)
+            return result, (time.monotonic() - start) * 1000
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(request, pairs))
+
+    print("\n===== DEADLINE BENCHMARK =====")
+    print(f"{requests} requests, {concurrency} concurrent, one inference thread")
+
+    main_model.queue_wait_estimator = lambda: waiting[0] * main_model.pass_latency.estimate("full")
+    saved = main_model.degradation
+    logging.disable(logging.CRITICAL)
+    try:
+        main_model.process_user_query(*pairs[0], order="classify_first")  # warm-up
+        baseline = run(None)
+        _print_latency_row("no deadline", [latency for _, latency in baseline],
+                           f"p99={_percentile([latency for _, latency in baseline], 99):8.2f}ms")
+        for budget_ms in budgets_ms:
+            main_model.degradation = DegradationCounter()
+            results = run(budget_ms)
+            latencies = [latency for _, latency in results]
+            stats = main_model.degradation.stats()
+            over = sum(latency > budget_ms for latency in latencies) / len(latencies)
+            agreement = {}
+            for (result, _), (full, _) in zip(results, baseline):
+                mode = result.get("degraded_mode") or "full"
+                same = (result["status"] == "approved") == (full["status"] == "approved")
+                agreement.setdefault(mode, []).append(same)
+            _print_latency_row(f"budget {budget_ms:g}ms", latencies,
+                               f"p99={_percentile(latencies, 99):8.2f}ms  over budget {over:.1%}")
+            print("  " + "  ".join(
+                f"{mode} {stats['rates'][mode]:.1%} (agrees {statistics.mean(agreement[mode]):.1%})"
+                for mode in stats["rates"] if mode in agreement
+            ))
+    finally:
+        logging.disable(logging.NOTSET)
+        main_model.queue_wait_estimator = None
+        main_model.degradation = saved
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+# API settings compared by the startup benchmark, on top of the current environment
+STARTUP_CONFIGS = {
+    "no warm-up": {"WARMUP_QUERIES": "0"},
+    "warm-up": {},
+    "fast start": {"FAST_START": "true"},
+}
+
+
+def _http_get(url, timeout=60):
+    """Status code and seconds of a GET request, (None, None) while nothing accepts connections."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError):
+        return None, None
+    return status, time.perf_counter() - start
+
+
+def _measure_startup(env, queries, poll_seconds=0.02, timeout=600):
+    """Start the API in a new process and time how long it takes to answer.
+
+    Returns the seconds from spawning the process until liveness, readiness
+    and the first successful classification, the latency of that first
+    classification and the median latency of the following ones, plus the
+    startup profile the service reports.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    def classify_url(query):
+        return f"{base}/api/classify?" + urllib.parse.urlencode({"query": query})
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    times = {}
+    try:
+        while "first_response" not in times:
+            if process.poll() is not None:
+                raise RuntimeError(f"API process exited with code {process.returncode} while starting")
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f"API did not answer within {timeout}s")
+            for name, path in (("live", "/api/health/live"), ("ready", "/api/health/ready")):
+                if name not in times and _http_get(base + path)[0] == 200:
+                    times[name] = time.perf_counter() - started
+            status, seconds = _http_get(classify_url(queries[0]))
+            if status == 200:
+                times["first_response"] = time.perf_counter() - started
+                times["first_latency"] = seconds
+            else:
+                time.sleep(poll_seconds)
+        times.setdefault("live", times["first_response"])
+        times.setdefault("ready", times["first_response"])
+        times["warm_latency"] = statistics.median(_http_get(classify_url(query))[1] for query in queries[1:])
+        with urllib.request.urlopen(base + "/api/health/ready") as response:
+            profile = json.loads(response.read())["startup_seconds"]
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return times, profile
+
+
+def benchmark_startup(model_name, snapshot_dir=None, repeats=3, warmup_queries=8):
+    """Time to the first good response of a freshly started API, per startup configuration.
+
+    Each configuration starts uvicorn `repeats` times and reports medians:
+    seconds until /api/health/live and /api/health/ready answer 200, until
+    the first /api/classify request succeeds (polled from the moment the
+    process is spawned), and the latency of that first classification next
+    to the warm latency of the ones after it. Queries are distinct and pass
+    keyword screening, so each of them reaches the model.
+    """
+    configs = dict(STARTUP_CONFIGS)
+    if snapshot_dir:
+        configs["snapshot"] = {"CLASSIFIER_SNAPSHOT_DIR": snapshot_dir}
+        configs["snapshot, fast start"] = {"CLASSIFIER_SNAPSHOT_DIR": snapshot_dir, "FAST_START": "true"}
+    queries = [
+        query for query in _department_queries() + main_model.EXAMPLE_QUERIES[::-1]
+        if main_model._keyword_rejection(query) is None
+    ][:6]
+
+    print("\n===== STARTUP BENCHMARK =====")
+    print(f"{model_name}, median of {repeats} starts, seconds from spawning the process")
+    print(f"{'config':22s} {'live':>7s} {'ready':>7s} {'1st good':>9s} {'1st ms':>9s} {'warm ms':>9s}  profile")
+    for name, settings in configs.items():
+        env = {**os.environ, "CLASSIFIER_MODEL": model_name, "WARMUP_QUERIES": str(warmup_queries), **settings}
+        env.pop("CLASSIFICATION_CACHE_DB", None)
+        runs = [_measure_startup(env, queries) for _ in range(repeats)]
+        median = {key: statistics.median(times[key] for times, _ in runs) for key in runs[0][0]}
+        profile = runs[-1][1]
+        print(f"{name:22s} {median['live']:7.2f} {median['ready']:7.2f} {median['first_response']:9.2f} "
+              f"{median['first_latency'] * 1000:9.1f} {median['warm_latency'] * 1000:9.1f}  "
+              + " ".join(f"{phase}={seconds:.2f}" for phase, seconds in profile.items()))
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+# Sentences long synthetic queries are built from, like a pasted email
+EMAIL_SENTENCES = [
+    "Hi team, I hope everyone had a good weekend.",
+    "Following up on the meeting from last Thursday about the quarterly planning.",
+    "Can you send me the list of employees in the Engineering department who joined this year?",
+    "I also wanted to check how many training sessions were completed last quarter.",
+    "The offsite is still scheduled for the second week of next month.",
+    "Please let me know if the venue booking needs another approval.",
+    "On a separate note, the coffee machine on the third floor is broken again.",
+    "Let me know if you have any questions.",
+    "Thanks in advance for pulling these numbers together.",
+    "Best regards and have a great week.",
+]
+
+
+def _long_query_corpus(count, long_fraction=0.05, min_words=300, max_words=2000, seed=0):
+    """Example queries with a heavy tail of long, email-like queries mixed in at random positions."""
+    rng = random.Random(seed)
+    short = main_model.EXAMPLE_QUERIES + PARAPHRASE_QUERIES
+    corpus = []
+    for _ in range(count):
+        if rng.random() < long_fraction:
+            words = rng.randint(min_words, max_words)
+            sentences = []
+            while sum(len(sentence.split()) for sentence in sentences) < words:
+                sentences.append(rng.choice(EMAIL_SENTENCES))
+            corpus.append(" ".join(sentences))
+        else:
+            corpus.append(rng.choice(short))
+    return corpus
+
+
+def benchmark_long_queries(classifier, queries=None, batch_size=8, max_tokens=128, strategy="head",
+                           buckets=(16, 32, 64)):
+    """Per-query latency percentiles with and without the token budget and length buckets.
+
+    Queries are classified in consecutive batches of `batch_size`, like the
+    micro-batcher would, and every query is charged its batch's time. Caches
+    are disabled. Decisions on the queries within the budget are compared
+    between the two configurations.
+    """
+    queries = queries or _long_query_corpus(200)
+    _disable_caches()
+    configurations = {
+        "no budget": (0, []),
+        f"{max_tokens} tokens": (max_tokens, list(buckets)),
+    }
+
+    print("\n===== LONG QUERY BENCHMARK =====")
+    print(f"{len(queries)} queries in batches of {batch_size}, "
+          f"{sum(len(query.split()) > 200 for query in queries)} over 200 words, truncation strategy '{strategy}'")
+
+    saved = (main_model.MAX_QUERY_TOKENS, main_model.QUERY_TRUNCATION, main_model.LENGTH_BUCKETS)
+    decisions = {}
+    try:
+        for name, (budget, edges) in configurations.items():
+            main_model.MAX_QUERY_TOKENS, main_model.QUERY_TRUNCATION, main_model.LENGTH_BUCKETS = budget, strategy, edges
+            main_model.query_admission = None
+            main_model._classify_batch(queries[:batch_size], classifier, 0.45, "sequential")  # warm-up
+            latencies = []
+            results = []
+            for start in range(0, len(queries), batch_size):
+                batch = queries[start:start + batch_size]
+                began = time.perf_counter()
+                results.extend(main_model._classify_batch(batch, classifier, 0.45, "sequential"))
+                latencies.extend([(time.perf_counter() - began) * 1000] * len(batch))
+            decisions[name] = results
+            _print_latency_row(name, latencies, extra=f"p99={_percentile(latencies, 99):8.2f}ms")
+    finally:
+        main_model.MAX_QUERY_TOKENS, main_model.QUERY_TRUNCATION, main_model.LENGTH_BUCKETS = saved
+        main_model.query_admission = None
+
+    admission = main_model.get_query_admission(classifier)
+    within = [
+        index for index, query in enumerate(queries)
+        if admission is None or admission.count_tokens([query.strip()])[0] <= max_tokens
+    ]
+    baseline, budgeted = decisions.values()
+    same = sum(baseline[index][0] == budgeted[index][0] for index in within)
+    print(f"Decision agreement on queries within the budget: {same}/{len(within)}; "
+          f"on truncated queries: {sum(a[0] == b[0] for a, b in zip(baseline, budgeted)) - same}/"
+          f"{len(queries) - len(within)}")
+
+    print("\n===== END OF BENCHMARK =====")
+    return decisions
+
+
+def benchmark_department_resolver(alias_counts=(25, 250, 1000), repeats=3):
+    """Time the original loops against the resolver as the number of aliases grows.
+
+    The first row uses the built-in aliases; the others use synthetic ones.
+    """
+    print("\n===== DEPARTMENT RESOLVER BENCHMARK =====")
+
+    configurations = [("built-in", main_model.DEPARTMENTS, main_model.DEPARTMENT_MAPPING)]
+    configurations += [(f"{count} aliases", *synthetic_departments(count)) for count in alias_counts]
+
+    logging.disable(logging.CRITICAL)
+    try:
+        for name, departments, aliases in configurations:
+            queries, _ = department_query_corpus(aliases, departments, PARAPHRASE_QUERIES + EMAIL_SENTENCES)
+            queries = random.Random(1).sample(queries, min(len(queries), 500))
+            start = time.perf_counter()
+            resolver = DepartmentResolver(aliases, departments, fuzzy_threshold=FUZZY_THRESHOLD)
+            build_ms = (time.perf_counter() - start) * 1000
+            timings = {}
+            for label, resolve in (("loops", lambda q: legacy_extract_requested_department(q, aliases)),
+                                   ("resolver", resolver.resolve)):
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    for query in queries:
+                        resolve(query)
+                timings[label] = (time.perf_counter() - start) / (repeats * len(queries)) * 1e6
+            print(f"{name:<14} {len(aliases):>5} aliases  loops {timings['loops']:9.1f}us  "
+                  f"resolver {timings['resolver']:7.1f}us per query  (build {build_ms:.1f}ms)")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def benchmark_decision_log(path="MOCK_DATA.csv", requests=5000, formats=("jsonl", "parquet")):
+    """Time per user query with decisions logged synchronously and with the decision log.
+
+    The baseline writes the per-decision log lines to a file as they happen,
+    as the request path used to. Classifications are precomputed, so only
+    the stages after classification are timed. The decision log's writer
+    thread is started after the requests, so the request time only includes
+    queueing (not the writer competing for the GIL in this CPU-bound loop),
+    and the writer's own time per record is measured as it drains the queue.
+    After each run the log is read back and its denials per department per
+    day checked against the results.
+    """
+    print("\n===== DECISION LOG BENCHMARK =====")
+
+    directory = main_model.get_user_directory()
+    rng = random.Random(0)
+    queries = _department_queries() + main_model.EXAMPLE_QUERIES
+    pairs = [(rng.randint(1, len(directory)), rng.choice(queries)) for _ in range(requests)]
+    classification = (True, "business operations", 0.9, {"business operations": 0.9})
+    root = logging.getLogger()
+
+    def run():
+        start = time.perf_counter()
+        results = [main_model.process_user_query(user_id, query, classification=classification)
+                   for user_id, query in pairs]
+        return results, (time.perf_counter() - start) / len(pairs) * 1e6
+
+    saved = (root.level, root.handlers, main_model.decision_log, main_model.DECISION_LOG_DIR)
+    try:
+        with tempfile.TemporaryDirectory() as temp:
+            # Every decision written as it happens, as the info lines used to be
+            root.handlers = [logging.FileHandler(os.path.join(temp, "sync.log"))]
+            root.setLevel(logging.DEBUG)
+            _, sync_us = run()
+            print(f"{'sync logging':<14} {sync_us:8.1f}us per request")
+
+            root.setLevel(logging.WARNING)
+            _, none_us = run()
+            print(f"{'no audit log':<14} {none_us:8.1f}us per request")
+
+            for fmt in formats:
+                log_dir = os.path.join(temp, fmt)
+                main_model.decision_log = DecisionLog(log_dir, fmt=fmt, queue_size=requests)
+                results, log_us = run()
+                start = time.perf_counter()
+                main_model.decision_log.start().close()
+                writer_us = (time.perf_counter() - start) / len(pairs) * 1e6
+                stats = main_model.decision_log.stats()
+                size = sum(os.path.getsize(segment) for segment in decision_segments(log_dir))
+
+                start = time.perf_counter()
+                denials = count_decisions(log_dir, decision="unauthorized")
+                read_ms = (time.perf_counter() - start) * 1000
+                expected = collections.Counter(r["requested_dept"] for r in results if r["status"] == "unauthorized")
+                logged = dict(zip(denials["requested_dept"], denials["count"]))
+                print(f"{fmt:<14} {log_us:8.1f}us per request  writer {writer_us:5.1f}us per record  "
+                      f"{stats['written']} written, {stats['dropped']} dropped, {size / max(1, stats['written']):.0f} "
+                      f"bytes/record  denials per department per day read in {read_ms:.1f}ms, "
+                      f"{'match' if logged == dict(expected) else 'MISMATCH'}")
+    finally:
+        root.level, root.handlers, main_model.decision_log, main_model.DECISION_LOG_DIR = saved
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def semantic_cache_report(classifier, encoder, queries, thresholds=(0.8, 0.85, 0.9, 0.95), capacity=2048):
+    """Report semantic cache hit rate against decision agreement at different thresholds.
+
+    Queries are replayed in order. Each query looks up its nearest neighbour
+    among the previous `capacity` queries, and a hit counts as agreeing when
+    the neighbour's NLI classification matches the query's own. Queries
+    settled by keyword screening never reach the semantic cache and are left out.
+    """
+    queries = [query.strip() for query in queries if not main_model._keyword_rejection(query.strip())]
+    truths = main_model._nli_classify_batch(queries, classifier, 0.45, main_model.CLASSIFICATION_MODE)
+    embeddings = encode(encoder, queries)
+    similarities = embeddings @ embeddings.T
+
+    print("\n===== SEMANTIC CACHE REPORT =====")
+    print(f"{len(queries)} queries after keyword screening, cache capacity {capacity}")
+
+    for threshold in thresholds:
+        hits = same_decision = same_label = 0
+        for i in range(1, len(queries)):
+            window = similarities[i, max(0, i - capacity):i]
+            j = max(0, i - capacity) + int(np.argmax(window))
+            if similarities[i, j] >= threshold:
+                hits += 1
+                same_decision += truths[i][0] == truths[j][0]
+                same_label += truths[i][0] == truths[j][0] and truths[i][1] == truths[j][1]
+        hit_rate = hits / len(queries) if queries else 0.0
+        decision_agreement = same_decision / hits if hits else 1.0
+        label_agreement = same_label / hits if hits else 1.0
+        print(f"threshold={threshold:.2f}  hit rate={hit_rate:6.1%}  "
+              f"decision agreement={decision_agreement:6.1%}  label agreement={label_agreement:6.1%}")
+
+    print("\n===== END OF REPORT =====")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the employee query classifier")
+    parser.add_argument("--model", default="facebook/bart-large-mnli", help="Zero-shot classification model")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    modes = subparsers.add_parser("modes", help="Latency and agreement of the classification modes vs sequential NLI")
+    modes.add_argument("--repeats", type=int, default=3)
+    modes.add_argument("--modes", nargs="+", default=["sequential", "fused", "embedding"],
+                       choices=main_model.CLASSIFICATION_MODES)
+
+    labels = subparsers.add_parser("labels", help="Topic pass time vs number of labels, NLI vs label embeddings")
+    labels.add_argument("--counts", type=int, nargs="+", default=[12, 100, 500])
+    labels.add_argument("--repeats", type=int, default=3)
+    labels.add_argument("--encoder", default=main_model.SENTENCE_ENCODER_MODEL)
+
+    keywords = subparsers.add_parser("keywords", help="Keyword screening time vs number of keywords")
+    keywords.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    keywords.add_argument("--repeats", type=int, default=20)
+
+    report = subparsers.add_parser("semantic-report", help="Semantic cache hit rate vs decision agreement")
+    report.add_argument("--log", help="Query log (.txt, .jsonl or .csv); defaults to example and paraphrased queries")
+    report.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    report.add_argument("--encoder", default=main_model.SENTENCE_ENCODER_MODEL)
+
+    backends = subparsers.add_parser("backends", help="Latency, memory and agreement per inference backend")
+    backends.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    backends.add_argument("--onnx-dir", default=None, help="Directory written by `inference_backends.py export`")
+    backends.add_argument("--repeats", type=int, default=3)
+
+    workers = subparsers.add_parser("workers", help="Throughput vs number of inference worker processes")
+    workers.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    workers.add_argument("--torch-threads", type=int, default=1, help="torch intra-op threads per worker")
+    workers.add_argument("--repeats", type=int, default=5)
+
+    users = subparsers.add_parser("users", help="User directory load time, memory and lookup latency")
+    users.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    users.add_argument("--lookups", type=int, default=10000)
+
+    authorization = subparsers.add_parser("authorization", help="Time per check of the compiled policy vs the legacy rules")
+    authorization.add_argument("--data", default="MOCK_DATA.csv", help="User CSV")
+    authorization.add_argument("--repeats", type=int, default=5)
+
+    audit = subparsers.add_parser("audit", help="Vectorized authorization audit time at each directory size")
+    audit.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+
+    pipeline = subparsers.add_parser("pipeline", help="Latency of denied and allowed requests in both pipeline orders")
+    pipeline.add_argument("--requests", type=int, default=20, help="Requests per group (denied, allowed)")
+    pipeline.add_argument("--repeats", type=int, default=3)
+
+    long_queries = subparsers.add_parser("long-queries", help="p50/p95/p99 latency with a heavy tail of long queries")
+    long_queries.add_argument("--queries", type=int, default=200)
+    long_queries.add_argument("--long-fraction", type=float, default=0.05)
+    long_queries.add_argument("--batch-size", type=int, default=8)
+    long_queries.add_argument("--max-tokens", type=int, default=128)
+    long_queries.add_argument("--strategy", choices=["head", "sentences"], default="head")
+
+    departments = subparsers.add_parser("departments", help="Time per query of the department resolver vs the original loops")
+    departments.add_argument("--alias-counts", type=int, nargs="+", default=[25, 250, 1000])
+    departments.add_argument("--repeats", type=int, default=3)
+
+    decisions = subparsers.add_parser("decision-log", help="Request time with the decision log vs synchronous logging")
+    decisions.add_argument("--data", default="MOCK_DATA.csv", help="User CSV (USER_DATA_PATH)")
+    decisions.add_argument("--requests", type=int, default=5000)
+    decisions.add_argument("--formats", nargs="+", choices=["jsonl", "parquet"], default=["jsonl", "parquet"])
+
+    deadlines = subparsers.add_parser("deadlines", help="Latency and decisions under load with a time budget")
+    deadlines.add_argument("--budgets", type=float, nargs="+", default=[300], help="Budgets in milliseconds")
+    deadlines.add_argument("--concurrency", type=int, default=8)
+    deadlines.add_argument("--requests", type=int, default=200)
+
+    startup = subparsers.add_parser("startup", help="Time to the first good response of a freshly started API")
+    startup.add_argument("--snapshot", help="Also start from this snapshot (python inference_backends.py snapshot)")
+    startup.add_argument("--repeats", type=int, default=3)
+    startup.add_argument("--warmup-queries", type=int, default=8)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "modes":
+        classifier = main_model.load_classifier(args.model)
+        benchmark_classification_modes(classifier, repeats=args.repeats, modes=args.modes)
+    elif args.benchmark == "labels":
+        classifier = main_model.load_classifier(args.model)
+        benchmark_label_scaling(classifier, load_sentence_encoder(args.encoder), counts=args.counts, repeats=args.repeats)
+    elif args.benchmark == "keywords":
+        benchmark_keyword_matching(sizes=args.sizes, repeats=args.repeats)
+    elif args.benchmark == "semantic-report":
+        queries = load_query_log(args.log) if args.log else main_model.EXAMPLE_QUERIES + PARAPHRASE_QUERIES
+        classifier = main_model.load_classifier(args.model)
+        semantic_cache_report(classifier, load_sentence_encoder(args.encoder), queries, thresholds=args.thresholds)
+    elif args.benchmark == "backends":
+        benchmark_backends(args.model, backends=args.backends, onnx_dir=args.onnx_dir, repeats=args.repeats)
+    elif args.benchmark == "users":
+        benchmark_user_directory(sizes=args.sizes, lookups=args.lookups)
+    elif args.benchmark == "authorization":
+        benchmark_authorization(args.data, repeats=args.repeats)
+    elif args.benchmark == "audit":
+        benchmark_audit(sizes=args.sizes)
+    elif args.benchmark == "pipeline":
+        benchmark_pipeline_order(args.model, requests=args.requests, repeats=args.repeats)
+    elif args.benchmark == "long-queries":
+        classifier = main_model.load_classifier(args.model)
+        benchmark_long_queries(classifier, _long_query_corpus(args.queries, args.long_fraction),
+                               batch_size=args.batch_size, max_tokens=args.max_tokens, strategy=args.strategy)
+    elif args.benchmark == "departments":
+        benchmark_department_resolver(alias_counts=args.alias_counts, repeats=args.repeats)
+    elif args.benchmark == "decision-log":
+        main_model.USER_DATA_PATH = args.data
+        benchmark_decision_log(args.data, requests=args.requests, formats=args.formats)
+    elif args.benchmark == "deadlines":
+        benchmark_deadlines(args.model, budgets_ms=args.budgets, concurrency=args.concurrency, requests=args.requests)
+    elif args.benchmark == "startup":
+        benchmark_startup(args.model, snapshot_dir=args.snapshot, repeats=args.repeats,
+                          warmup_queries=args.warmup_queries)
+    elif args.benchmark == "workers":
+        benchmark_worker_scaling(args.model, worker_counts=args.workers, torch_threads=args.torch_threads,
+                                 repeats=args.repeats)
+
+
+if __name__ == "__main__":
+    main()
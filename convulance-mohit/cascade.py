@@ -0,0 +1,81 @@
+import logging
+import pickle
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Tiers of the cascade, in the order they run
+CASCADE_TIERS = ("keywords", "small_model", "nli")
+
+# Class used for queries bart-large-mnli judged non-corporate under a corporate label
+NON_CORPORATE_CLASS = "non-corporate query"
+
+
+def training_target(result, corporate_labels):
+    """Map an is_corporate_related result to the class the small model learns.
+
+    Corporate results keep their label. Non-corporate results keep theirs unless
+    it is a corporate label, so every class implies a single decision.
+    """
+    is_corporate, label = result[0], result[1]
+    if is_corporate or label not in corporate_labels:
+        return label
+    return NON_CORPORATE_CLASS
+
+
+def load_cascade_model(path):
+    """Load a small model trained by train_cascade_model.py."""
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.error(f"Error loading cascade model from {path}: {e}")
+        raise
+
+
+def small_model_decisions(model, queries, corporate_labels, lower, upper):
+    """Score queries with the small model and settle the confident ones.
+
+    A query is settled when its corporate probability (summed over the
+    corporate classes) is above `upper` or below `lower`; queries inside the
+    band are left for the NLI pipeline.
+
+    Returns:
+        list: One (is_corporate, label, confidence, scores) tuple per query, or None if uncertain
+    """
+    classes = list(model.classes_)
+    corporate = [i for i, label in enumerate(classes) if label in corporate_labels]
+    decisions = []
+    for probabilities in model.predict_proba(queries):
+        corporate_probability = float(sum(probabilities[i] for i in corporate))
+        if lower <= corporate_probability <= upper:
+            decisions.append(None)
+            continue
+        is_corporate = corporate_probability > upper
+        side = [i for i in range(len(classes)) if (i in corporate) == is_corporate]
+        best = max(side, key=lambda i: probabilities[i])
+        scores = {classes[i]: float(probabilities[i]) for i in range(len(classes))}
+        decisions.append((is_corporate, classes[best], float(probabilities[best]), scores))
+    return decisions
+
+
+class TierCounter:
+    """Count how many queries each cascade tier settled."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(CASCADE_TIERS, 0)
+
+    def record(self, tier, count=1):
+        with self._lock:
+            self._counts[tier] += count
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            "counts": counts,
+            "fractions": {tier: count / total if total else 0.0 for tier, count in counts.items()},
+            "total": total,
+        }
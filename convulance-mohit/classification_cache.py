@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    """Normalize a query for cache lookups: casefold, collapse whitespace and punctuation."""
+    return re.sub(r"[\W_]+", " ", query.casefold()).strip()
+
+
+class ClassificationCache:
+    """Two-tier cache for classification results.
+
+    The first tier is a bounded in-process LRU, the second an optional SQLite
+    table that survives restarts. Entries older than `ttl_seconds` are ignored
+    in both tiers. Values must be JSON serializable.
+
+    Args:
+        max_entries (int): Capacity of the in-memory LRU
+        ttl_seconds (float): Entry lifetime, or None for no expiry
+        db_path (str): SQLite file for the persistent tier, or None for memory only
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=86400, db_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS classification_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(query, model_name, params):
+        """Build a cache key from the normalized query, the model name and the decision parameters."""
+        payload = json.dumps([normalize_query(query), model_name, params], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._entries.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM classification_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = json.loads(row[0]), row[1]
+                    if not self._expired(created_at):
+                        self._counters["sqlite_hits"] += 1
+                        self._store_memory(key, created_at, value)
+                        return value
+                    self._db.execute("DELETE FROM classification_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._counters["expirations"] += 1
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key, value):
+        """Store a value in both tiers."""
+        created_at = time.time()
+        with self._lock:
+            self._store_memory(key, created_at, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO classification_cache (key, value, created_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), created_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # The persistent tier is best effort; the memory tier still has the entry
+                    logger.warning(f"Failed to write classification cache entry: {e}")
+
+    def _store_memory(self, key, created_at, value):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self):
+        """Remove all entries from both tiers. Returns the number of in-memory entries removed."""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM classification_cache")
+                self._db.commit()
+        logger.info("Classification cache cleared")
+        return removed
+
+    def stats(self):
+        """Return hit/miss/eviction counters and tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            stats["ttl_seconds"] = self.ttl_seconds
+            stats["sqlite_entries"] = (
+                self._db.execute("SELECT COUNT(*) FROM classification_cache").fetchone()[0]
+                if self._db is not None else None
+            )
+        lookups = stats["memory_hits"] + stats["sqlite_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["sqlite_hits"]) / lookups if lookups else 0.0
+        return stats
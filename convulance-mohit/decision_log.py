@@ -0,0 +1,388 @@
+"""Append-only audit log of access decisions.
+
+Request handlers only put a record on a queue. A background thread writes the
+records in batches to compressed segments in a directory, one gzip member per
+batch for JSONL or one row group per batch for Parquet, and starts a new
+segment every day and after `segment_records` records. The functions at the
+end of the module read the segments back for audits, e.g. denials per
+department per day:
+
+    python decision_log.py decisions/ --decision unauthorized --by day requested_dept
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import date, datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMATS = ("jsonl", "parquet")
+
+SEGMENT_SUFFIXES = {"jsonl": ".jsonl.gz", "parquet": ".parquet"}
+
+# decisions-<day>-<time>-<pid>-<sequence><suffix>; the day lets readers skip whole segments
+_SEGMENT_NAME = re.compile(r"^decisions-(\d{8})-\d{6}-\d+-\d+(\.jsonl\.gz|\.parquet)$")
+
+# Fields of a decision record, in column order
+FIELDS = (
+    "timestamp", "user_id", "user_dept", "requested_dept", "label", "confidence",
+    "decision", "reason", "degraded_mode", "stages", "stage_ms", "query",
+)
+
+
+class StageTimer:
+    """Record the stages a request runs through and the milliseconds each took.
+
+    Args:
+        stages (list): Stages that already ran elsewhere, e.g. a batch classification
+    """
+
+    def __init__(self, stages=()):
+        self.stages = list(stages)
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.stages.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def decision_record(result, timings=None, timestamp=None):
+    """Build a decision record from a process_user_query result, decided at `timestamp` (seconds since the epoch)."""
+    decided_at = datetime.now(timezone.utc) if timestamp is None else datetime.fromtimestamp(timestamp, timezone.utc)
+    return {
+        "timestamp": decided_at.isoformat(timespec="milliseconds"),
+        "user_id": None if result.get("user_id") is None else str(result["user_id"]),
+        "user_dept": result.get("user_dept") or None,
+        "requested_dept": result.get("requested_dept") or None,
+        "label": result.get("label"),
+        "confidence": result.get("confidence"),
+        "decision": result.get("status"),
+        "reason": result.get("auth_reason") or result.get("message"),
+        "degraded_mode": result.get("degraded_mode"),
+        "stages": list(result.get("stages", [])),
+        "stage_ms": dict(timings or {}),
+        "query": result.get("query"),
+    }
+
+
+class _JsonlSegment:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def write(self, records):
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        # Each batch is a complete gzip member, so readers can read the segment while it grows
+        self._file.write(gzip.compress(lines.encode("utf-8"), compresslevel=6))
+        self._file.flush()
+
+    def close(self):
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class _ParquetSegment:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = pa.schema([
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("user_id", pa.string()),
+            ("user_dept", pa.string()),
+            ("requested_dept", pa.string()),
+            ("label", pa.string()),
+            ("confidence", pa.float64()),
+            ("decision", pa.string()),
+            ("reason", pa.string()),
+            ("degraded_mode", pa.string()),
+            ("stages", pa.list_(pa.string())),
+            ("stage_ms", pa.map_(pa.string(), pa.float64())),
+            ("query", pa.string()),
+        ])
+        self.path = path
+        # Parquet files are only readable once their footer is written, so the open segment is a .tmp file
+        self._writer = pq.ParquetWriter(path + ".tmp", self.schema, compression="zstd")
+
+    def write(self, records):
+        import pyarrow as pa
+
+        rows = [
+            {**record, "timestamp": datetime.fromisoformat(record["timestamp"]), "stage_ms": list(record["stage_ms"].items())}
+            for record in records
+        ]
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+class DecisionLog:
+    """Write decision records to rotating segments from a background thread.
+
+    `record` only puts the result on a queue; the record is built, encoded
+    and compressed on the writer thread. It never blocks: when the queue is
+    full the decision is dropped and counted in `stats()["dropped"]`, so a
+    slow disk cannot hold up requests.
+
+    Args:
+        directory (str): Directory of the segments, created if missing
+        fmt (str): One of LOG_FORMATS
+        batch_size (int): Most records written at a time
+        flush_seconds (float): Longest a record waits before its batch is written
+        segment_records (int): Records per segment before a new one is started
+        queue_size (int): Most records waiting to be written
+    """
+
+    def __init__(self, directory, fmt="jsonl", batch_size=256, flush_seconds=1.0, segment_records=100000,
+                 queue_size=10000):
+        if fmt not in LOG_FORMATS:
+            raise ValueError(f"Unknown decision log format '{fmt}', expected one of {LOG_FORMATS}")
+        self.directory = directory
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.segment_records = segment_records
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._segment = None
+        self._segment_day = None
+        self._segment_count = 0
+        self._sequence = 0
+        self._stats = {"recorded": 0, "written": 0, "dropped": 0, "segments": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="decision-log", daemon=True)
+            self._thread.start()
+        return self
+
+    def record(self, result, timings=None):
+        """Queue a shallow copy of a process_user_query result and its stage timings.
+
+        The copy is taken now, so callers may go on filling in the result for
+        their response without changing what is logged.
+
+        Returns:
+            bool: False if the decision was dropped because the queue is full
+        """
+        try:
+            self._queue.put_nowait((time.time(), dict(result), timings))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("recorded")
+        return True
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def close(self):
+        """Write every queued record, close the open segment and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    try:
+                        record = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            if batch:
+                self._write(batch)
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _write(self, batch):
+        try:
+            batch = [decision_record(result, timings, timestamp) for timestamp, result, timings in batch]
+            while batch:
+                day = batch[0]["timestamp"][:10]
+                if self._segment is None or day != self._segment_day or self._segment_count >= self.segment_records:
+                    self._rotate(day)
+                # Records of one segment share a day and stay within segment_records
+                size = min(self.segment_records - self._segment_count, len(batch))
+                end = next((i for i, record in enumerate(batch[:size]) if record["timestamp"][:10] != day), size)
+                self._segment.write(batch[:end])
+                self._segment_count += end
+                self._count("written", end)
+                batch = batch[end:]
+        except Exception as e:
+            self._count("errors")
+            logger.error(f"Error writing decision log batch: {e}")
+
+    def _rotate(self, day):
+        if self._segment is not None:
+            self._segment.close()
+        now = datetime.now(timezone.utc)
+        name = (f"decisions-{day.replace('-', '')}-{now:%H%M%S}-{os.getpid()}-{self._sequence:05d}"
+                f"{SEGMENT_SUFFIXES[self.fmt]}")
+        path = os.path.join(self.directory, name)
+        self._segment = (_JsonlSegment if self.fmt == "jsonl" else _ParquetSegment)(path)
+        self._segment_day = day
+        self._segment_count = 0
+        self._sequence += 1
+        self._count("segments")
+
+
+# --- Reading the log ---
+
+def decision_segments(directory, start=None, end=None):
+    """Paths of the finished and growing segments in a directory, oldest first.
+
+    Segments whose day is outside [start, end] (dates, inclusive) are skipped
+    without being opened.
+    """
+    segments = []
+    for name in sorted(os.listdir(directory)):
+        match = _SEGMENT_NAME.match(name)
+        if not match:
+            continue
+        day = datetime.strptime(match.group(1), "%Y%m%d").date()
+        if (start is None or day >= start) and (end is None or day <= end):
+            segments.append(os.path.join(directory, name))
+    return segments
+
+
+def _read_jsonl_segment(path):
+    records = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                records.append(json.loads(line))
+    except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+        # The last batch was cut off, e.g. by a crash while it was written; keep the complete lines before it
+        pass
+    return records
+
+
+def read_decisions(directory, start=None, end=None, columns=None):
+    """Read decision records into a DataFrame, with a parsed `timestamp` and a `day` column.
+
+    Args:
+        directory (str): Decision log directory
+        start (date): First day to read, None for the oldest
+        end (date): Last day to read, None for the newest
+        columns (list): Fields to read (Parquet segments only read these), None for all
+
+    Returns:
+        pd.DataFrame: One row per decision
+    """
+    import pandas as pd
+
+    wanted = list(FIELDS) if columns is None else list(dict.fromkeys(["timestamp", *columns]))
+    frames = []
+    for path in decision_segments(directory, start, end):
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            frame = pq.read_table(path, columns=wanted).to_pandas()
+            # Same Python types as the JSONL segments give
+            if "stages" in frame:
+                frame["stages"] = frame["stages"].map(list)
+            if "stage_ms" in frame:
+                frame["stage_ms"] = frame["stage_ms"].map(dict)
+            frames.append(frame)
+        else:
+            frames.append(pd.DataFrame(_read_jsonl_segment(path), columns=wanted))
+    if not frames:
+        return pd.DataFrame(columns=[*wanted, "day"])
+    decisions = pd.concat(frames, ignore_index=True)
+    decisions["timestamp"] = pd.to_datetime(decisions["timestamp"], utc=True)
+    decisions["day"] = decisions["timestamp"].dt.date
+    return decisions
+
+
+def count_decisions(directory, by=("day", "requested_dept"), decision=None, start=None, end=None):
+    """Count decisions grouped by fields, e.g. denials per department per day.
+
+    Args:
+        directory (str): Decision log directory
+        by (tuple): Fields to group by; "day" is the UTC day of the decision
+        decision (str): Only count this decision ("approved", "rejected", "unauthorized", "error"), None for all
+        start (date): First day to count
+        end (date): Last day to count
+
+    Returns:
+        pd.DataFrame: The `by` columns and a `count` column, largest count first
+    """
+    by = list(by)
+    columns = [field for field in by if field != "day"] + (["decision"] if decision else [])
+    decisions = read_decisions(directory, start, end, columns=columns)
+    if decision:
+        decisions = decisions[decisions["decision"] == decision]
+    counts = decisions.groupby(by, dropna=False).size().reset_index(name="count")
+    return counts.sort_values(["count", *by], ascending=[False, *[True] * len(by)], ignore_index=True)
+
+
+def stage_latency(directory, percentiles=(0.5, 0.95, 0.99), start=None, end=None):
+    """Milliseconds per stage at the given percentiles, with the number of requests that ran each stage."""
+    import pandas as pd
+
+    decisions = read_decisions(directory, start, end, columns=["stage_ms"])
+    timings = [stage_ms for stage_ms in decisions["stage_ms"] if isinstance(stage_ms, dict) and stage_ms]
+    if not timings:
+        return pd.DataFrame(columns=["stage", "count", *[f"p{round(p * 100)}_ms" for p in percentiles]])
+    frame = pd.DataFrame(timings)
+    rows = []
+    for stage in frame.columns:
+        values = frame[stage].dropna()
+        rows.append({"stage": stage, "count": len(values),
+                     **{f"p{round(p * 100)}_ms": values.quantile(p) for p in percentiles}})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the access decision log")
+    parser.add_argument("directory", help="Decision log directory (DECISION_LOG_DIR)")
+    parser.add_argument("--by", nargs="+", default=["day", "requested_dept"],
+                        help="Fields to count by, e.g. day requested_dept, user_id, decision")
+    parser.add_argument("--decision", help="Only count this decision, e.g. unauthorized")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--stages", action="store_true", help="Show per-stage latency percentiles instead of counts")
+    args = parser.parse_args()
+
+    if args.stages:
+        print(stage_latency(args.directory, start=args.start, end=args.end).to_string(index=False))
+    else:
+        counts = count_decisions(args.directory, by=args.by, decision=args.decision, start=args.start, end=args.end)
+        print(counts.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Choose how much of the classifier a request can afford before its deadline.
+
+The full path runs the domain pass and the multi-label topic pass. When the
+time left (after waiting for the inference queue) is too short for that,
+only the domain pass runs; when even that would not fit, only the keyword
+rules decide. Pass durations are estimated from recent calls.
+"""
+import threading
+
+DEGRADED_MODES = ("full", "domain_only", "keywords_only")
+
+
+class PassLatency:
+    """Moving average of how long each classifier pass took recently, in seconds.
+
+    Args:
+        alpha (float): Weight of the latest observation
+    """
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._estimates = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            previous = self._estimates.get(name)
+            self._estimates[name] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def estimate(self, name, default=0.0):
+        """Estimated seconds for the pass, `default` before it was first observed."""
+        with self._lock:
+            return self._estimates.get(name, default)
+
+    def stats(self):
+        with self._lock:
+            return {name: seconds * 1000 for name, seconds in self._estimates.items()}
+
+
+def choose_degraded_mode(remaining, queue_wait, latency, safety=1.2, domain_share=0.15):
+    """Pick the most complete mode expected to finish in the remaining seconds.
+
+    Both model paths wait for the inference queue, so the queue wait counts
+    towards the full path and the domain pass alike.
+
+    Args:
+        remaining (float): Seconds left before the deadline, None for no deadline
+        queue_wait (float): Expected seconds before the inference queue starts the request
+        latency (PassLatency): Recent durations of the "full" and "domain" passes
+        safety (float): Margin the estimates are multiplied by
+        domain_share (float): Share of the full path the domain pass is assumed to take until it is timed
+
+    Returns:
+        str: One of DEGRADED_MODES
+    """
+    if remaining is None:
+        return "full"
+    full = latency.estimate("full")
+    if remaining >= (queue_wait + full) * safety:
+        return "full"
+    if remaining >= (queue_wait + latency.estimate("domain", full * domain_share)) * safety:
+        return "domain_only"
+    return "keywords_only"
+
+
+class DegradationCounter:
+    """Count the requests classified in each mode and those that finished after their deadline."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(DEGRADED_MODES, 0)
+        self._deadline_requests = 0
+        self._missed = 0
+
+    def record(self, mode):
+        with self._lock:
+            self._counts[mode] += 1
+
+    def record_deadline(self, missed):
+        with self._lock:
+            self._deadline_requests += 1
+            self._missed += bool(missed)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            deadline_requests, missed = self._deadline_requests, self._missed
+        total = sum(counts.values())
+        return {
+            "counts": counts,
+            "rates": {mode: count / total if total else 0.0 for mode, count in counts.items()},
+            "degraded_rate": (total - counts["full"]) / total if total else 0.0,
+            "total": total,
+            "deadline_requests": deadline_requests,
+            "deadline_missed": missed,
+            "deadline_miss_rate": missed / deadline_requests if deadline_requests else 0.0,
+        }
@@ -0,0 +1,190 @@
+"""Resolve the department a query asks about.
+
+A resolver is built once from the department aliases. Exact alias mentions
+are found in one scan of a keyword trie. The indicator phrases ("data from
+...", "... department") are compiled once, and their captured phrase is
+matched with a dict lookup and a substring index instead of a loop over
+every alias. Optionally, a captured phrase that names no department goes
+through a character trigram index, so misspellings such as "the enginering
+team" or "data from acounting" resolve. Only captured phrases are matched
+fuzzily: ordinary words elsewhere in a query ("supporting", "service",
+"researchers") are too close to department names.
+"""
+import json
+import logging
+import re
+from collections import Counter, defaultdict
+
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Phrases that usually surround a department name, tried in this order
+DEPARTMENT_INDICATORS = [
+    re.compile(r'\bdata\s+from\s+(\w+\s*\w*)\b'),
+    re.compile(r'\bget\s+(\w+\s*\w*)\s+information\b'),
+    re.compile(r'\baccess\s+to\s+(\w+\s*\w*)\b'),
+    re.compile(r'\b(\w+\s*\w*)\s+department\b'),
+    re.compile(r'\b(\w+\s*\w*)\s+team\b'),
+    re.compile(r'\bfrom\s+(\w+\s*\w*)\s+department\b'),
+    re.compile(r'\bfor\s+(\w+\s*\w*)\s+department\b'),
+]
+
+# Words shorter than this are never matched fuzzily ("hr", "pm" and "law" are too easy to hit by accident)
+FUZZY_MIN_LENGTH = 4
+
+# Trigram similarity that catches single-letter misspellings of the built-in departments; fuzzy matching is off by default
+FUZZY_THRESHOLD = 0.7
+
+
+def _trigrams(text):
+    padded = f"#{text}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_department_config(path):
+    """Load departments and aliases from a JSON file.
+
+    The file has the form:
+
+        {
+            "departments": ["Engineering", "Human Resources", ...],
+            "aliases": {"eng": "Engineering", "hr": "Human Resources", ...}
+        }
+
+    Aliases are tried in file order, like DEPARTMENT_MAPPING.
+
+    Returns:
+        tuple: (list of departments, dict of alias -> department)
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        aliases = config.get("aliases", {})
+        return config.get("departments", sorted(set(aliases.values()))), aliases
+    except Exception as e:
+        logger.error(f"Error loading department config from {path}: {e}")
+        raise
+
+
+class DepartmentResolver:
+    """Map a query to the canonical name of the department it asks about.
+
+    Resolution runs in three steps, the first two giving the same answer as
+    the original loops over the alias mapping:
+
+    1. The first alias, in mapping order, mentioned as whole words
+    2. The first indicator phrase whose captured words equal an alias, contain
+       one or are part of one (the earliest such alias in mapping order)
+    3. Only with `fuzzy_threshold`: the closest department name or alias to
+       any word sequence of a phrase captured in step 2 by trigram
+       similarity, if it reaches `fuzzy_threshold` and starts with the same
+       letter
+
+    Args:
+        aliases (dict): Alias -> canonical department name, in priority order
+        departments (list): Canonical department names, also matched fuzzily
+        fuzzy_threshold (float): Minimum Dice similarity of trigrams for step 3, None to skip it
+            (FUZZY_THRESHOLD suits the built-in departments)
+    """
+
+    def __init__(self, aliases, departments=(), fuzzy_threshold=None):
+        self.aliases = {}
+        for alias, name in aliases.items():
+            self.aliases.setdefault(alias.lower(), name)
+        self.departments = list(departments)
+        self.fuzzy_threshold = fuzzy_threshold
+
+        # Categories are the aliases themselves, so priority follows mapping order
+        by_alias = {alias: [alias] for alias in self.aliases}
+        self._mentioned = KeywordMatcher(by_alias)
+        self._contained = KeywordMatcher(by_alias, word_boundary=False)
+        self._priority = {alias: i for i, alias in enumerate(self.aliases)}
+        # Every substring of every alias -> the first alias containing it
+        self._containing = {}
+        for alias in self.aliases:
+            for start in range(len(alias)):
+                for end in range(start + 1, len(alias) + 1):
+                    self._containing.setdefault(alias[start:end], alias)
+
+        terms = dict.fromkeys(dept.lower() for dept in self.departments)
+        terms.update({alias: None for alias in self.aliases})
+        # Trigram postings per first letter, since a fuzzy match must keep the first letter
+        self._terms = []
+        self._trigram_index = defaultdict(lambda: defaultdict(list))
+        for term in terms:
+            if len(term) < FUZZY_MIN_LENGTH:
+                continue
+            name = self.aliases.get(term) or next(dept for dept in self.departments if dept.lower() == term)
+            term_id = len(self._terms)
+            grams = _trigrams(term)
+            self._terms.append((term, name, len(grams), len(term.split())))
+            for gram in grams:
+                self._trigram_index[term[0]][gram].append(term_id)
+        self._trigram_index = {letter: dict(postings) for letter, postings in self._trigram_index.items()}
+        self._word_counts = sorted({words for _, _, _, words in self._terms})
+
+    def resolve(self, query):
+        """Return the canonical department name the query asks about, or None."""
+        query = query.lower().strip()
+
+        hit = self._mentioned.first(query)
+        if hit:
+            logger.debug("Found department mention: %s", self.aliases[hit[1]])
+            return self.aliases[hit[1]]
+
+        phrases = []
+        for pattern in DEPARTMENT_INDICATORS:
+            for match in pattern.finditer(query):
+                phrase = match.group(1).strip()
+                name = self._match_phrase(phrase)
+                if name:
+                    return name
+                phrases.append(phrase)
+
+        if self.fuzzy_threshold is not None and phrases:
+            return self._fuzzy_match(phrases)
+        return None
+
+    def _match_phrase(self, phrase):
+        if not phrase:
+            return None
+        if phrase in self.aliases:
+            return self.aliases[phrase]
+        candidates = []
+        contained = self._contained.first(phrase)
+        if contained:
+            candidates.append(contained[1])
+        if phrase in self._containing:
+            candidates.append(self._containing[phrase])
+        if not candidates:
+            return None
+        return self.aliases[min(candidates, key=self._priority.__getitem__)]
+
+    def _fuzzy_match(self, phrases):
+        """Closest department to any word sequence of the captured phrases, or None below the threshold."""
+        candidates = dict.fromkeys(
+            " ".join(words[start:start + count])
+            for words in (re.findall(r"\w+", phrase) for phrase in phrases)
+            for count in self._word_counts
+            for start in range(len(words) - count + 1)
+        )
+        best = None
+        for candidate in candidates:
+            postings = self._trigram_index.get(candidate[0])
+            if postings is None or len(candidate) < FUZZY_MIN_LENGTH:
+                continue
+            grams = _trigrams(candidate)
+            shared = Counter()
+            for gram in grams:
+                if gram in postings:
+                    shared.update(postings[gram])
+            for term_id, common in shared.items():
+                _, name, term_grams, _ = self._terms[term_id]
+                score = 2.0 * common / (len(grams) + term_grams)
+                if score >= self.fuzzy_threshold and (best is None or (score, -term_id) > best[:2]):
+                    best = (score, -term_id, candidate, name)
+        if best is None:
+            return None
+        logger.info(f"Resolved '{best[2]}' to department {best[3]} (similarity {best[0]:.2f})")
+        return best[3]
@@ -0,0 +1,26 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SENTENCE_ENCODER = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def load_sentence_encoder(model_name=DEFAULT_SENTENCE_ENCODER):
+    """Load a small CPU sentence-embedding model."""
+    try:
+        from sentence_transformers import SentenceTransformer
+        logger.info(f"Loading sentence encoder {model_name}...")
+        return SentenceTransformer(model_name, device="cpu")
+    except Exception as e:
+        logger.error(f"Error loading sentence encoder: {e}")
+        raise
+
+
+def encode(encoder, texts):
+    """Embed texts as L2-normalized float32 rows, so dot products are cosine similarities."""
+    return encoder.encode(
+        list(texts),
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    ).astype("float32")
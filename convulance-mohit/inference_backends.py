@@ -0,0 +1,190 @@
+"""Inference backends for the zero-shot classification pipeline.
+
+Every backend returns a regular transformers zero-shot pipeline, so results
+keep the usual `labels`/`scores` structure:
+
+- torch-fp32: the full-precision PyTorch model
+- torch-int8-dynamic: PyTorch with dynamic int8 quantization of the Linear layers
+- onnxruntime: an ONNX graph exported with `python inference_backends.py export`
+
+The torch backends can load from a local snapshot written by
+`python inference_backends.py snapshot`: safetensors weights and a fast
+tokenizer in one directory, read without contacting the Hugging Face Hub.
+"""
+import argparse
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch-fp32", "torch-int8-dynamic", "onnxruntime")
+DEFAULT_BACKEND = os.getenv("CLASSIFIER_BACKEND", "torch-fp32")
+DEFAULT_ONNX_DIR = os.getenv("CLASSIFIER_ONNX_DIR", "onnx_model")
+DEFAULT_SNAPSHOT_DIR = os.getenv("CLASSIFIER_SNAPSHOT_DIR")  # unset loads the model by name
+SNAPSHOT_MANIFEST = "snapshot.json"
+
+
+def read_snapshot_manifest(snapshot_dir):
+    """Return the manifest of a snapshot directory, or None if there is no usable snapshot there."""
+    try:
+        with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_snapshot(model_name, snapshot_dir):
+    """Load the model and tokenizer from a snapshot of model_name, or return None to load it by name."""
+    manifest = read_snapshot_manifest(snapshot_dir)
+    if manifest is None:
+        logger.warning(f"No model snapshot in '{snapshot_dir}', loading {model_name} by name")
+        return None
+    if manifest.get("model") != model_name:
+        logger.warning(
+            f"Snapshot in '{snapshot_dir}' is of {manifest.get('model')}, not {model_name}; loading {model_name} by name"
+        )
+        return None
+
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        snapshot_dir, local_files_only=True, low_cpu_mem_usage=True
+    )
+    tokenizer = AutoTokenizer.from_pretrained(snapshot_dir, local_files_only=True)
+    # Keep the model's own name, which caches key their entries on
+    model.name_or_path = model_name
+    return model, tokenizer
+
+
+def import_backend(backend=None):
+    """Import the libraries a backend runs on, which takes seconds for transformers and torch.
+
+    build_zero_shot_pipeline imports them itself; this only lets a service
+    time the imports apart from loading the weights.
+    """
+    import transformers.pipelines  # noqa: F401
+
+    if (backend or DEFAULT_BACKEND) == "onnxruntime":
+        import optimum.onnxruntime  # noqa: F401
+
+
+def build_zero_shot_pipeline(model_name, backend=None, onnx_dir=None, snapshot_dir=None):
+    """Build a zero-shot classification pipeline on the given backend.
+
+    Args:
+        model_name (str): Hugging Face model name or local path (torch backends)
+        backend (str): One of BACKENDS, defaults to CLASSIFIER_BACKEND
+        onnx_dir (str): Directory written by export_onnx (onnxruntime backend)
+        snapshot_dir (str): Directory written by export_snapshot (torch backends), defaults to CLASSIFIER_SNAPSHOT_DIR
+    """
+    from transformers import pipeline
+
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == "onnxruntime":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        onnx_dir = onnx_dir or DEFAULT_ONNX_DIR
+        if not os.path.isdir(onnx_dir):
+            raise FileNotFoundError(
+                f"ONNX model directory '{onnx_dir}' not found, run `python inference_backends.py export` first"
+            )
+        model = ORTModelForSequenceClassification.from_pretrained(onnx_dir)
+        tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        classifier = pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+    else:
+        snapshot_dir = snapshot_dir or DEFAULT_SNAPSHOT_DIR
+        snapshot = _load_snapshot(model_name, snapshot_dir) if snapshot_dir else None
+        if snapshot is not None:
+            model, tokenizer = snapshot
+            classifier = pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+        else:
+            classifier = pipeline("zero-shot-classification", model=model_name)
+        if backend == "torch-int8-dynamic":
+            import torch
+            classifier.model = torch.ao.quantization.quantize_dynamic(
+                classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
+    # Recorded so caches and benchmarks can tell backends apart
+    classifier.inference_backend = backend
+    return classifier
+
+
+def export_onnx(model_name, output_dir=DEFAULT_ONNX_DIR, local_files_only=True):
+    """Export a locally cached model to an ONNX graph plus tokenizer files in output_dir."""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    try:
+        logger.info(f"Exporting {model_name} to ONNX in {output_dir}...")
+        model = ORTModelForSequenceClassification.from_pretrained(
+            model_name, export=True, local_files_only=local_files_only
+        )
+        tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_files_only)
+        model.save_pretrained(output_dir)
+        tokenizer.save_pretrained(output_dir)
+        logger.info("ONNX export finished")
+    except Exception as e:
+        logger.error(f"Error exporting model to ONNX: {e}")
+        raise
+
+
+def export_snapshot(model_name, output_dir, local_files_only=True):
+    """Write a model and its fast tokenizer to output_dir as a snapshot build_zero_shot_pipeline loads offline.
+
+    The weights are saved as safetensors, which load without unpickling, and
+    snapshot.json records which model the directory holds.
+    """
+    import transformers
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    try:
+        logger.info(f"Writing a snapshot of {model_name} to {output_dir}...")
+        model = AutoModelForSequenceClassification.from_pretrained(model_name, local_files_only=local_files_only)
+        tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True, local_files_only=local_files_only)
+        model.save_pretrained(output_dir, safe_serialization=True)
+        tokenizer.save_pretrained(output_dir)
+        manifest = {
+            "model": model_name,
+            "transformers_version": transformers.__version__,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        with open(os.path.join(output_dir, SNAPSHOT_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        logger.info("Snapshot written")
+    except Exception as e:
+        logger.error(f"Error writing model snapshot: {e}")
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Export a locally cached model to ONNX")
+    export.add_argument("--model", default="facebook/bart-large-mnli")
+    export.add_argument("--output", default=DEFAULT_ONNX_DIR)
+    export.add_argument("--allow-download", action="store_true", help="Download the model if it is not cached")
+
+    snapshot = subparsers.add_parser("snapshot", help="Write a local snapshot the torch backends load offline")
+    snapshot.add_argument("--model", default="facebook/bart-large-mnli")
+    snapshot.add_argument("--output", default=DEFAULT_SNAPSHOT_DIR or "model_snapshot")
+    snapshot.add_argument("--allow-download", action="store_true", help="Download the model if it is not cached")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "export":
+        export_onnx(args.model, args.output, local_files_only=not args.allow_download)
+    elif args.command == "snapshot":
+        export_snapshot(args.model, args.output, local_files_only=not args.allow_download)
+
+
+if __name__ == "__main__":
+    main()
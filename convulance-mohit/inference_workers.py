@@ -0,0 +1,182 @@
+"""Pool of forked inference worker processes sharing the parent's model weights.
+
+The API process loads the classifier once and forks the workers afterwards, so
+the weights are shared copy-on-write instead of loaded once per process. The
+API process keeps the classification result cache, the keyword screening and
+the semantic cache, and sends the queries left for the NLI passes to the
+workers through the pool's local task queue. Workers count cascade tiers per
+task and the API process adds them to its own counter, so its stats cover
+every worker. Each worker can run a warm-up
+batch when it starts, and start() waits until every worker has done so.
+"""
+import gc
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import main_model
+from cascade import TierCounter
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))  # 0 runs inference in the API process
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "1"))
+WORKER_START_TIMEOUT = float(os.getenv("WORKER_START_TIMEOUT", "600"))
+
+
+def _preload_models():
+    """Build everything main_model loads lazily before forking, so workers inherit it instead of loading their own copy.
+
+    The semantic cache is only used by this process, but loading its encoder
+    now keeps the first request from paying for it.
+    """
+    main_model.get_semantic_cache()
+    if main_model.CLASSIFICATION_MODE == "embedding":
+        main_model.get_label_embedding_classifier()
+    if main_model.CLASSIFICATION_MODE == "cascade":
+        main_model.get_cascade_model()
+
+
+def _init_worker(torch_threads, warmup_queries, started):
+    import torch
+    torch.set_num_threads(torch_threads)
+    if warmup_queries:
+        main_model.warm_up_classifier(main_model.classifier, warmup_queries)
+    started.release()
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def _classify_in_worker(queries, confidence_threshold, mode, full_queries):
+    """Run the NLI passes for a batch and return (results, cascade tier counts of this batch)."""
+    main_model.cascade_tiers = TierCounter()
+    results = main_model._nli_classify_batch(queries, main_model.classifier, confidence_threshold, mode, full_queries)
+    return results, main_model.cascade_tiers.stats()["counts"]
+
+
+def _domain_pass_in_worker(queries):
+    return main_model.domain_pass(queries, main_model.classifier)
+
+
+class InferenceWorkerPool:
+    """Run the NLI passes for uncached classifications in forked worker processes.
+
+    Args:
+        num_workers (int): Number of worker processes
+        torch_threads (int): torch intra-op threads per worker
+        warmup_queries (int): Example queries each worker classifies before start() returns
+    """
+
+    def __init__(self, num_workers, torch_threads=1, warmup_queries=0):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.num_workers = num_workers
+        self.torch_threads = torch_threads
+        self.warmup_queries = warmup_queries
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {"tasks": 0, "queries": 0, "in_flight": 0}
+
+    def start(self):
+        """Fork the workers. The classifier must already be loaded in main_model."""
+        if self._executor is not None:
+            return
+        if main_model.classifier is None:
+            raise RuntimeError("Load the classifier before starting inference workers")
+        _preload_models()
+        # Keep the loaded objects out of the garbage collector's reach so their
+        # pages are not written to (and copied) in every worker
+        gc.freeze()
+        context = multiprocessing.get_context("fork")
+        # Released once by each worker after its warm-up; passed by fork, so it needs no pickling
+        started = context.Semaphore(0)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.torch_threads, self.warmup_queries, started)
+        )
+        # With fork, every worker is started on the first submission
+        ready = self._executor.submit(_worker_ready)
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        warmed = 0
+        while warmed < self.num_workers:
+            if started.acquire(timeout=0.5):
+                warmed += 1
+            elif ready.done() and ready.exception() is not None:
+                # A worker died while starting, which breaks the whole pool
+                self.stop()
+                raise RuntimeError(f"Inference workers failed to start: {ready.exception()}")
+            elif time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Inference workers did not start within {WORKER_START_TIMEOUT:.0f}s")
+        ready.result()
+        logger.info(f"Started {self.num_workers} inference workers ({self.torch_threads} torch threads each)")
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            gc.unfreeze()
+
+    def _submit(self, fn, queries, *args):
+        """Queue fn(queries, *args) for the next free worker and return its concurrent.futures.Future."""
+        if self._executor is None:
+            raise RuntimeError("Inference workers are not running")
+        task = self._executor.submit(fn, queries, *args)
+        with self._lock:
+            self._stats["tasks"] += 1
+            self._stats["queries"] += len(queries)
+            self._stats["in_flight"] += 1
+        task.add_done_callback(self._task_done)
+        return task
+
+    def submit(self, queries, confidence_threshold=0.45, mode=None, full_queries=None):
+        """Queue a batch of keyword-screened queries for the next free worker.
+
+        `queries` are the texts the model classifies and `full_queries` the
+        untruncated queries for the keyword rules, as for main_model._nli_classify_batch.
+
+        Returns:
+            concurrent.futures.Future: The NLI results, in input order
+        """
+        task = self._submit(
+            _classify_in_worker, queries, confidence_threshold, mode or main_model.CLASSIFICATION_MODE, full_queries
+        )
+        future = Future()
+        task.add_done_callback(lambda task: self._forward_results(task, future))
+        return future
+
+    def classify_batch(self, queries, confidence_threshold=0.45, mode=None, full_queries=None):
+        """Run the NLI passes for a batch in a worker, blocking until it is done."""
+        return self.submit(queries, confidence_threshold, mode, full_queries).result()
+
+    def domain_pass(self, queries):
+        """Run only the domain pass for a batch in a worker, as for the degraded domain_only mode, blocking until it is done."""
+        return self._submit(_domain_pass_in_worker, queries).result()
+
+    def _task_done(self, _):
+        with self._lock:
+            self._stats["in_flight"] -= 1
+
+    def _forward_results(self, task, future):
+        """Add a finished batch's cascade tier counts to this process's counter and pass its results on."""
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            results, tier_counts = task.result()
+            for tier, count in tier_counts.items():
+                if count:
+                    main_model.cascade_tiers.record(tier, count)
+            future.set_result(results)
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.num_workers, "torch_threads": self.torch_threads, **self._stats}
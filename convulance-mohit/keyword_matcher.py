@@ -0,0 +1,135 @@
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+def _trie_pattern(keywords):
+    """Build a regex alternation for the keywords, factored by common prefix.
+
+    A flat `a|b|c` alternation tries every keyword at every position, while the
+    prefix-factored form only follows branches that match the text so far, so
+    matching cost stays roughly flat as the keyword list grows.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        # Greedy, so the longest keyword at a position is tried first
+        return group + "?" if is_end else group
+
+    return build(trie)
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+def _ends_at_boundary(text, index):
+    """True if a regex word boundary sits between text[index - 1] and text[index]."""
+    return _is_word_char(text[index - 1]) != _is_word_char(text[index])
+
+
+class KeywordMatcher:
+    """Precompiled multi-keyword matcher.
+
+    All keywords of all categories are compiled into one regex, so a single
+    scan of the text finds every hit together with its category.
+
+    Args:
+        keywords_by_category (dict): Category name -> list of keywords. The order
+            of categories and keywords defines their priority in `first()`.
+        word_boundary (bool): Match whole words only (like r'\\bkeyword\\b'),
+            otherwise match keywords anywhere in the text (like `keyword in text`).
+    """
+
+    def __init__(self, keywords_by_category, word_boundary=True):
+        self.word_boundary = word_boundary
+        self._entries = {}  # keyword -> (priority, category)
+        for category, keywords in keywords_by_category.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and keyword not in self._entries:
+                    self._entries[keyword] = (len(self._entries), category)
+
+        # At any position only the longest keyword is reported, so remember the
+        # highest-priority keyword among each keyword's whole-word prefixes
+        self._best_prefix = {}
+        for keyword, entry in self._entries.items():
+            best = (entry[0], keyword)
+            for end in range(1, len(keyword)):
+                prefix = keyword[:end]
+                if prefix in self._entries and (not word_boundary or _ends_at_boundary(keyword, end)):
+                    best = min(best, (self._entries[prefix][0], prefix))
+            self._best_prefix[keyword] = best[1]
+
+        if self._entries:
+            body = _trie_pattern(self._entries)
+            if word_boundary:
+                body = r"\b(" + body + r")\b"
+            else:
+                body = "(" + body + ")"
+            # Zero-width lookahead so overlapping hits at every position are found
+            self._pattern = re.compile("(?=" + body + ")")
+        else:
+            self._pattern = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def find_all(self, text):
+        """Return every (keyword, category) hit in the text, in text order."""
+        if self._pattern is None:
+            return []
+        return [(match.group(1), self._entries[match.group(1)][1]) for match in self._pattern.finditer(text)]
+
+    def first(self, text):
+        """Return the hit whose keyword comes first in the configured order, or None.
+
+        This is the hit a loop over categories and keywords (in order) would find first.
+        """
+        best = None
+        for keyword, _ in self.find_all(text):
+            keyword = self._best_prefix[keyword]
+            entry = self._entries[keyword]
+            if best is None or entry[0] < best[0]:
+                best = (entry[0], keyword, entry[1])
+        return (best[1], best[2]) if best else None
+
+    def search(self, text):
+        """Return True if any keyword occurs in the text."""
+        return self._pattern is not None and self._pattern.search(text) is not None
+
+
+def load_keyword_config(path):
+    """Load keyword lists from a JSON file.
+
+    The file has the form:
+
+        {
+            "non_corporate": {"food": ["pancake", "recipe"], ...},
+            "corporate": ["employee", "salary", ...]
+        }
+
+    Returns:
+        tuple: (non-corporate keywords by category, list of corporate keywords)
+    """
+    try:
+        with open(path) as f:
+            config = json.load(f)
+        return config.get("non_corporate", {}), config.get("corporate", [])
+    except Exception as e:
+        logger.error(f"Error loading keyword config from {path}: {e}")
+        raise
@@ -0,0 +1,47 @@
+import logging
+
+import numpy as np
+
+from embeddings import encode
+
+logger = logging.getLogger(__name__)
+
+
+class LabelEmbeddingClassifier:
+    """Bi-encoder alternative to the zero-shot NLI passes.
+
+    Every hypothesis ("This is a {label}", "This query is about {label}") is
+    embedded once into a normalized matrix. A query is embedded once and scored
+    against all hypotheses with a single matrix multiply, so the cost hardly
+    depends on the number of labels.
+
+    Cosine similarities are turned into scores shaped like the pipeline's:
+    a softmax over the domain hypotheses (single-label) and an independent
+    sigmoid per topic hypothesis (multi-label).
+
+    Args:
+        encoder: Sentence encoder from embeddings.load_sentence_encoder
+        domain_hypotheses (list): Hypotheses of the single-label domain pass
+        topic_hypotheses (list): Hypotheses of the multi-label topic pass
+        scale (float): Multiplier applied to similarities before the softmax/sigmoid
+        bias (float): Similarity at which a topic scores 0.5
+    """
+
+    def __init__(self, encoder, domain_hypotheses, topic_hypotheses, scale=20.0, bias=0.3):
+        self.encoder = encoder
+        self.scale = scale
+        self.bias = bias
+        self.n_domain = len(domain_hypotheses)
+        # Shape (dim, n_hypotheses), so scoring is queries @ matrix
+        self.label_matrix = encode(encoder, list(domain_hypotheses) + list(topic_hypotheses)).T.copy()
+
+    def score(self, queries):
+        """Return (domain_scores, topic_scores) arrays with one row per query."""
+        similarities = encode(self.encoder, queries) @ self.label_matrix
+
+        domain = self.scale * similarities[:, :self.n_domain]
+        domain = np.exp(domain - domain.max(axis=1, keepdims=True))
+        domain_scores = domain / domain.sum(axis=1, keepdims=True)
+
+        topic_scores = 1.0 / (1.0 + np.exp(-self.scale * (similarities[:, self.n_domain:] - self.bias)))
+        return domain_scores, topic_scores
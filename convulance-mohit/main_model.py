@@ -1,9 +1,24 @@
-from transformers import pipeline
+import hashlib
+import json
 import logging
+import os
 import sys
 import re
-import pandas as pd
+import time
 from datetime import datetime
+from inference_backends import build_zero_shot_pipeline
+from keyword_matcher import KeywordMatcher, load_keyword_config
+from classification_cache import ClassificationCache
+from embeddings import DEFAULT_SENTENCE_ENCODER, load_sentence_encoder
+from semantic_cache import SemanticCache
+from label_embeddings import LabelEmbeddingClassifier
+from user_directory import UserDirectory
+from authorization_policy import PolicyStore
+from cascade import TierCounter, load_cascade_model, small_model_decisions
+from query_admission import QueryAdmission, length_buckets
+from department_resolver import DepartmentResolver, load_department_config
+from decision_log import DecisionLog, StageTimer
+from degradation import DEGRADED_MODES, DegradationCounter, PassLatency, choose_degraded_mode
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', 
@@ -49,159 +64,853 @@ DEPARTMENT_MAPPING = {
     "training": "Training"
 }
 
-def load_classifier(model_name="facebook/bart-large-mnli"):
-    """Load the zero-shot classification model."""
+# Optional JSON file replacing the departments and aliases above (see department_resolver.load_department_config)
+DEPARTMENT_CONFIG_PATH = os.getenv("DEPARTMENT_CONFIG_PATH")
+if DEPARTMENT_CONFIG_PATH:
+    DEPARTMENTS, DEPARTMENT_MAPPING = load_department_config(DEPARTMENT_CONFIG_PATH)
+
+# Department resolver built once from the aliases. Set DEPARTMENT_FUZZY_THRESHOLD (e.g. 0.7) to also resolve
+# misspelt names after an indicator phrase ("the enginering team") at that trigram similarity
+DEPARTMENT_FUZZY_THRESHOLD = os.getenv("DEPARTMENT_FUZZY_THRESHOLD")
+DEPARTMENT_RESOLVER = DepartmentResolver(
+    DEPARTMENT_MAPPING,
+    DEPARTMENTS,
+    fuzzy_threshold=float(DEPARTMENT_FUZZY_THRESHOLD) if DEPARTMENT_FUZZY_THRESHOLD else None
+)
+
+# Zero-shot model served by the API; CLASSIFIER_SNAPSHOT_DIR may hold a local snapshot of it
+CLASSIFIER_MODEL = os.getenv("CLASSIFIER_MODEL", "facebook/bart-large-mnli")
+
+def load_classifier(model_name=CLASSIFIER_MODEL, backend=None):
+    """Load the zero-shot classification model.
+    
+    `backend` is one of inference_backends.BACKENDS and defaults to CLASSIFIER_BACKEND.
+    """
     try:
         print("Loading classifier model...")
-        return pipeline("zero-shot-classification", model=model_name)
+        return build_zero_shot_pipeline(model_name, backend=backend)
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         raise
 
-def classify_query(classifier, query, labels, hypothesis_template=None, multi_label=False):
-    """Classify a query using zero-shot classification."""
+# Candidate labels for the topic classification pass
+CORPORATE_LABELS = [
+    "employee data request", 
+    "hr question", 
+    "corporate policy",
+    "business operations",
+    "performance metrics",
+    "company data"
+]
+
+NON_CORPORATE_LABELS = [
+    "personal question",
+    "entertainment topic",
+    "food and recipes",
+    "general knowledge",
+    "lifestyle question",
+    "inappropriate content"
+]
+
+# Candidate labels and templates for the domain classification pass
+DOMAIN_LABELS = ["corporate business query", "non-corporate personal query"]
+DOMAIN_HYPOTHESIS_TEMPLATE = "This is a {}"
+TOPIC_HYPOTHESIS_TEMPLATE = "This query is about {}"
+
+# Score thresholds used by the decision rules
+NON_CORPORATE_REJECT_SCORE = 0.70   # domain pass: reject confident non-corporate queries
+CORPORATE_KEYWORD_MIN_SCORE = 0.35  # topic pass: corporate keyword plus a reasonable corporate score
+CORPORATE_MARGIN = 0.15             # topic pass: corporate score well above non-corporate
+DOMAIN_OVERRIDE_SCORE = 0.80        # domain pass: benefit of the doubt for strongly corporate queries
+
+# Classification mode: "sequential" runs the domain and topic passes as two pipeline calls,
+# "fused" scores all premise/hypothesis pairs of both passes in one padded batch,
+# "cascade" runs a small local model first and the NLI passes only for uncertain queries,
+# "embedding" replaces both NLI passes with a sentence encoder scored against precomputed label embeddings
+CLASSIFICATION_MODES = ("sequential", "fused", "cascade", "embedding")
+CLASSIFICATION_MODE = os.getenv("CLASSIFICATION_MODE", "sequential")
+
+# Cascade: queries whose small-model corporate probability falls inside [lower, upper] go to NLI
+CASCADE_MODEL_PATH = os.getenv("CASCADE_MODEL_PATH", "cascade_model.pkl")
+CASCADE_LOWER = float(os.getenv("CASCADE_LOWER", "0.2"))
+CASCADE_UPPER = float(os.getenv("CASCADE_UPPER", "0.8"))
+CASCADE_NLI_MODE = os.getenv("CASCADE_NLI_MODE", "sequential")
+cascade_model = None
+cascade_tiers = TierCounter()
+
+# Obviously non-corporate keywords, checked in category order
+NON_CORPORATE_KEYWORDS = {
+    "inappropriate": ["sex", "porn", "nude", "tinder", "girlfriend", "boyfriend", "marry"],
+    "entertainment": ["joke", "movie", "game", "play", "music", "song", "concert", "netflix"],
+    "food": ["pancake", "recipe", "food", "cook", "restaurant", "meal", "dinner", "lunch", "breakfast"],
+    "lifestyle": ["vacation", "hobby", "garden", "pet", "dog", "cat"]
+}
+
+# Corporate keyword detection (stronger signals)
+CORPORATE_KEYWORDS = [
+    "employee", "staff", "personnel", "department", "hr", "company", 
+    "corporate", "business", "organization", "management", "team", 
+    "performance", "review", "salary", "policy", "finance", "budget"
+]
+
+# Optional JSON file replacing the keyword lists above (see keyword_matcher.load_keyword_config)
+KEYWORD_CONFIG_PATH = os.getenv("KEYWORD_CONFIG_PATH")
+if KEYWORD_CONFIG_PATH:
+    NON_CORPORATE_KEYWORDS, CORPORATE_KEYWORDS = load_keyword_config(KEYWORD_CONFIG_PATH)
+
+# Keyword matchers are compiled once so each query is scanned in a single pass
+NON_CORPORATE_MATCHER = KeywordMatcher(NON_CORPORATE_KEYWORDS)
+CORPORATE_MATCHER = KeywordMatcher({"corporate": CORPORATE_KEYWORDS}, word_boundary=False)
+
+# Fingerprint of everything besides the model that decides a classification, used in cache keys
+DECISION_CONFIG_FINGERPRINT = hashlib.sha256(json.dumps([
+    [NON_CORPORATE_REJECT_SCORE, CORPORATE_KEYWORD_MIN_SCORE, CORPORATE_MARGIN, DOMAIN_OVERRIDE_SCORE],
+    [DOMAIN_LABELS, CORPORATE_LABELS, NON_CORPORATE_LABELS],
+    [DOMAIN_HYPOTHESIS_TEMPLATE, TOPIC_HYPOTHESIS_TEMPLATE],
+    [NON_CORPORATE_KEYWORDS, CORPORATE_KEYWORDS]
+]).encode("utf-8")).hexdigest()
+
+# Classification result cache: in-memory LRU plus an optional SQLite tier
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "1024"))  # 0 disables the cache
+CLASSIFICATION_CACHE_TTL = float(os.getenv("CLASSIFICATION_CACHE_TTL", "86400"))
+CLASSIFICATION_CACHE_DB = os.getenv("CLASSIFICATION_CACHE_DB")  # unset keeps the cache in memory only
+classification_cache = None
+
+# Semantic cache reusing classifications of near-duplicate queries (unset threshold disables it)
+SEMANTIC_CACHE_THRESHOLD = os.getenv("SEMANTIC_CACHE_THRESHOLD")
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "2048"))
+SENTENCE_ENCODER_MODEL = os.getenv("SENTENCE_ENCODER_MODEL", DEFAULT_SENTENCE_ENCODER)
+sentence_encoder = None
+semantic_cache = None
+
+# Embedding mode: similarities are multiplied by the scale; a topic scores 0.5 at a similarity of the bias
+LABEL_EMBEDDING_SCALE = float(os.getenv("LABEL_EMBEDDING_SCALE", "20.0"))
+LABEL_EMBEDDING_BIAS = float(os.getenv("LABEL_EMBEDDING_BIAS", "0.3"))
+label_embedding_classifier = None
+
+# Token budget per query (0 disables it) and how longer queries are shortened: "head" or "sentences"
+MAX_QUERY_TOKENS = int(os.getenv("MAX_QUERY_TOKENS", "128"))
+QUERY_TRUNCATION = os.getenv("QUERY_TRUNCATION", "head")
+# Token lengths batches are split at, so short queries are not padded to the longest one
+LENGTH_BUCKETS = [int(edge) for edge in os.getenv("LENGTH_BUCKETS", "16,32,64").split(",") if edge.strip()]
+query_admission = None
+
+# User directory loaded once and reloaded when the file changes
+USER_DATA_PATH = os.getenv("USER_DATA_PATH", "MOCK_DATA.csv")
+USER_DATA_CHECK_SECONDS = float(os.getenv("USER_DATA_CHECK_SECONDS", "1.0"))
+user_directory = None
+
+# Authorization rules, compiled once and recompiled when the file changes
+AUTHORIZATION_POLICY_PATH = os.getenv("AUTHORIZATION_POLICY_PATH", "authorization_policy.json")
+authorization_policy = None
+
+# Order of the user query stages: classify_first always classifies; auth_first runs the
+# cheap stages first and classifies only requests whose status they leave open
+PIPELINE_ORDERS = ("classify_first", "auth_first")
+PIPELINE_ORDER = os.getenv("PIPELINE_ORDER", "classify_first")
+
+# Audit log of access decisions, written in batches by a background thread (unset disables it)
+DECISION_LOG_DIR = os.getenv("DECISION_LOG_DIR")
+DECISION_LOG_FORMAT = os.getenv("DECISION_LOG_FORMAT", "jsonl")
+DECISION_LOG_BATCH = int(os.getenv("DECISION_LOG_BATCH", "256"))
+DECISION_LOG_FLUSH_SECONDS = float(os.getenv("DECISION_LOG_FLUSH_SECONDS", "1.0"))
+DECISION_LOG_SEGMENT_RECORDS = int(os.getenv("DECISION_LOG_SEGMENT_RECORDS", "100000"))
+DECISION_LOG_QUEUE_SIZE = int(os.getenv("DECISION_LOG_QUEUE_SIZE", "10000"))
+decision_log = None
+
+# Requests with a deadline fall back to the domain pass or the keyword rules when the full
+# classification is not expected to finish in time; estimates are multiplied by this margin
+DEGRADATION_SAFETY = float(os.getenv("DEGRADATION_SAFETY", "1.2"))
+pass_latency = PassLatency()
+degradation = DegradationCounter()
+# Optional callable returning the seconds a new request would wait for inference (set by the API)
+queue_wait_estimator = None
+
+def classify_query(classifier, query, labels, hypothesis_template=None, multi_label=False, batch_size=None):
+    """Classify a query (or a list of queries) using zero-shot classification."""
     try:
+        kwargs = {"candidate_labels": labels, "multi_label": multi_label}
         if hypothesis_template:
-            result = classifier(query, candidate_labels=labels, hypothesis_template=hypothesis_template, multi_label=multi_label)
-        else:
-            result = classifier(query, candidate_labels=labels, multi_label=multi_label)
+            kwargs["hypothesis_template"] = hypothesis_template
+        if batch_size:
+            kwargs["batch_size"] = batch_size
+        result = classifier(query, **kwargs)
+        # The pipeline returns a bare dict for single-item lists on some versions
+        if isinstance(query, list) and isinstance(result, dict):
+            result = [result]
         return result
     except Exception as e:
         logger.error(f"Error during classification: {e}")
         raise
 
-def is_corporate_related(query, classifier, confidence_threshold=0.45):
-    """Determine if the query is related to corporate or employee data using multiple checks."""
+class Classification(tuple):
+    """An (is_corporate, label, confidence, scores) result that also says whether the model saw a truncated query.
+    
+    It unpacks and compares like the plain tuple. `truncated` is False when no
+    model ran, e.g. for keyword rejections.
+    """
+    
+    def __new__(cls, result, truncated=False):
+        classification = super().__new__(cls, result)
+        classification.truncated = truncated
+        return classification
+
+def _cached_classification(value):
+    """Classification from a classification cache entry, stored as [is_corporate, label, confidence, scores, truncated]."""
+    return Classification(value[:4], value[4])
+
+def _cache_value(result):
+    return [*result, getattr(result, "truncated", False)]
+
+def _keyword_rejection(query):
+    """Return a rejection result if the query contains an obviously non-corporate keyword."""
+    hit = NON_CORPORATE_MATCHER.first(query.lower())
+    if hit:
+        keyword, category = hit
+        logger.debug("Rejected query with non-corporate keyword '%s' in category '%s'", keyword, category)
+        return False, f"{category} question", 1.0, {f"{category} question": 1.0}
+    return None
+
+def _domain_rejection(domain_result):
+    """Return a rejection result if the domain pass is confident the query is non-corporate."""
+    domain_label = domain_result['labels'][0]
+    domain_score = domain_result['scores'][0]
+    
+    # If high confidence that it's non-corporate, reject immediately
+    if domain_label == "non-corporate personal query" and domain_score >= NON_CORPORATE_REJECT_SCORE:
+        logger.debug("Rejected query as non-corporate with confidence %.2f", domain_score)
+        return False, "non-corporate query", domain_score, {"non-corporate query": domain_score}
+    return None
+
+def _apply_decision_rules(query, domain_result, result, confidence_threshold):
+    """Combine the domain and topic classification passes into a final decision."""
+    domain_label = domain_result['labels'][0]
+    domain_score = domain_result['scores'][0]
+    
+    # Get all scores
+    scores = {label: score for label, score in zip(result['labels'], result['scores'])}
+    
+    # Check if there are explicit corporate keywords
+    has_corporate_keywords = CORPORATE_MATCHER.search(query.lower())
+    
+    # Get highest scores for corporate and non-corporate categories
+    highest_corporate_score = max([scores.get(label, 0) for label in CORPORATE_LABELS])
+    highest_non_corporate_score = max([scores.get(label, 0) for label in NON_CORPORATE_LABELS])
+    
+    # Get predicted label and confidence
+    predicted_label = result['labels'][0]
+    confidence = result['scores'][0]
+    
+    # Decision logic with enhanced rules
+    is_corporate = False
+    
+    # Case 1: Strong corporate keyword presence with reasonable score
+    if has_corporate_keywords and highest_corporate_score >= CORPORATE_KEYWORD_MIN_SCORE:
+        is_corporate = True
+        # Find the actual highest corporate label
+        for label in CORPORATE_LABELS:
+            if scores.get(label, 0) == highest_corporate_score:
+                predicted_label = label
+                confidence = highest_corporate_score
+                break
+    
+    # Case 2: Corporate score significantly higher than non-corporate
+    elif highest_corporate_score > highest_non_corporate_score + CORPORATE_MARGIN:
+        is_corporate = True
+        # Find the actual highest corporate label
+        for label in CORPORATE_LABELS:
+            if scores.get(label, 0) == highest_corporate_score:
+                predicted_label = label
+                confidence = highest_corporate_score
+                break
+    
+    # Case 3: Standard threshold for corporate labels
+    elif predicted_label in CORPORATE_LABELS and confidence >= confidence_threshold:
+        is_corporate = True
+    
+    # Additional check: if domain classification is strongly corporate, give benefit of doubt
+    if not is_corporate and domain_label == "corporate business query" and domain_score >= DOMAIN_OVERRIDE_SCORE:
+        is_corporate = True
+        predicted_label = "business operations"  # Default to a general business category
+        confidence = domain_score
+    
+    logger.debug("Classification result: corporate=%s, label=%s, confidence=%.2f", is_corporate, predicted_label, confidence)
+    logger.debug(f"All scores: {scores}")
+    
+    return is_corporate, predicted_label, confidence, scores
+
+def _pipeline_result(query, labels, scores):
+    """Format scores the way the zero-shot pipeline does, sorted from best to worst."""
+    order = sorted(range(len(labels)), key=lambda i: scores[i], reverse=True)
+    return {
+        "sequence": query,
+        "labels": [labels[i] for i in order],
+        "scores": [scores[i] for i in order]
+    }
+
+def fused_classify_queries(classifier, queries):
+    """Run the domain and topic passes for a list of queries in one padded forward pass.
+    
+    All 14 premise/hypothesis pairs per query go through the model together. The
+    scores are normalized exactly like the pipeline does for each pass: softmax
+    over the entailment logits for the single-label domain pass, and
+    entailment-vs-contradiction per label for the multi-label topic pass.
+    
+    Returns:
+        list: One (domain_result, topic_result) pair of pipeline-style dicts per query
+    """
+    import torch
+    
+    topic_labels = CORPORATE_LABELS + NON_CORPORATE_LABELS
+    hypotheses = [DOMAIN_HYPOTHESIS_TEMPLATE.format(label) for label in DOMAIN_LABELS]
+    hypotheses += [TOPIC_HYPOTHESIS_TEMPLATE.format(label) for label in topic_labels]
+    
+    try:
+        tokenizer = classifier.tokenizer
+        inputs = tokenizer(
+            [query for query in queries for _ in hypotheses],
+            hypotheses * len(queries),
+            padding=True,
+            truncation="only_first",
+            return_tensors="pt"
+        )
+        model_inputs = {name: inputs[name].to(classifier.device) for name in tokenizer.model_input_names if name in inputs}
+        with torch.no_grad():
+            logits = classifier.model(**model_inputs).logits.float().cpu()
+    except Exception as e:
+        logger.error(f"Error during fused classification: {e}")
+        raise
+    
+    logits = logits.reshape(len(queries), len(hypotheses), -1)
+    entailment_id = classifier.entailment_id
+    contradiction_id = -1 if entailment_id == 0 else 0
+    n_domain = len(DOMAIN_LABELS)
+    
+    domain_scores = torch.softmax(logits[:, :n_domain, entailment_id], dim=-1)
+    topic_scores = torch.softmax(logits[:, n_domain:][..., [contradiction_id, entailment_id]], dim=-1)[..., 1]
+    
+    return [
+        (
+            _pipeline_result(query, DOMAIN_LABELS, domain_scores[i].tolist()),
+            _pipeline_result(query, topic_labels, topic_scores[i].tolist())
+        )
+        for i, query in enumerate(queries)
+    ]
+
+def embedding_classify_queries(queries):
+    """Score the domain and topic passes for a list of queries against the label embeddings.
+    
+    Each query is embedded once and compared with every hypothesis in one matrix
+    multiply, so the number of labels barely affects the cost.
+    
+    Returns:
+        list: One (domain_result, topic_result) pair of pipeline-style dicts per query
+    """
+    topic_labels = CORPORATE_LABELS + NON_CORPORATE_LABELS
+    try:
+        domain_scores, topic_scores = get_label_embedding_classifier().score(queries)
+    except Exception as e:
+        logger.error(f"Error during embedding classification: {e}")
+        raise
+    
+    return [
+        (
+            _pipeline_result(query, DOMAIN_LABELS, domain_scores[i].tolist()),
+            _pipeline_result(query, topic_labels, topic_scores[i].tolist())
+        )
+        for i, query in enumerate(queries)
+    ]
+
+def get_query_admission(pipeline=None):
+    """Return the query admission for a pipeline's tokenizer (default: the loaded classifier), or None without one."""
+    global query_admission
+    tokenizer = getattr(pipeline or classifier, "tokenizer", None)
+    if tokenizer is None:
+        return None
+    if query_admission is None or query_admission.tokenizer is not tokenizer:
+        query_admission = QueryAdmission(
+            tokenizer, MAX_QUERY_TOKENS, QUERY_TRUNCATION, matchers=[CORPORATE_MATCHER, NON_CORPORATE_MATCHER]
+        )
+    return query_admission
+
+def admit_query(query, pipeline=None):
+    """Shorten a query to MAX_QUERY_TOKENS for the model.
+    
+    Returns:
+        tuple: (text the model classifies, whether the query was truncated)
+    """
+    admission = get_query_admission(pipeline)
+    if admission is None:
+        return query, False
+    return admission.admit(query)
+
+def get_classification_cache():
+    """Return the classification cache, creating it on first use (None when disabled)."""
+    global classification_cache
+    if classification_cache is None and CLASSIFICATION_CACHE_SIZE > 0:
+        classification_cache = ClassificationCache(
+            max_entries=CLASSIFICATION_CACHE_SIZE,
+            ttl_seconds=CLASSIFICATION_CACHE_TTL,
+            db_path=CLASSIFICATION_CACHE_DB
+        )
+    return classification_cache
+
+def get_sentence_encoder():
+    """Return the sentence encoder shared by the semantic cache and the embedding mode, loading it on first use."""
+    global sentence_encoder
+    if sentence_encoder is None:
+        sentence_encoder = load_sentence_encoder(SENTENCE_ENCODER_MODEL)
+    return sentence_encoder
+
+def get_semantic_cache():
+    """Return the semantic cache, loading its sentence encoder on first use (None when disabled)."""
+    global semantic_cache
+    if semantic_cache is None and SEMANTIC_CACHE_THRESHOLD:
+        semantic_cache = SemanticCache(
+            get_sentence_encoder(),
+            threshold=float(SEMANTIC_CACHE_THRESHOLD),
+            capacity=SEMANTIC_CACHE_SIZE
+        )
+    return semantic_cache
+
+def get_label_embedding_classifier():
+    """Return the embedding-mode classifier, embedding the label hypotheses on first use."""
+    global label_embedding_classifier
+    if label_embedding_classifier is None:
+        label_embedding_classifier = LabelEmbeddingClassifier(
+            get_sentence_encoder(),
+            [DOMAIN_HYPOTHESIS_TEMPLATE.format(label) for label in DOMAIN_LABELS],
+            [TOPIC_HYPOTHESIS_TEMPLATE.format(label) for label in CORPORATE_LABELS + NON_CORPORATE_LABELS],
+            scale=LABEL_EMBEDDING_SCALE,
+            bias=LABEL_EMBEDDING_BIAS
+        )
+    return label_embedding_classifier
+
+def get_cascade_model():
+    """Return the cascade's small model, loading it on first use."""
+    global cascade_model
+    if cascade_model is None:
+        cascade_model = load_cascade_model(CASCADE_MODEL_PATH)
+    return cascade_model
+
+def _model_name(classifier):
+    """Name and inference backend of the model behind a classifier, used to keep cache entries per model."""
+    model = getattr(classifier, "model", None)
+    name = getattr(model, "name_or_path", None) or type(classifier).__name__
+    return f"{name}:{getattr(classifier, 'inference_backend', 'torch-fp32')}"
+
+def _cache_key(query, classifier, confidence_threshold, mode):
+    """Cache key covering everything that can change a classification result."""
+    params = {
+        "mode": mode,
+        "confidence_threshold": confidence_threshold,
+        "config": DECISION_CONFIG_FINGERPRINT,
+        "format": "truncated"
+    }
+    if mode == "cascade":
+        params["cascade"] = [CASCADE_MODEL_PATH, CASCADE_LOWER, CASCADE_UPPER, CASCADE_NLI_MODE]
+    if mode == "embedding":
+        params["embedding"] = [SENTENCE_ENCODER_MODEL, LABEL_EMBEDDING_SCALE, LABEL_EMBEDDING_BIAS]
+    if MAX_QUERY_TOKENS:
+        params["admission"] = [MAX_QUERY_TOKENS, QUERY_TRUNCATION]
+    return ClassificationCache.make_key(query, _model_name(classifier), params)
+
+def _check_order(order):
+    order = order or PIPELINE_ORDER
+    if order not in PIPELINE_ORDERS:
+        raise ValueError(f"Unknown pipeline order '{order}'")
+    return order
+
+def _check_mode(mode):
+    mode = mode or CLASSIFICATION_MODE
+    if mode not in CLASSIFICATION_MODES:
+        raise ValueError(f"Unknown classification mode '{mode}'")
+    return mode
+
+def is_corporate_related(query, classifier, confidence_threshold=0.45, mode=None):
+    """Determine if the query is related to corporate or employee data using multiple checks.
+    
+    `mode` selects how the passes run (one of CLASSIFICATION_MODES) and
+    defaults to CLASSIFICATION_MODE. All modes apply the same decision rules.
+    Results are served from the classification cache when it is enabled.
+    
+    Returns:
+        Classification: (is_corporate, label, confidence, scores), with `truncated`
+    """
+    mode = _check_mode(mode)
+    cache = get_classification_cache()
+    if cache is None:
+        return _classify(query, classifier, confidence_threshold, mode)
+    
+    key = _cache_key(query, classifier, confidence_threshold, mode)
+    cached = cache.get(key)
+    if cached is not None:
+        return _cached_classification(cached)
+    
+    result = _classify(query, classifier, confidence_threshold, mode)
+    cache.put(key, _cache_value(result))
+    return result
+
+def _classify(query, classifier, confidence_threshold, mode):
+    """Classify a single query without the result cache."""
     try:
         # Clean and normalize the query
         query = query.strip()
         
-        # Define broader more specific categories
-        corporate_labels = [
-            "employee data request", 
-            "hr question", 
-            "corporate policy",
-            "business operations",
-            "performance metrics",
-            "company data"
-        ]
-        
-        non_corporate_labels = [
-            "personal question",
-            "entertainment topic",
-            "food and recipes",
-            "general knowledge",
-            "lifestyle question",
-            "inappropriate content"
-        ]
-        
-        # Combined labels for classification
-        all_labels = corporate_labels + non_corporate_labels
-        
-        # Enhanced check for obviously non-corporate keywords
-        non_corporate_keywords = {
-            "inappropriate": ["sex", "porn", "nude", "tinder", "girlfriend", "boyfriend", "marry"],
-            "entertainment": ["joke", "movie", "game", "play", "music", "song", "concert", "netflix"],
-            "food": ["pancake", "recipe", "food", "cook", "restaurant", "meal", "dinner", "lunch", "breakfast"],
-            "lifestyle": ["vacation", "hobby", "garden", "pet", "dog", "cat"]
-        }
+        # Check the whole query for non-corporate keywords
+        rejection = _keyword_rejection(query)
+        if rejection:
+            if mode == "cascade":
+                cascade_tiers.record("keywords")
+            return Classification(rejection)
         
-        # Check for non-corporate keywords
-        for category, keywords in non_corporate_keywords.items():
-            for keyword in keywords:
-                if re.search(r'\b' + keyword + r'\b', query.lower()):
-                    logger.info(f"Rejected query with non-corporate keyword '{keyword}' in category '{category}'")
-                    return False, f"{category} question", 1.0, {f"{category} question": 1.0}
-        
-        # First classification: corporate vs non-corporate
-        domain_result = classify_query(
-            classifier,
-            query,
-            ["corporate business query", "non-corporate personal query"],
-            hypothesis_template="This is a {}"
-        )
+        # The model only sees the query shortened to the token budget
+        text, truncated = admit_query(query, classifier)
         
-        # Extract domain classification results
-        domain_label = domain_result['labels'][0]
-        domain_score = domain_result['scores'][0]
-        
-        # If high confidence that it's non-corporate, reject immediately
-        if domain_label == "non-corporate personal query" and domain_score >= 0.70:
-            logger.info(f"Rejected query as non-corporate with confidence {domain_score:.2f}")
-            return False, "non-corporate query", domain_score, {"non-corporate query": domain_score}
-        
-        # Second classification: specific topic
-        result = classify_query(
-            classifier, 
-            query, 
-            all_labels, 
-            hypothesis_template="This query is about {}",
-            multi_label=True
-        )
+        # Reuse the classification of a near-duplicate recent query
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            namespace = _cache_key("", classifier, confidence_threshold, mode)
+            embedding = semantic_cache.embed([text])[0]
+            hit = semantic_cache.lookup(embedding, namespace)
+            if hit:
+                logger.info(f"Reusing classification of similar query '{hit[2]}' (similarity {hit[1]:.2f})")
+                return Classification(hit[0], truncated)
+        
+        result = _timed_nli_classify(text, classifier, confidence_threshold, mode, query)
         
-        # Get all scores
-        scores = {label: score for label, score in zip(result['labels'], result['scores'])}
-        
-        # Corporate keyword detection (stronger signals)
-        corporate_keywords = [
-            "employee", "staff", "personnel", "department", "hr", "company", 
-            "corporate", "business", "organization", "management", "team", 
-            "performance", "review", "salary", "policy", "finance", "budget"
-        ]
-        
-        # Check if there are explicit corporate keywords
-        has_corporate_keywords = any(keyword in query.lower() for keyword in corporate_keywords)
-        
-        # Get highest scores for corporate and non-corporate categories
-        highest_corporate_score = max([scores.get(label, 0) for label in corporate_labels])
-        highest_non_corporate_score = max([scores.get(label, 0) for label in non_corporate_labels])
-        
-        # Get predicted label and confidence
-        predicted_label = result['labels'][0]
-        confidence = result['scores'][0]
-        
-        # Decision logic with enhanced rules
-        is_corporate = False
-        
-        # Case 1: Strong corporate keyword presence with reasonable score
-        if has_corporate_keywords and highest_corporate_score >= 0.35:
-            is_corporate = True
-            # Find the actual highest corporate label
-            for label in corporate_labels:
-                if scores.get(label, 0) == highest_corporate_score:
-                    predicted_label = label
-                    confidence = highest_corporate_score
-                    break
-        
-        # Case 2: Corporate score significantly higher than non-corporate
-        elif highest_corporate_score > highest_non_corporate_score + 0.15:
-            is_corporate = True
-            # Find the actual highest corporate label
-            for label in corporate_labels:
-                if scores.get(label, 0) == highest_corporate_score:
-                    predicted_label = label
-                    confidence = highest_corporate_score
-                    break
-        
-        # Case 3: Standard threshold for corporate labels
-        elif predicted_label in corporate_labels and confidence >= confidence_threshold:
-            is_corporate = True
-        
-        # Additional check: if domain classification is strongly corporate, give benefit of doubt
-        if not is_corporate and domain_label == "corporate business query" and domain_score >= 0.80:
-            is_corporate = True
-            predicted_label = "business operations"  # Default to a general business category
-            confidence = domain_score
-        
-        logger.info(f"Classification result: corporate={is_corporate}, label={predicted_label}, confidence={confidence:.2f}")
-        logger.debug(f"All scores: {scores}")
-        
-        return is_corporate, predicted_label, confidence, scores
+        if semantic_cache is not None:
+            semantic_cache.add(embedding, text, result, namespace)
+        return Classification(result, truncated)
     
     except Exception as e:
         logger.error(f"Error in corporate relevance check: {e}")
         raise
 
+def _nli_classify(query, classifier, confidence_threshold, mode, full_query=None):
+    """Run the NLI passes for a query that passed keyword screening.
+    
+    `query` is the text the model classifies and `full_query` the untruncated
+    query the corporate keyword rule checks (defaults to `query`).
+    """
+    full_query = query if full_query is None else full_query
+    if mode == "cascade":
+        return _cascade_classify_batch([query], classifier, confidence_threshold, [full_query])[0]
+    
+    if mode in ("fused", "embedding"):
+        # Both passes at once; the early non-corporate exit stays a rule on the domain scores
+        domain_result, result = _paired_passes(classifier, [query], mode)[0]
+        rejection = _domain_rejection(domain_result)
+        if rejection:
+            return rejection
+        return _apply_decision_rules(full_query, domain_result, result, confidence_threshold)
+    
+    # First classification: corporate vs non-corporate
+    domain_result = classify_query(
+        classifier,
+        query,
+        DOMAIN_LABELS,
+        hypothesis_template=DOMAIN_HYPOTHESIS_TEMPLATE
+    )
+    
+    rejection = _domain_rejection(domain_result)
+    if rejection:
+        return rejection
+    
+    # Second classification: specific topic
+    result = classify_query(
+        classifier, 
+        query, 
+        CORPORATE_LABELS + NON_CORPORATE_LABELS, 
+        hypothesis_template=TOPIC_HYPOTHESIS_TEMPLATE,
+        multi_label=True
+    )
+    
+    return _apply_decision_rules(full_query, domain_result, result, confidence_threshold)
+
+def _timed_nli_classify(query, classifier, confidence_threshold, mode, full_query=None):
+    start = time.perf_counter()
+    result = _nli_classify(query, classifier, confidence_threshold, mode, full_query)
+    pass_latency.observe("full", time.perf_counter() - start)
+    return result
+
+def select_degraded_mode(deadline):
+    """Return the DEGRADED_MODES entry expected to finish by `deadline` (a time.monotonic() value, None for none)."""
+    if deadline is None:
+        return "full"
+    queue_wait = queue_wait_estimator() if queue_wait_estimator is not None else 0.0
+    # The domain pass scores 2 of the 14 hypotheses of the full path
+    domain_share = len(DOMAIN_LABELS) / (len(DOMAIN_LABELS) + len(CORPORATE_LABELS) + len(NON_CORPORATE_LABELS))
+    return choose_degraded_mode(deadline - time.monotonic(), queue_wait, pass_latency, DEGRADATION_SAFETY, domain_share)
+
+def _domain_only_decision(query, domain_result):
+    """Decide from the domain pass alone: a corporate domain label or a corporate keyword makes the query corporate."""
+    rejection = _domain_rejection(domain_result)
+    if rejection:
+        return rejection
+    domain_label = domain_result['labels'][0]
+    domain_score = domain_result['scores'][0]
+    is_corporate = domain_label == "corporate business query" or bool(CORPORATE_MATCHER.search(query.lower()))
+    predicted_label = "business operations" if is_corporate else "non-corporate query"
+    return is_corporate, predicted_label, domain_score, {domain_label: domain_score}
+
+def _keywords_only_decision(query):
+    """Decide from the keyword rules alone; a query with no keyword is refused rather than let through unchecked."""
+    if CORPORATE_MATCHER.search(query.lower()):
+        return True, "business operations", 1.0, {"business operations": 1.0}
+    return False, "undetermined", 0.0, {}
+
+def classify_degraded(query, classifier, degraded_mode, confidence_threshold=0.45, mode=None, classify_domain=None):
+    """Classify a query with less than the full classification.
+    
+    A cached full result or a non-corporate keyword gives the same answer as
+    the full path, so those are returned as "full". Otherwise "domain_only"
+    runs the domain pass, with `classify_domain` if given (a callable taking
+    the list of texts to classify and returning their domain pass results,
+    e.g. InferenceWorkerPool.domain_pass), and "keywords_only" runs no model
+    at all. Degraded results are not cached.
+    
+    Returns:
+        tuple: (Classification, the DEGRADED_MODES entry actually used)
+    """
+    if degraded_mode not in DEGRADED_MODES:
+        raise ValueError(f"Unknown degraded mode '{degraded_mode}', expected one of {DEGRADED_MODES}")
+    mode = _check_mode(mode)
+    cache = get_classification_cache()
+    if cache is not None:
+        cached = cache.get(_cache_key(query, classifier, confidence_threshold, mode))
+        if cached is not None:
+            return _cached_classification(cached), "full"
+    
+    if degraded_mode == "full":
+        return is_corporate_related(query, classifier, confidence_threshold, mode), "full"
+    query = query.strip()
+    rejection = _keyword_rejection(query)
+    if rejection:
+        return Classification(rejection), "full"
+    if degraded_mode == "keywords_only":
+        return Classification(_keywords_only_decision(query)), "keywords_only"
+    
+    text, truncated = admit_query(query, classifier)
+    start = time.perf_counter()
+    if classify_domain is None:
+        domain_result = domain_pass([text], classifier)[0]
+    else:
+        domain_result = classify_domain([text])[0]
+    pass_latency.observe("domain", time.perf_counter() - start)
+    return Classification(_domain_only_decision(query, domain_result), truncated), "domain_only"
+
+def domain_pass(queries, classifier):
+    """Run only the corporate/non-corporate domain pass for a list of queries, as one batch."""
+    return classify_query(
+        classifier,
+        queries,
+        DOMAIN_LABELS,
+        hypothesis_template=DOMAIN_HYPOTHESIS_TEMPLATE,
+        batch_size=len(queries) * len(DOMAIN_LABELS)
+    )
+
+def is_corporate_related_batch(queries, classifier, confidence_threshold=0.45, mode=None, classify_nli=None):
+    """Classify a list of queries, running each NLI pass once for the whole batch.
+    
+    Args:
+        queries (list): The query texts to classify
+        classifier: The zero-shot classification pipeline
+        confidence_threshold (float): Threshold for the standard corporate label rule
+        mode (str): One of CLASSIFICATION_MODES, defaults to CLASSIFICATION_MODE
+        classify_nli (callable): Runs the NLI passes for the queries left after the keyword screening and the
+            semantic cache, as (queries, confidence_threshold, mode, full_queries) like _nli_classify_batch,
+            e.g. InferenceWorkerPool.classify_batch; defaults to running them in this process
+        
+    Returns:
+        list: One Classification per query, in input order
+    """
+    mode = _check_mode(mode)
+    cache = get_classification_cache()
+    if cache is None:
+        return _classify_batch(queries, classifier, confidence_threshold, mode, classify_nli)
+    
+    results = [None] * len(queries)
+    misses = []
+    for index, query in enumerate(queries):
+        key = _cache_key(query, classifier, confidence_threshold, mode)
+        cached = cache.get(key)
+        if cached is not None:
+            results[index] = _cached_classification(cached)
+        else:
+            misses.append((index, key))
+    
+    if misses:
+        classified = _classify_batch(
+            [queries[index] for index, _ in misses], classifier, confidence_threshold, mode, classify_nli
+        )
+        for (index, key), result in zip(misses, classified):
+            cache.put(key, _cache_value(result))
+            results[index] = result
+    return results
+
+def _classify_batch(queries, classifier, confidence_threshold, mode, classify_nli=None):
+    """Classify a list of queries without the result cache.
+    
+    Keyword screening and the semantic cache always run in this process;
+    `classify_nli` (see is_corporate_related_batch) runs the NLI passes for
+    the rest. Only the NLI passes are timed for pass_latency, and only when
+    some query needed them.
+    """
+    try:
+        results = [None] * len(queries)
+        pending = []
+        
+        # Keyword screening on the whole query is cheap, so settle those queries before batching
+        for index, query in enumerate(queries):
+            query = query.strip()
+            rejection = _keyword_rejection(query)
+            if rejection:
+                results[index] = Classification(rejection)
+            else:
+                # The model only sees the query shortened to the token budget
+                text, truncated = admit_query(query, classifier)
+                pending.append((index, query, text, truncated))
+        
+        if mode == "cascade":
+            cascade_tiers.record("keywords", len(queries) - len(pending))
+        
+        # Reuse classifications of near-duplicate recent queries
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None and pending:
+            namespace = _cache_key("", classifier, confidence_threshold, mode)
+            embeddings = semantic_cache.embed([text for _, _, text, _ in pending])
+            misses = []
+            for (index, query, text, truncated), embedding in zip(pending, embeddings):
+                hit = semantic_cache.lookup(embedding, namespace)
+                if hit:
+                    results[index] = Classification(hit[0], truncated)
+                else:
+                    misses.append((index, query, text, truncated, embedding))
+            pending = [miss[:4] for miss in misses]
+        
+        if not pending:
+            return results
+        
+        texts = [text for _, _, text, _ in pending]
+        full_queries = [query for _, query, _, _ in pending]
+        # A request in this batch waits for all of its NLI passes, so that time is what pass_latency tracks
+        start = time.perf_counter()
+        if classify_nli is None:
+            classified = _nli_classify_batch(texts, classifier, confidence_threshold, mode, full_queries)
+        else:
+            classified = classify_nli(texts, confidence_threshold, mode, full_queries)
+        pass_latency.observe("full", time.perf_counter() - start)
+        for (index, _, _, truncated), result in zip(pending, classified):
+            results[index] = Classification(result, truncated)
+        
+        if semantic_cache is not None:
+            for (index, _, text, _, embedding) in misses:
+                semantic_cache.add(embedding, text, tuple(results[index]), namespace)
+        
+        return results
+    
+    except Exception as e:
+        logger.error(f"Error in batch corporate relevance check: {e}")
+        raise
+
+def _nli_classify_batch(queries, classifier, confidence_threshold, mode, full_queries=None):
+    """Run the NLI passes for a list of queries that passed keyword screening, one length bucket at a time.
+    
+    `queries` are the texts the model classifies and `full_queries` the
+    untruncated queries the corporate keyword rule checks (defaults to `queries`).
+    """
+    full_queries = queries if full_queries is None else full_queries
+    if mode == "cascade":
+        return _cascade_classify_batch(queries, classifier, confidence_threshold, full_queries)
+    
+    admission = get_query_admission(classifier)
+    if admission is None or not LENGTH_BUCKETS or len(queries) == 1:
+        return _nli_classify_bucket(queries, classifier, confidence_threshold, mode, full_queries)
+    
+    results = [None] * len(queries)
+    for bucket in length_buckets(admission.count_tokens(queries), LENGTH_BUCKETS):
+        classified = _nli_classify_bucket(
+            [queries[index] for index in bucket], classifier, confidence_threshold, mode,
+            [full_queries[index] for index in bucket]
+        )
+        for index, result in zip(bucket, classified):
+            results[index] = result
+    return results
+
+def _nli_classify_bucket(queries, classifier, confidence_threshold, mode, full_queries):
+    """Run the NLI passes for a list of queries as one batch per pass."""
+    results = [None] * len(queries)
+    
+    if mode in ("fused", "embedding"):
+        for index, (domain_result, result) in enumerate(_paired_passes(classifier, queries, mode)):
+            results[index] = _domain_rejection(domain_result) or _apply_decision_rules(
+                full_queries[index], domain_result, result, confidence_threshold
+            )
+        return results
+    
+    # First classification: corporate vs non-corporate, one batch for all queries
+    domain_results = classify_query(
+        classifier,
+        queries,
+        DOMAIN_LABELS,
+        hypothesis_template=DOMAIN_HYPOTHESIS_TEMPLATE,
+        batch_size=len(queries) * len(DOMAIN_LABELS)
+    )
+    
+    remaining = []
+    for index, (query, domain_result) in enumerate(zip(queries, domain_results)):
+        rejection = _domain_rejection(domain_result)
+        if rejection:
+            results[index] = rejection
+        else:
+            remaining.append((index, query, domain_result))
+    
+    if not remaining:
+        return results
+    
+    # Second classification: specific topic, one batch for the queries still undecided
+    all_labels = CORPORATE_LABELS + NON_CORPORATE_LABELS
+    topic_results = classify_query(
+        classifier,
+        [query for _, query, _ in remaining],
+        all_labels,
+        hypothesis_template=TOPIC_HYPOTHESIS_TEMPLATE,
+        multi_label=True,
+        batch_size=len(remaining) * len(all_labels)
+    )
+    
+    for (index, _, domain_result), result in zip(remaining, topic_results):
+        results[index] = _apply_decision_rules(full_queries[index], domain_result, result, confidence_threshold)
+    
+    return results
+
+def _paired_passes(classifier, queries, mode):
+    """Domain and topic results for every query from the fused NLI batch or the label embeddings."""
+    if mode == "embedding":
+        return embedding_classify_queries(queries)
+    return fused_classify_queries(classifier, queries)
+
+def _cascade_classify_batch(queries, classifier, confidence_threshold, full_queries=None):
+    """Settle confident queries with the small model and send the rest to the NLI passes."""
+    if CASCADE_NLI_MODE not in ("sequential", "fused"):
+        raise ValueError(f"CASCADE_NLI_MODE must be 'sequential' or 'fused', got '{CASCADE_NLI_MODE}'")
+    results = small_model_decisions(
+        get_cascade_model(), queries, CORPORATE_LABELS, CASCADE_LOWER, CASCADE_UPPER
+    )
+    uncertain = [index for index, result in enumerate(results) if result is None]
+    cascade_tiers.record("small_model", len(queries) - len(uncertain))
+    
+    if uncertain:
+        cascade_tiers.record("nli", len(uncertain))
+        classified = _nli_classify_batch(
+            [queries[index] for index in uncertain], classifier, confidence_threshold, CASCADE_NLI_MODE,
+            [(full_queries or queries)[index] for index in uncertain]
+        )
+        for index, result in zip(uncertain, classified):
+            results[index] = result
+    return results
+
 def extract_requested_department(query):
     """Extract the department name from a query.
     
@@ -212,53 +921,7 @@ def extract_requested_department(query):
         str or None: The standardized department name or None if no department found
     """
     try:
-        # Clean and normalize query
-        query = query.lower().strip()
-        
-        # First, check for direct department mentions using the mapping
-        for dept_variant, standard_name in DEPARTMENT_MAPPING.items():
-            pattern = r'\b' + re.escape(dept_variant) + r'\b'
-            if re.search(pattern, query):
-                logger.info(f"Found department mention: {standard_name}")
-                return standard_name
-        
-        # If no direct match, try classification approach for department detection
-        department_indicators = [
-            (r'\bdata\s+from\s+(\w+\s*\w*)\b', 1),
-            (r'\bget\s+(\w+\s*\w*)\s+information\b', 1),
-            (r'\baccess\s+to\s+(\w+\s*\w*)\b', 1),
-            (r'\b(\w+\s*\w*)\s+department\b', 1),
-            (r'\b(\w+\s*\w*)\s+team\b', 1),
-            (r'\bfrom\s+(\w+\s*\w*)\s+department\b', 1),
-            (r'\bfor\s+(\w+\s*\w*)\s+department\b', 1)
-        ]
-        
-        potential_departments = []
-        
-        for pattern, group in department_indicators:
-            matches = re.finditer(pattern, query)
-            for match in matches:
-                try:
-                    dept = match.group(group).strip()
-                    if dept:
-                        # Check if this extracted term maps to a known department
-                        if dept.lower() in DEPARTMENT_MAPPING:
-                            potential_departments.append(DEPARTMENT_MAPPING[dept.lower()])
-                        # Try partial matching
-                        else:
-                            for known_dept, standard_name in DEPARTMENT_MAPPING.items():
-                                if dept.lower() in known_dept or known_dept in dept.lower():
-                                    potential_departments.append(standard_name)
-                                    break
-                except:
-                    continue
-                        
-        # Return the first found department or None
-        if potential_departments:
-            return potential_departments[0]
-        
-        return None
-    
+        return DEPARTMENT_RESOLVER.resolve(query)
     except Exception as e:
         logger.error(f"Error extracting department: {e}")
         return None
@@ -266,6 +929,8 @@ def extract_requested_department(query):
 def check_authorization(employee_id, employee_dept, requested_dept, employee_info=None):
     """Check if an employee is authorized to access data from a requested department.
     
+    The rules come from the compiled authorization policy (see authorization_policy.py).
+    
     Args:
         employee_id (str): ID of the employee making the request
         employee_dept (str): Department of the employee making the request
@@ -277,126 +942,12 @@ def check_authorization(employee_id, employee_dept, requested_dept, employee_inf
         str: Reason for authorization decision
     """
     try:
-        # If no specific department was requested/detected
-        if not requested_dept:
-            logger.warning("No specific department detected in the query")
-            return False, "No specific department detected in the query"
-        
-        # Enhanced security checks based on additional factors
-        if employee_info:
-            # 1. Check IP address - localhost (127.0.0.1) gets special treatment
-            ip_address = employee_info.get('ip_address', '')
-            is_localhost = ip_address == '127.0.0.1' or ip_address == 'localhost'
-            
-            # 2. Check past violations - reject if too many violations
-            past_violations = employee_info.get('past_violations', 0)
-            try:
-                past_violations = int(past_violations)
-            except (ValueError, TypeError):
-                past_violations = 0
-                
-            # 3. Check join date - newer employees might have more restrictions
-            join_date = employee_info.get('join_date', '')
-            is_new_employee = False
-            
-            if join_date:
-                try:
-                    from datetime import datetime
-                    # Check if join_date is a datetime object or a string
-                    if isinstance(join_date, str):
-                        # Try different date formats
-                        try:
-                            join_date_obj = datetime.strptime(join_date, '%Y-%m-%d')
-                        except ValueError:
-                            try:
-                                join_date_obj = datetime.strptime(join_date, '%d/%m/%Y')
-                            except ValueError:
-                                try:
-                                    join_date_obj = datetime.strptime(join_date, '%m/%d/%Y')
-                                except ValueError:
-                                    # If all parsing attempts fail, default to not a new employee
-                                    join_date_obj = None
-                    else:
-                        join_date_obj = join_date
-                    
-                    if join_date_obj:
-                        today = datetime.now()
-                        months_employed = (today.year - join_date_obj.year) * 12 + (today.month - join_date_obj.month)
-                        is_new_employee = months_employed < 3  # Less than 3 months at company
-                except Exception as e:
-                    logger.warning(f"Error processing join date: {e}")
-            
-            # Security decision logic based on additional factors
-            
-            # Automatic rejection for serious security concerns
-            if past_violations >= 3:
-                logger.warning(f"Employee {employee_id} has {past_violations} past violations - access denied")
-                return False, f"Access denied due to {past_violations} past security violations"
-            
-            # Special case: New employees with past violations have restricted access
-            if is_new_employee and past_violations > 0:
-                # New employees with violations can only access their own department
-                if employee_dept != requested_dept:
-                    logger.warning(f"New employee {employee_id} with past violations - restricted to own department")
-                    return False, "New employees with past violations can only access their own department"
-            
-            # Localhost gets elevated privileges (typically for admin/dev purposes)
-            if is_localhost:
-                logger.info(f"Request from localhost ({ip_address}) - granting elevated access")
-                return True, "Localhost connection with elevated access"
-        
-        # Always allow employees to access their own department's data
-        if employee_dept == requested_dept:
-            logger.info(f"Employee {employee_id} authorized to access their own department ({employee_dept})")
-            return True, "Access to own department data"
-        
-        # Special roles with broader access
-        # Ensure employee_id is converted to int for comparison with dictionary keys
-        try:
-            employee_id_int = int(employee_id)
-        except (ValueError, TypeError):
-            # If it can't be converted to int, it won't match any special role keys
-            employee_id_int = None
-        
-        special_roles = {
-            # Format: employee_id: [departments_with_access]
-            10: ["Human Resources", "Engineering", "Sales", "Marketing"],  # HR admin with access to all departments
-            16: ["Legal", "Human Resources", "Accounting"],  # Legal team lead
-            13: ["Accounting", "Sales", "Marketing"],  # Finance director
-        }
-        
-        # Check for special roles - using the integer ID for comparison
-        if employee_id_int is not None and employee_id_int in special_roles and requested_dept in special_roles[employee_id_int]:
-            # If employee has past violations, extra scrutiny even with special role
-            if employee_info and past_violations > 0:
-                logger.warning(f"Special role user {employee_id} has {past_violations} violations - restricted privileges")
-                if past_violations >= 2:
-                    return False, f"Special role restricted due to {past_violations} violations"
-            
-            logger.info(f"Employee {employee_id} has special role authorization for {requested_dept}")
-            return True, f"Special role authorization for {requested_dept}"
-        
-        # Cross-department access rules
-        cross_dept_access = {
-            "Human Resources": DEPARTMENTS,  # HR can access all departments
-            "Legal": DEPARTMENTS,  # Legal can access all departments
-            "Accounting": ["Sales", "Marketing", "Business Development", "Services"],  # Finance can access revenue departments
-            "Engineering": ["Product Management", "Research and Development"],  # Engineering can access related technical departments
-        }
-        
-        # Check cross-department access rules - with added restriction for employees with violations
-        if employee_dept in cross_dept_access and requested_dept in cross_dept_access[employee_dept]:
-            # If employee has past violations, extra scrutiny for cross-department access
-            if employee_info and past_violations > 0:
-                logger.warning(f"Employee {employee_id} has {past_violations} violations - restricted cross-dept access")
-                return False, f"Cross-department access restricted due to past violations"
-                
-            logger.info(f"Employee from {employee_dept} has cross-department authorization for {requested_dept}")
-            return True, f"Cross-department authorization from {employee_dept} to {requested_dept}"
-        
-        # Default: no access
-        logger.warning(f"Employee {employee_id} from {employee_dept} NOT authorized to access {requested_dept}")
-        return False, f"No authorization from {employee_dept} to {requested_dept}"
+        is_authorized, reason = get_authorization_policy().authorize(
+            employee_id, employee_dept, requested_dept, employee_info
+        )
+        logger.debug("Authorization for employee %s (%s) to %s: %s - %s",
+                     employee_id, employee_dept, requested_dept, is_authorized, reason)
+        return is_authorized, reason
     
     except Exception as e:
         logger.error(f"Error in authorization check: {e}")
@@ -404,49 +955,50 @@ def check_authorization(employee_id, employee_dept, requested_dept, employee_inf
         return False, f"Authorization error: {str(e)}"
 
 def process_result(is_related, predicted_label, confidence, employee_info=None, query=None):
-    """Process and display classification results with authorization check."""
-    print(f"Prediction: {predicted_label} (confidence: {confidence:.2f})")
+    """Process classification results with authorization check, recording the decision in the decision log."""
+    timer = StageTimer(["classification"])
+    decision = {
+        "query": query,
+        "label": predicted_label,
+        "confidence": float(confidence),
+        "user_id": employee_info.get('id') if employee_info else None,
+        "user_dept": employee_info.get('department') if employee_info else None,
+        "stages": timer.stages,
+    }
     
     if not is_related:
-        print("❌ Non-corporate query - Do not respond")
-        return False
-    
+        decision.update(status="rejected", message="Query is not related to corporate matters")
     # If we have employee info, perform authorization check
-    if employee_info and query:
-        # Extract employee details
-        employee_id = employee_info.get('id', 'unknown')
-        employee_dept = employee_info.get('department', 'unknown')
-        
+    elif employee_info and query:
         # Extract requested department from query
-        requested_dept = extract_requested_department(query)
+        with timer.stage("department"):
+            requested_dept = extract_requested_department(query)
+        decision["requested_dept"] = requested_dept
         
         if requested_dept:
-            print(f"📊 Department requested: {requested_dept}")
-            
             # Check authorization with full employee info
-            is_authorized, reason = check_authorization(employee_id, employee_dept, requested_dept, employee_info)
-            
-            if is_authorized:
-                print(f"✅ AUTHORIZED: {reason}")
-                print(f"✅ Corporate/Business query with valid authorization - Generate response")
-                return True
-            else:
-                print(f"❌ UNAUTHORIZED: {reason}")
-                print(f"❌ Corporate/Business query but unauthorized - Block response")
-                return False
+            with timer.stage("authorization"):
+                is_authorized, reason = check_authorization(
+                    employee_info.get('id', 'unknown'), employee_info.get('department', 'unknown'),
+                    requested_dept, employee_info
+                )
+            decision.update(status="approved" if is_authorized else "unauthorized", auth_reason=reason)
         else:
-            print("⚠️ No specific department detected in the query")
-            print("✅ Corporate/Business query - Generate general response")
-            return True
+            decision.update(status="approved", message="Corporate query with no specific department requested")
     else:
         # No authorization check needed/possible
-        print("✅ Corporate/Business query - Generate response")
-        return True
+        decision.update(status="approved", message="Corporate query")
+    
+    record_decision(decision, timer.timings)
+    logger.debug("Decision for %s: %s", query, decision["status"])
+    return decision["status"] == "approved"
 
 # --- New User Query Processing Functions ---
 
 def load_user_data(csv_path="MOCK_DATA.csv"):
     """Load user data from CSV file"""
+    # pandas takes a while to import and the API itself never needs it
+    import pandas as pd
     try:
         df = pd.read_csv(csv_path)
         # Convert join_date to datetime if it exists
@@ -457,6 +1009,37 @@ def load_user_data(csv_path="MOCK_DATA.csv"):
         logger.error(f"Error loading user data: {e}")
         raise
 
+def get_user_directory():
+    """Return the user directory, loading USER_DATA_PATH on first use."""
+    global user_directory
+    if user_directory is None:
+        user_directory = UserDirectory(USER_DATA_PATH, check_interval=USER_DATA_CHECK_SECONDS)
+    return user_directory
+
+def get_authorization_policy():
+    """Return the compiled authorization policy, loading AUTHORIZATION_POLICY_PATH on first use."""
+    global authorization_policy
+    if authorization_policy is None:
+        authorization_policy = PolicyStore(AUTHORIZATION_POLICY_PATH, check_interval=USER_DATA_CHECK_SECONDS)
+    return authorization_policy.get()
+
+def get_decision_log():
+    """Return the started decision log, or None when DECISION_LOG_DIR is unset."""
+    global decision_log
+    if decision_log is None and DECISION_LOG_DIR:
+        decision_log = DecisionLog(
+            DECISION_LOG_DIR, fmt=DECISION_LOG_FORMAT, batch_size=DECISION_LOG_BATCH,
+            flush_seconds=DECISION_LOG_FLUSH_SECONDS, segment_records=DECISION_LOG_SEGMENT_RECORDS,
+            queue_size=DECISION_LOG_QUEUE_SIZE
+        ).start()
+    return decision_log
+
+def record_decision(result, timings=None):
+    """Queue a decision for the decision log without waiting for it to be written."""
+    log = get_decision_log()
+    if log is not None:
+        log.record(result, timings)
+
 def get_user_by_id(user_id, user_data):
     """Get user details by ID"""
     try:
@@ -475,34 +1058,80 @@ def get_user_by_id(user_id, user_data):
         logger.error(f"Error retrieving user by ID: {e}")
         return None
 
-def process_user_query(user_id, query):
+def process_user_query(user_id, query, classification=None, classify=None, order=None, user=None, deadline=None,
+                       degraded_mode=None, degraded_classify=None):
     """Process a user query with authentication and classification
     
+    With the classify_first order the query is classified before anything
+    else. With auth_first, the user lookup, keyword screening, department
+    extraction and the authorization check run first, and the NLI
+    classification only runs when they leave the status open: not for unknown
+    users or keyword rejections. A request the policy denies is still
+    classified, since the classifier decides whether it is rejected or
+    unauthorized. Both orders screen keywords on the whole query, so they
+    return the same result for every request; only `stages`, which lists the
+    stages that ran in order, differs. The decision and the time each stage took are queued
+    for the decision log.
+    
+    With a deadline, the classification falls back to the domain pass or the
+    keyword rules when the full path is not expected to finish in time (see
+    select_degraded_mode); `degraded_mode` in the result says which ran.
+    
     Args:
-        user_id: User ID to look up in CSV
+        user_id: User ID to look up in the user directory
         query: The query text to classify
+        classification: Optional precomputed is_corporate_related result, e.g. from a batch
+        classify: Optional callable classifying the query, used instead of is_corporate_related
+        degraded_classify: Optional callable taking (query, degraded_mode) and returning (classification,
+            degraded mode used), used instead of classify_degraded
+        order: One of PIPELINE_ORDERS, defaults to PIPELINE_ORDER
+        user: Optional user dict from the user directory, e.g. shared across a batch
+        deadline: Optional time.monotonic() value by which the response is due
+        degraded_mode: The DEGRADED_MODES entry a precomputed classification was made in, defaults to "full"
         
     Returns:
         dict: Response with query status, classification, and authorization details
     """
+    timer = StageTimer(["classification"] if classification is not None else [])
+    result = _process_user_query(
+        user_id, query, timer, classification, classify, order, user, deadline, degraded_mode, degraded_classify
+    )
+    _finish_request(result, timer.timings, deadline)
+    return result
+
+def _finish_request(result, timings, deadline=None):
+    """Record a finished request in the decision log and the degradation counters."""
+    record_decision(result, timings)
+    if result.get("degraded_mode"):
+        degradation.record(result["degraded_mode"])
+    if deadline is not None:
+        degradation.record_deadline(time.monotonic() > deadline)
+
+def _process_user_query(user_id, query, timer, classification=None, classify=None, order=None, user=None,
+                        deadline=None, degraded_mode=None, degraded_classify=None):
+    """process_user_query without the decision log, timing each stage with `timer`."""
     global classifier
     
+    order = _check_order(order)
+    
     # Make sure classifier is loaded
-    if classifier is None:
+    if classifier is None and classification is None and classify is None:
         classifier = load_classifier()
     
+    stages = timer.stages
     try:
-        # Load user data
-        user_data = load_user_data()
-        
         # Get user information
-        user = get_user_by_id(user_id, user_data)
+        with timer.stage("user_lookup"):
+            if user is None:
+                user = get_user_directory().get(user_id)
         if not user:
             return {
                 "status": "error",
                 "message": f"User with ID {user_id} not found",
                 "query": query,
-                "is_appropriate": False
+                "is_appropriate": False,
+                "user_id": user_id,
+                "stages": stages
             }
         
         # Ensure past_violations is an integer
@@ -513,18 +1142,46 @@ def process_user_query(user_id, query):
         
         # Rename department field for compatibility with existing code
         user['department'] = user.get('dept')
+        user_name = f"{user.get('first_name', '')} {user.get('last_name', '')}"
+        
+        requested_dept = None
+        authorization = None
+        if classification is None and order == "auth_first":
+            with timer.stage("keywords"):
+                rejection = _keyword_rejection(query.strip())
+                classification = Classification(rejection) if rejection else None
+            if classification is None:
+                with timer.stage("department"):
+                    requested_dept = extract_requested_department(query)
+                if requested_dept:
+                    with timer.stage("authorization"):
+                        authorization = check_authorization(user_id, user.get('dept'), requested_dept, user)
+                # A denied request is still classified: whether it is reported as rejected
+                # or unauthorized depends on the classifier
         
         # Classify the query
-        is_corporate, predicted_label, confidence, scores = is_corporate_related(query, classifier)
+        if classification is None:
+            with timer.stage("classification"):
+                degraded_mode = select_degraded_mode(deadline)
+                if degraded_mode == "full":
+                    classification = classify(query) if classify is not None else is_corporate_related(query, classifier)
+                elif degraded_classify is not None:
+                    classification, degraded_mode = degraded_classify(query, degraded_mode)
+                else:
+                    classification, degraded_mode = classify_degraded(query, classifier, degraded_mode)
+        is_corporate, predicted_label, confidence, scores = classification
         
         result = {
             "query": query,
             "is_appropriate": is_corporate,
             "label": predicted_label,
             "confidence": float(confidence),
+            "truncated": getattr(classification, "truncated", False),
+            "degraded_mode": degraded_mode or "full",
             "user_id": user_id,
             "user_dept": user.get('dept', ''),
-            "user_name": f"{user.get('first_name', '')} {user.get('last_name', '')}"
+            "user_name": user_name,
+            "stages": stages
         }
         
         # If non-corporate, return immediately
@@ -538,7 +1195,9 @@ def process_user_query(user_id, query):
             return result
         
         # Extract requested department from the query
-        requested_dept = extract_requested_department(query)
+        if "department" not in stages:
+            with timer.stage("department"):
+                requested_dept = extract_requested_department(query)
         result["requested_dept"] = requested_dept if requested_dept else ""
         
         # If no specific department was requested
@@ -551,7 +1210,10 @@ def process_user_query(user_id, query):
         
         # Check authorization
         try:
-            is_authorized, reason = check_authorization(user_id, user.get('dept'), requested_dept, user)
+            if authorization is None:
+                with timer.stage("authorization"):
+                    authorization = check_authorization(user_id, user.get('dept'), requested_dept, user)
+            is_authorized, reason = authorization
             result["is_authorized"] = is_authorized
             result["auth_reason"] = reason
             
@@ -576,37 +1238,117 @@ def process_user_query(user_id, query):
             "status": "error",
             "message": str(e),
             "query": query,
-            "is_appropriate": False
+            "is_appropriate": False,
+            "user_id": user_id,
+            "stages": stages
         }
 
+def process_user_queries(requests, classify_batch=None, order=None):
+    """Process (user_id, query) pairs like process_user_query, classifying their queries as one batch.
+    
+    Each distinct user is looked up once and each distinct query classified
+    once. With the auth_first order, requests are first run with a stand-in
+    classifier to find the ones that reach classification; only their
+    queries are classified, and only they are run again. Each request's
+    decision is recorded in the decision log once.
+    
+    Args:
+        requests: List of (user_id, query) pairs
+        classify_batch: Optional callable classifying a list of queries, defaults to is_corporate_related_batch
+        order: One of PIPELINE_ORDERS, defaults to PIPELINE_ORDER
+        
+    Returns:
+        list: process_user_query results, in the order of the requests
+    """
+    global classifier
+    
+    order = _check_order(order)
+    if classify_batch is None:
+        if classifier is None:
+            classifier = load_classifier()
+        classify_batch = lambda queries: is_corporate_related_batch(queries, classifier)
+    
+    directory = get_user_directory()
+    users = {}
+    for user_id, _ in requests:
+        if user_id not in users:
+            # An empty dict marks an unknown user, so process_user_query does not look it up again
+            users[user_id] = directory.get(user_id) or {}
+    
+    results = [None] * len(requests)
+    if order == "auth_first":
+        pending = []
+        for index, (user_id, query) in enumerate(requests):
+            needed = []
+            timer = StageTimer()
+            result = _process_user_query(
+                user_id, query, timer, classify=lambda q: needed.append(q) or (False, "", 0.0, {}),
+                order=order, user=users[user_id]
+            )
+            if needed:
+                pending.append(index)
+            else:
+                _finish_request(result, timer.timings)
+                results[index] = result
+    else:
+        pending = list(range(len(requests)))
+    
+    queries = list(dict.fromkeys(requests[index][1] for index in pending))
+    classifications = dict(zip(queries, classify_batch(queries))) if queries else {}
+    for index in pending:
+        user_id, query = requests[index]
+        if order == "auth_first":
+            results[index] = process_user_query(
+                user_id, query, classify=classifications.__getitem__, order=order, user=users[user_id]
+            )
+        else:
+            results[index] = process_user_query(
+                user_id, query, classification=classifications[query], order=order, user=users[user_id]
+            )
+    return results
+
+# Example queries used by test_examples and the benchmarks
+EXAMPLE_QUERIES = [
+    # Clear non-corporate queries
+    "Tell me about sex",
+    "How to make pancakes",
+    "Tell me a joke about programming",
+    "What movies are playing this weekend",
+    "How do I train my dog",
+    
+    # Clear corporate queries
+    "Show me employees who joined after 2022",
+    "What departments have the most employees?",
+    "List HR policy violations",
+    "What is our company's profit margin this quarter?",
+    "Who has the most training sessions completed?",
+    
+    # Borderline or ambiguous queries
+    "What is the gender distribution in Engineering?",
+    "Tell me about work-life balance",
+    "How do I file a complaint?",
+    "What are the office hours?",
+    "Can I get information about employee benefits?"
+]
+
+def warm_up_classifier(classifier, num_queries, mode=None):
+    """Run the first `num_queries` example queries through the model, bypassing the caches.
+    
+    The first forward passes are much slower than the following ones (lazy
+    kernel and allocator initialization), so a service runs this before it
+    reports ready. Returns the seconds it took.
+    """
+    queries = [admit_query(query, classifier)[0] for query in EXAMPLE_QUERIES[:num_queries]]
+    start = time.perf_counter()
+    if queries:
+        _nli_classify_batch(queries, classifier, 0.45, mode or CLASSIFICATION_MODE)
+    return time.perf_counter() - start
+
 def test_examples(classifier):
     """Test the classifier with various examples."""
-    test_queries = [
-        # Clear non-corporate queries
-        "Tell me about sex",
-        "How to make pancakes",
-        "Tell me a joke about programming",
-        "What movies are playing this weekend",
-        "How do I train my dog",
-        
-        # Clear corporate queries
-        "Show me employees who joined after 2022",
-        "What departments have the most employees?",
-        "List HR policy violations",
-        "What is our company's profit margin this quarter?",
-        "Who has the most training sessions completed?",
-        
-        # Borderline or ambiguous queries
-        "What is the gender distribution in Engineering?",
-        "Tell me about work-life balance",
-        "How do I file a complaint?",
-        "What are the office hours?",
-        "Can I get information about employee benefits?"
-    ]
-    
     print("\n===== TESTING VARIOUS QUERIES =====")
     
-    for query in test_queries:
+    for query in EXAMPLE_QUERIES:
         print(f"\nQuery: {query}")
         is_corporate, predicted_label, confidence, scores = is_corporate_related(query, classifier)
         
@@ -735,6 +1477,9 @@ def main():
     except Exception as e:
         print(f"An error occurred: {e}")
         return False
+    finally:
+        if decision_log is not None:
+            decision_log.close()
     
     return True
 
@@ -0,0 +1,134 @@
+"""Token budget for classifier inputs.
+
+Zero-shot cost grows with the query length times the number of hypotheses.
+Queries over the budget are shortened before they reach the model. Batches are
+split into buckets of similar length, so short queries are not padded up to
+the longest one.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+TRUNCATION_STRATEGIES = ("head", "sentences")
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+
+def length_buckets(lengths, edges):
+    """Group indices by length, one bucket per edge (lengths up to it) plus one for longer.
+
+    Returns:
+        list: Non-empty lists of indices, shortest bucket first
+    """
+    edges = sorted(edges)
+    buckets = [[] for _ in range(len(edges) + 1)]
+    for index, length in enumerate(lengths):
+        position = 0
+        while position < len(edges) and length > edges[position]:
+            position += 1
+        buckets[position].append(index)
+    return [bucket for bucket in buckets if bucket]
+
+
+class QueryAdmission:
+    """Shorten queries to a token budget and remember their length in tokens.
+
+    The "head" strategy keeps the first `max_tokens` tokens. The "sentences"
+    strategy keeps whole sentences that fit the budget, those with keyword hits
+    first and otherwise in text order, and puts them back in text order.
+
+    Args:
+        tokenizer: Tokenizer of the classification model
+        max_tokens (int): Token budget per query, 0 for no budget
+        strategy (str): One of TRUNCATION_STRATEGIES
+        matchers (list): KeywordMatchers whose hits make a sentence a key sentence
+        cache_size (int): Recent queries whose admission is remembered
+    """
+
+    def __init__(self, tokenizer, max_tokens, strategy="head", matchers=(), cache_size=1024):
+        if strategy not in TRUNCATION_STRATEGIES:
+            raise ValueError(f"Unknown truncation strategy '{strategy}', expected one of {TRUNCATION_STRATEGIES}")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.strategy = strategy
+        self.matchers = list(matchers)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # query -> (text, truncated, tokens)
+        self._lock = threading.Lock()
+
+    def _token_ids(self, texts):
+        # Over-long inputs are expected here, so skip the tokenizer's sequence length warning
+        return self.tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+
+    def _head(self, text, max_tokens):
+        """Cut the text after its first `max_tokens` tokens."""
+        try:
+            offsets = self.tokenizer(
+                text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+            )["offset_mapping"]
+        except NotImplementedError:
+            # Slow tokenizers have no offsets, so decode the kept tokens instead
+            ids = self._token_ids(text)
+            return text if len(ids) <= max_tokens else self.tokenizer.decode(ids[:max_tokens]).strip()
+        if len(offsets) <= max_tokens:
+            return text
+        return text[:offsets[max_tokens - 1][1]]
+
+    def _key_sentences(self, text):
+        sentences = [sentence for sentence in _SENTENCE_BREAK.split(text) if sentence]
+        lengths = [len(ids) for ids in self._token_ids(sentences)]
+        hits = [
+            sum(len(matcher.find_all(sentence.lower())) for matcher in self.matchers) for sentence in sentences
+        ]
+        chosen = []
+        used = 0
+        for index in sorted(range(len(sentences)), key=lambda i: (-hits[i], i)):
+            if used + lengths[index] <= self.max_tokens:
+                chosen.append(index)
+                used += lengths[index]
+        if not chosen:
+            return self._head(text, self.max_tokens)
+        # Joining can merge tokens differently, so cut again to be sure of the budget
+        return self._head(" ".join(sentences[index] for index in sorted(chosen)), self.max_tokens)
+
+    def _remember(self, query, entry):
+        with self._lock:
+            self._cache[query] = entry
+            self._cache.move_to_end(query)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def admit(self, query):
+        """Return (text, truncated): the query shortened to the budget, and whether it had to be."""
+        with self._lock:
+            cached = self._cache.get(query)
+        if cached is not None:
+            return cached[0], cached[1]
+
+        tokens = len(self._token_ids(query))
+        if not self.max_tokens or tokens <= self.max_tokens:
+            self._remember(query, (query, False, tokens))
+            return query, False
+
+        text = self._head(query, self.max_tokens) if self.strategy == "head" else self._key_sentences(query)
+        tokens = len(self._token_ids(text))
+        self._remember(query, (text, True, tokens))
+        # The shortened text is what the model sees, so remember its length as well
+        self._remember(text, (text, False, tokens))
+        return text, True
+
+    def count_tokens(self, texts):
+        """Length in tokens of each text, from the cache where the text was admitted recently."""
+        lengths = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for index, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is not None and cached[0] == text:
+                    lengths[index] = cached[2]
+                else:
+                    missing.append(index)
+        if missing:
+            for index, ids in zip(missing, self._token_ids([texts[index] for index in missing])):
+                lengths[index] = len(ids)
+        return lengths
@@ -0,0 +1,23 @@
+import csv
+import json
+
+
+def iter_query_log(path):
+    """Yield the queries of a query log one at a time, without reading the whole file (see load_query_log)."""
+    with open(path, newline="") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)["query"]
+        elif path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield row["query"]
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+def load_query_log(path):
+    """Read queries from a text file (one per line), a JSONL file or a CSV file with a 'query' field."""
+    return list(iter_query_log(path))
@@ -0,0 +1,265 @@
+"""Reclassify a query log offline, e.g. after the labels or thresholds change.
+
+Queries are streamed from the log in batches, classified across forked
+inference workers and written in input order, as JSONL or as a directory of
+Parquet files. Progress is checkpointed next to the output, so an interrupted
+run continues where it stopped with --resume:
+
+    python reclassify.py --input queries.jsonl --output results.jsonl --workers 4
+    python reclassify.py --input queries.csv --output results --format parquet --resume
+"""
+import argparse
+import collections
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main_model
+from inference_workers import TORCH_THREADS_PER_WORKER, InferenceWorkerPool
+from query_log import iter_query_log
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("jsonl", "parquet")
+
+
+def _batches(queries, batch_size, start=0):
+    """Yield (index of the first query, queries) batches, skipping the first `start` queries."""
+    queries = itertools.islice(queries, start, None)
+    index = start
+    while True:
+        batch = list(itertools.islice(queries, batch_size))
+        if not batch:
+            return
+        yield index, batch
+        index += len(batch)
+
+
+def _records(index, queries, results):
+    for offset, (query, (is_corporate, label, confidence, scores)) in enumerate(zip(queries, results)):
+        yield {
+            "index": index + offset,
+            "query": query,
+            "is_corporate": bool(is_corporate),
+            "label": label,
+            "confidence": float(confidence),
+            "scores": {name: float(score) for name, score in scores.items()},
+        }
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint to a temporary file and move it into place, so it is never half written."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class JsonlResultWriter:
+    """Append results to a JSONL file; on resume, anything after the checkpoint is cut off first."""
+
+    def __init__(self, path, checkpoint=None):
+        if checkpoint:
+            self._file = open(path, "r+b")
+            self._file.truncate(checkpoint["output_bytes"])
+            self._file.seek(checkpoint["output_bytes"])
+        else:
+            self._file = open(path, "wb")
+
+    def write(self, records):
+        for record in records:
+            self._file.write((json.dumps(record) + "\n").encode("utf-8"))
+
+    def commit(self):
+        """Make everything written so far durable and return its position for the checkpoint."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"output_bytes": self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """Write results to a directory of Parquet files, one per checkpoint; parts after the checkpoint are removed on resume."""
+
+    def __init__(self, directory, checkpoint=None):
+        import pyarrow as pa
+
+        self.schema = pa.schema([
+            ("index", pa.int64()),
+            ("query", pa.string()),
+            ("is_corporate", pa.bool_()),
+            ("label", pa.string()),
+            ("confidence", pa.float64()),
+            ("scores", pa.map_(pa.string(), pa.float64())),
+        ])
+        self.directory = directory
+        self._parts = checkpoint["parts"] if checkpoint else 0
+        self._rows = []
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith("part-") and int(name[5:10]) >= self._parts:
+                os.remove(os.path.join(directory, name))
+
+    def write(self, records):
+        self._rows.extend(records)
+
+    def commit(self):
+        """Write the rows buffered since the last checkpoint as the next part file."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._rows:
+            path = os.path.join(self.directory, f"part-{self._parts:05d}.parquet")
+            pq.write_table(pa.Table.from_pylist(self._rows, schema=self.schema), path + ".tmp")
+            os.replace(path + ".tmp", path)
+            self._parts += 1
+            self._rows = []
+        return {"parts": self._parts}
+
+    def close(self):
+        pass
+
+
+def reclassify(input_path, output_path, fmt="jsonl", confidence_threshold=0.45, mode=None, workers=1,
+               batch_size=32, checkpoint_every=10, resume=False):
+    """Classify every query in a query log and write the results in input order.
+
+    At most two batches per worker are in flight and Parquet rows are only
+    buffered until the next checkpoint, so memory use does not grow with the
+    size of the log. The classifier must already be loaded in main_model.
+
+    Args:
+        input_path (str): Query log (.jsonl, .csv or one query per line)
+        output_path (str): JSONL file, or directory of Parquet files
+        fmt (str): One of OUTPUT_FORMATS
+        confidence_threshold (float): Passed to the decision rules
+        mode (str): One of main_model.CLASSIFICATION_MODES, defaults to CLASSIFICATION_MODE
+        workers (int): Forked inference worker processes; 0 classifies in this process
+        batch_size (int): Queries per batch
+        checkpoint_every (int): Batches between checkpoints
+        resume (bool): Continue from the checkpoint of an earlier run with the same input and configuration
+
+    Returns:
+        dict: Queries classified by this run, total done, seconds and queries per second
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}', expected one of {OUTPUT_FORMATS}")
+    mode = main_model._check_mode(mode)
+    checkpoint_path = output_path.rstrip("/") + ".checkpoint.json"
+    # A checkpoint only applies to the same input and the same labels, thresholds and model
+    run = {
+        "input": os.path.abspath(input_path),
+        "format": fmt,
+        "config": main_model._cache_key("", main_model.classifier, confidence_threshold, mode),
+    }
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None:
+        if {key: checkpoint.get(key) for key in run} != run:
+            raise ValueError(f"Checkpoint {checkpoint_path} was written for a different input or configuration")
+        logger.info(f"Resuming after {checkpoint['queries_done']} queries")
+    done = checkpoint["queries_done"] if checkpoint else 0
+
+    writer = (JsonlResultWriter if fmt == "jsonl" else ParquetResultWriter)(output_path, checkpoint)
+    pool = InferenceWorkerPool(workers, torch_threads=TORCH_THREADS_PER_WORKER) if workers > 0 else None
+    # Keyword screening and the semantic cache run in this process, one thread per worker, around the workers' NLI passes
+    screening = ThreadPoolExecutor(max_workers=workers) if pool is not None else None
+    in_flight = collections.deque()
+    max_in_flight = 2 * max(1, workers)
+    classified = 0
+    batches_since_checkpoint = 0
+    start_time = time.perf_counter()
+
+    def save(complete=False):
+        save_checkpoint(checkpoint_path, {**run, **writer.commit(), "queries_done": done, "complete": complete})
+        seconds = time.perf_counter() - start_time
+        logger.info(f"{done} queries done, {classified / seconds if seconds else 0.0:.1f} queries/s")
+
+    def collect():
+        nonlocal done, classified, batches_since_checkpoint
+        index, queries, pending = in_flight.popleft()
+        results = pending.result() if pool is not None else pending
+        writer.write(_records(index, queries, results))
+        done = index + len(queries)
+        classified += len(queries)
+        batches_since_checkpoint += 1
+        if batches_since_checkpoint >= checkpoint_every:
+            batches_since_checkpoint = 0
+            save()
+
+    try:
+        if pool is not None:
+            pool.start()
+        for index, queries in _batches(iter_query_log(input_path), batch_size, start=done):
+            if pool is not None:
+                in_flight.append((index, queries, screening.submit(
+                    main_model._classify_batch, queries, main_model.classifier, confidence_threshold, mode,
+                    pool.classify_batch
+                )))
+            else:
+                results = main_model._classify_batch(queries, main_model.classifier, confidence_threshold, mode)
+                in_flight.append((index, queries, results))
+            while len(in_flight) >= max_in_flight:
+                collect()
+        while in_flight:
+            collect()
+        save(complete=True)
+    finally:
+        writer.close()
+        if pool is not None:
+            screening.shutdown(cancel_futures=True)
+            pool.stop()
+
+    seconds = time.perf_counter() - start_time
+    return {
+        "queries": classified,
+        "total": done,
+        "seconds": seconds,
+        "queries_per_second": classified / seconds if seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reclassify a query log with the current labels and thresholds")
+    parser.add_argument("--input", required=True, help="Query log (.jsonl, .csv or one query per line)")
+    parser.add_argument("--output", required=True, help="JSONL file, or directory for --format parquet")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="jsonl")
+    parser.add_argument("--model", default="facebook/bart-large-mnli", help="Zero-shot classification model")
+    parser.add_argument("--mode", choices=main_model.CLASSIFICATION_MODES, default=main_model.CLASSIFICATION_MODE)
+    parser.add_argument("--threshold", type=float, default=0.45, help="Confidence threshold for the decision rules")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Inference worker processes (0: in process)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="Batches between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Workers preload the models of the configured mode before forking
+    main_model.CLASSIFICATION_MODE = args.mode
+    main_model.classifier = main_model.load_classifier(args.model)
+    stats = reclassify(
+        args.input, args.output, fmt=args.format, confidence_threshold=args.threshold, mode=args.mode,
+        workers=args.workers, batch_size=args.batch_size, checkpoint_every=args.checkpoint_every, resume=args.resume
+    )
+    logger.info(f"Classified {stats['queries']} queries in {stats['seconds']:.1f}s "
+                f"({stats['queries_per_second']:.1f} queries/s), {stats['total']} in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import logging
+import threading
+
+import numpy as np
+
+from embeddings import encode
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Reuse classifications of recent queries that mean the same thing.
+
+    Recent query embeddings are kept in a fixed-size matrix (oldest entries are
+    overwritten first). A lookup embeds the query and takes its nearest
+    neighbour by cosine similarity; at or above `threshold` the neighbour's
+    stored value is reused.
+
+    Entries carry a namespace (e.g. model and decision parameters) and only
+    match lookups in the same namespace: entries of other namespaces are
+    masked out before the nearest neighbour is taken.
+
+    Args:
+        encoder: Sentence encoder from embeddings.load_sentence_encoder
+        threshold (float): Minimum cosine similarity for a hit
+        capacity (int): Number of recent queries kept
+    """
+
+    def __init__(self, encoder, threshold=0.92, capacity=2048):
+        self.encoder = encoder
+        self.threshold = threshold
+        self.capacity = capacity
+        self._matrix = None
+        self._entries = [None] * capacity  # (namespace, query, value)
+        self._namespace_ids = np.full(capacity, -1, dtype=np.int64)
+        self._namespaces = {}
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def embed(self, queries):
+        """Embed a list of queries (one row per query)."""
+        return encode(self.encoder, queries)
+
+    def lookup(self, embedding, namespace=None):
+        """Return (value, similarity, matched_query) for the nearest neighbour, or None on a miss."""
+        with self._lock:
+            namespace_id = self._namespaces.get(namespace)
+            if self._size and namespace_id is not None:
+                similarities = self._matrix[:self._size] @ embedding
+                similarities[self._namespace_ids[:self._size] != namespace_id] = -np.inf
+                index = int(np.argmax(similarities))
+                similarity = float(similarities[index])
+                if similarity >= self.threshold:
+                    _, matched_query, value = self._entries[index]
+                    self._counters["hits"] += 1
+                    return value, similarity, matched_query
+            self._counters["misses"] += 1
+            return None
+
+    def add(self, embedding, query, value, namespace=None):
+        """Store a query's embedding and value, overwriting the oldest entry when full."""
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, embedding.shape[0]), dtype=np.float32)
+            self._matrix[self._next] = embedding
+            self._entries[self._next] = (namespace, query, value)
+            self._namespace_ids[self._next] = self._namespaces.setdefault(namespace, len(self._namespaces))
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._entries = [None] * self.capacity
+            self._namespace_ids[:] = -1
+            self._namespaces = {}
+            self._size = 0
+            self._next = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "hits": self._counters["hits"],
+                "misses": self._counters["misses"],
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                "entries": self._size,
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import main_model
+from tests.synthetic import write_synthetic_users
+
+
+@pytest.fixture(autouse=True)
+def app_dir(monkeypatch):
+    """Run every test from the app directory, where the default data and policy paths resolve."""
+    monkeypatch.chdir(APP_DIR)
+    return APP_DIR
+
+
+@pytest.fixture
+def mock_users(monkeypatch):
+    """The user directory reloaded from MOCK_DATA.csv."""
+    monkeypatch.setattr(main_model, "user_directory", None)
+    return main_model.get_user_directory()
+
+
+@pytest.fixture
+def synthetic_users(tmp_path, monkeypatch):
+    """A directory of 200 generated users, which main_model loads instead of MOCK_DATA.csv."""
+    path = str(tmp_path / "users.csv")
+    write_synthetic_users(path, 200, seed=1)
+    monkeypatch.setattr(main_model, "USER_DATA_PATH", path)
+    monkeypatch.setattr(main_model, "user_directory", None)
+    return main_model.get_user_directory()
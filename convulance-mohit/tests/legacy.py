@@ -0,0 +1,194 @@
+"""The implementations the optimized paths replaced, as references for the parity tests and the benchmarks."""
+import re
+
+import main_model
+
+
+def legacy_check_authorization(employee_id, employee_dept, requested_dept, employee_info=None):
+    """The branch chain check_authorization used before the compiled policy."""
+    try:
+        # If no specific department was requested/detected
+        if not requested_dept:
+            main_model.logger.warning("No specific department detected in the query")
+            return False, "No specific department detected in the query"
+
+        # Enhanced security checks based on additional factors
+        if employee_info:
+            # 1. Check IP address - localhost (127.0.0.1) gets special treatment
+            ip_address = employee_info.get('ip_address', '')
+            is_localhost = ip_address == '127.0.0.1' or ip_address == 'localhost'
+
+            # 2. Check past violations - reject if too many violations
+            past_violations = employee_info.get('past_violations', 0)
+            try:
+                past_violations = int(past_violations)
+            except (ValueError, TypeError):
+                past_violations = 0
+
+            # 3. Check join date - newer employees might have more restrictions
+            join_date = employee_info.get('join_date', '')
+            is_new_employee = False
+            months_employed = employee_info.get('months_employed')
+
+            if months_employed is not None:
+                # Precomputed by the user directory
+                is_new_employee = months_employed < 3  # Less than 3 months at company
+            elif join_date:
+                try:
+                    from datetime import datetime
+                    # Check if join_date is a datetime object or a string
+                    if isinstance(join_date, str):
+                        # Try different date formats
+                        try:
+                            join_date_obj = datetime.strptime(join_date, '%Y-%m-%d')
+                        except ValueError:
+                            try:
+                                join_date_obj = datetime.strptime(join_date, '%d/%m/%Y')
+                            except ValueError:
+                                try:
+                                    join_date_obj = datetime.strptime(join_date, '%m/%d/%Y')
+                                except ValueError:
+                                    # If all parsing attempts fail, default to not a new employee
+                                    join_date_obj = None
+                    else:
+                        join_date_obj = join_date
+
+                    if join_date_obj:
+                        today = datetime.now()
+                        months_employed = (today.year - join_date_obj.year) * 12 + (today.month - join_date_obj.month)
+                        is_new_employee = months_employed < 3  # Less than 3 months at company
+                except Exception as e:
+                    main_model.logger.warning(f"Error processing join date: {e}")
+
+            # Security decision logic based on additional factors
+
+            # Automatic rejection for serious security concerns
+            if past_violations >= 3:
+                main_model.logger.warning(f"Employee {employee_id} has {past_violations} past violations - access denied")
+                return False, f"Access denied due to {past_violations} past security violations"
+
+            # Special case: New employees with past violations have restricted access
+            if is_new_employee and past_violations > 0:
+                # New employees with violations can only access their own department
+                if employee_dept != requested_dept:
+                    main_model.logger.warning(f"New employee {employee_id} with past violations - restricted to own department")
+                    return False, "New employees with past violations can only access their own department"
+
+            # Localhost gets elevated privileges (typically for admin/dev purposes)
+            if is_localhost:
+                main_model.logger.info(f"Request from localhost ({ip_address}) - granting elevated access")
+                return True, "Localhost connection with elevated access"
+
+        # Always allow employees to access their own department's data
+        if employee_dept == requested_dept:
+            main_model.logger.info(f"Employee {employee_id} authorized to access their own department ({employee_dept})")
+            return True, "Access to own department data"
+
+        # Special roles with broader access
+        # Ensure employee_id is converted to int for comparison with dictionary keys
+        try:
+            employee_id_int = int(employee_id)
+        except (ValueError, TypeError):
+            # If it can't be converted to int, it won't match any special role keys
+            employee_id_int = None
+
+        special_roles = {
+            # Format: employee_id: [departments_with_access]
+            10: ["Human Resources", "Engineering", "Sales", "Marketing"],  # HR admin with access to all departments
+            16: ["Legal", "Human Resources", "Accounting"],  # Legal team lead
+            13: ["Accounting", "Sales", "Marketing"],  # Finance director
+        }
+
+        # Check for special roles - using the integer ID for comparison
+        if employee_id_int is not None and employee_id_int in special_roles and requested_dept in special_roles[employee_id_int]:
+            # If employee has past violations, extra scrutiny even with special role
+            if employee_info and past_violations > 0:
+                main_model.logger.warning(f"Special role user {employee_id} has {past_violations} violations - restricted privileges")
+                if past_violations >= 2:
+                    return False, f"Special role restricted due to {past_violations} violations"
+
+            main_model.logger.info(f"Employee {employee_id} has special role authorization for {requested_dept}")
+            return True, f"Special role authorization for {requested_dept}"
+
+        # Cross-department access rules
+        cross_dept_access = {
+            "Human Resources": main_model.DEPARTMENTS,  # HR can access all departments
+            "Legal": main_model.DEPARTMENTS,  # Legal can access all departments
+            "Accounting": ["Sales", "Marketing", "Business Development", "Services"],  # Finance can access revenue departments
+            "Engineering": ["Product Management", "Research and Development"],  # Engineering can access related technical departments
+        }
+
+        # Check cross-department access rules - with added restriction for employees with violations
+        if employee_dept in cross_dept_access and requested_dept in cross_dept_access[employee_dept]:
+            # If employee has past violations, extra scrutiny for cross-department access
+            if employee_info and past_violations > 0:
+                main_model.logger.warning(f"Employee {employee_id} has {past_violations} violations - restricted cross-dept access")
+                return False, f"Cross-department access restricted due to past violations"
+
+            main_model.logger.info(f"Employee from {employee_dept} has cross-department authorization for {requested_dept}")
+            return True, f"Cross-department authorization from {employee_dept} to {requested_dept}"
+
+        # Default: no access
+        main_model.logger.warning(f"Employee {employee_id} from {employee_dept} NOT authorized to access {requested_dept}")
+        return False, f"No authorization from {employee_dept} to {requested_dept}"
+
+    except Exception as e:
+        main_model.logger.error(f"Error in authorization check: {e}")
+        # Default to denying access on error
+        return False, f"Authorization error: {str(e)}"
+
+
+def legacy_extract_requested_department(query, mapping=None):
+    """The loops extract_requested_department used before the department resolver."""
+    mapping = main_model.DEPARTMENT_MAPPING if mapping is None else mapping
+    try:
+        # Clean and normalize query
+        query = query.lower().strip()
+
+        # First, check for direct department mentions using the mapping
+        for dept_variant, standard_name in mapping.items():
+            pattern = r'\b' + re.escape(dept_variant) + r'\b'
+            if re.search(pattern, query):
+                main_model.logger.info(f"Found department mention: {standard_name}")
+                return standard_name
+
+        # If no direct match, try classification approach for department detection
+        department_indicators = [
+            (r'\bdata\s+from\s+(\w+\s*\w*)\b', 1),
+            (r'\bget\s+(\w+\s*\w*)\s+information\b', 1),
+            (r'\baccess\s+to\s+(\w+\s*\w*)\b', 1),
+            (r'\b(\w+\s*\w*)\s+department\b', 1),
+            (r'\b(\w+\s*\w*)\s+team\b', 1),
+            (r'\bfrom\s+(\w+\s*\w*)\s+department\b', 1),
+            (r'\bfor\s+(\w+\s*\w*)\s+department\b', 1)
+        ]
+
+        potential_departments = []
+
+        for pattern, group in department_indicators:
+            matches = re.finditer(pattern, query)
+            for match in matches:
+                try:
+                    dept = match.group(group).strip()
+                    if dept:
+                        # Check if this extracted term maps to a known department
+                        if dept.lower() in mapping:
+                            potential_departments.append(mapping[dept.lower()])
+                        # Try partial matching
+                        else:
+                            for known_dept, standard_name in mapping.items():
+                                if dept.lower() in known_dept or known_dept in dept.lower():
+                                    potential_departments.append(standard_name)
+                                    break
+                except:
+                    continue
+
+        # Return the first found department or None
+        if potential_departments:
+            return potential_departments[0]
+
+        return None
+
+    except Exception as e:
+        main_model.logger.error(f"Error extracting department: {e}")
+        return None
@@ -0,0 +1,104 @@
+"""Generated users, departments and department queries for the parity tests and the benchmarks."""
+import csv
+import random
+import string
+
+import main_model
+
+
+def write_synthetic_users(path, count, seed=0):
+    """Write a user CSV shaped like MOCK_DATA.csv with `count` random users."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "first_name", "last_name", "email", "gender", "ip_address", "dept",
+                         "profile_url", "join_date", "past_violations"])
+        for user_id in range(1, count + 1):
+            first = "".join(rng.choice(string.ascii_lowercase) for _ in range(6)).title()
+            last = "".join(rng.choice(string.ascii_lowercase) for _ in range(8)).title()
+            writer.writerow([
+                user_id, first, last, f"{first}.{last}@example.com".lower(), rng.choice(["Male", "Female"]),
+                ".".join(str(rng.randint(1, 254)) for _ in range(4)), rng.choice(main_model.DEPARTMENTS),
+                f"https://robohash.org/{first}{last}.png?size=50x50&set=set1",
+                f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2015, 2025)}", rng.randint(0, 4)
+            ])
+
+
+# Sentences a department name is dropped into for the department queries
+DEPARTMENT_TEMPLATES = [
+    "Show me the {} department budget",
+    "I need data from {} for the audit",
+    "Can I get {} information for last year?",
+    "Give me access to {} files",
+    "Who is on the {} team?",
+    "Reports for {} department please",
+    "What does {} do all day",
+    "{} headcount by quarter",
+]
+
+
+# Queries with words close to a department name that must not resolve to it
+NEAR_MISS_QUERIES = [
+    "Send me the supporting documents for my expense claim",
+    "Is the service desk open",
+    "Who are the top researchers this year",
+    "Who is the best salesperson in the building",
+    "What is the engine size of the company car",
+]
+
+
+def misspell(word, rng):
+    """Drop, double or swap one letter of a word."""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(("drop", "double", "swap"))
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    if edit == "double":
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def department_query_corpus(aliases, departments, queries=(), seed=0):
+    """Queries naming each alias and department, misspelt departments, and queries naming none.
+
+    `queries` are added to the example and near-miss queries as queries naming none.
+
+    Returns:
+        tuple: (queries, {query: intended department} for the misspelt ones)
+    """
+    rng = random.Random(seed)
+    queries = list(main_model.EXAMPLE_QUERIES + NEAR_MISS_QUERIES) + list(queries)
+    for name in list(aliases) + list(departments) + [dept.lower() for dept in departments]:
+        queries.extend(template.format(name) for template in DEPARTMENT_TEMPLATES)
+    misspelt = {}
+    for dept in departments:
+        for template in DEPARTMENT_TEMPLATES:
+            words = dept.lower().split()
+            longest = max(range(len(words)), key=lambda i: len(words[i]))
+            words[longest] = misspell(words[longest], rng)
+            query = template.format(" ".join(words))
+            misspelt[query] = dept
+    queries.extend(misspelt)
+    words = [word for query in main_model.EXAMPLE_QUERIES for word in query.lower().rstrip("?").split()]
+    for _ in range(200):
+        queries.append(rng.choice(DEPARTMENT_TEMPLATES).format(" ".join(rng.sample(words, 2))))
+    return queries, misspelt
+
+
+def synthetic_departments(count, seed=0):
+    """`count` aliases over count // 4 departments with made-up names, in random order."""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+    departments = [f"{word().title()} {word().title()}" for _ in range(max(1, count // 4))]
+    aliases = {}
+    for dept in departments:
+        aliases[dept.lower()] = dept
+        aliases["".join(part[0] for part in dept.lower().split()) + word()[:2]] = dept
+    while len(aliases) < count:
+        aliases[word()] = rng.choice(departments)
+    return departments, aliases
@@ -0,0 +1,88 @@
+"""The user directory and the compiled authorization policy against the per-call logic they replaced."""
+from datetime import datetime
+
+import pytest
+
+import main_model
+from authorization_audit import iter_audit
+from tests.legacy import legacy_check_authorization
+from user_directory import UserDirectory
+
+# Employees covering every policy branch: special roles, violations, new joiners, localhost and unparsable dates
+AUTHORIZATION_PROBES = [
+    {"id": 10, "dept": "Human Resources", "ip_address": "10.0.0.1", "join_date": "2020-01-15", "past_violations": 0},
+    {"id": 10, "dept": "Human Resources", "ip_address": "10.0.0.1", "join_date": "15/01/2020", "past_violations": 2},
+    {"id": 16, "dept": "Legal", "ip_address": "10.0.0.2", "join_date": "01/31/2021", "past_violations": 1},
+    {"id": 13, "dept": "Accounting", "ip_address": "127.0.0.1", "join_date": "not a date", "past_violations": "1"},
+    {"id": "EMP004", "dept": "Engineering", "ip_address": "localhost", "join_date": "", "past_violations": None},
+    {"id": "EMP005", "dept": "Sales", "ip_address": "10.0.0.5", "join_date": "2022-12-01", "past_violations": 3},
+]
+
+
+@pytest.fixture(scope="module")
+def directory():
+    return UserDirectory("MOCK_DATA.csv")
+
+
+def test_user_directory_matches_pandas_lookup(directory):
+    legacy_data = main_model.load_user_data("MOCK_DATA.csv")
+    mismatches = []
+    for user_id in legacy_data["id"]:
+        legacy = main_model.get_user_by_id(user_id, legacy_data)
+        user = directory.get(int(user_id))
+        for field in ("first_name", "last_name", "dept", "ip_address", "past_violations"):
+            if legacy[field] != user[field]:
+                mismatches.append((user_id, field, legacy[field], user[field]))
+        for ip_address in (user["ip_address"], "127.0.0.1"):
+            legacy["ip_address"] = user["ip_address"] = ip_address
+            for dept in main_model.DEPARTMENTS:
+                expected = main_model.check_authorization(user_id, legacy["dept"], dept, legacy)
+                actual = main_model.check_authorization(user_id, user["dept"], dept, user)
+                if expected != actual:
+                    mismatches.append((user_id, dept, expected, actual))
+    assert len(legacy_data) == len(directory)
+    assert mismatches == []
+
+
+def test_compiled_policy_matches_branch_chain(directory):
+    # Every user with their own IP and localhost, as a new joiner and a long-standing employee, and without details
+    today = datetime.now()
+    recent = f"{today.year}-{today.month:02d}-01"
+    employees = []
+    for user_id in range(1, len(directory) + 1):
+        user = directory.get(user_id)
+        for ip_address in (user["ip_address"], "127.0.0.1"):
+            employees.append(dict(user, ip_address=ip_address))
+            employees.append(dict(user, ip_address=ip_address, months_employed=None, join_date=recent))
+        employees.append(None)
+    for probe in AUTHORIZATION_PROBES:
+        employees.append(probe)
+        employees.append(dict(probe, join_date=recent))
+
+    mismatches = []
+    for employee in employees:
+        employee_id = employee["id"] if employee else 1
+        employee_dept = employee["dept"] if employee else "Engineering"
+        for dept in main_model.DEPARTMENTS + [None, "Unknown Department"]:
+            expected = legacy_check_authorization(employee_id, employee_dept, dept, employee)
+            actual = main_model.check_authorization(employee_id, employee_dept, dept, employee)
+            if expected != actual:
+                mismatches.append((employee, dept, expected, actual))
+    assert mismatches == []
+
+
+def test_audit_matches_compiled_policy(directory):
+    policy = main_model.get_authorization_policy()
+    checks = 0
+    mismatches = []
+    for batch in iter_audit(policy, directory.columns(), list(policy.departments)):
+        batch = batch.to_pydict()
+        for user_id, dept, requested, authorized, reason in zip(
+            batch["user_id"], batch["user_dept"], batch["requested_dept"], batch["authorized"], batch["reason"]
+        ):
+            checks += 1
+            expected = policy.authorize(user_id, dept, requested, directory.get(user_id))
+            if expected != (bool(authorized), reason):
+                mismatches.append((user_id, requested, expected, (bool(authorized), reason)))
+    assert checks == len(directory) * len(policy.departments)
+    assert mismatches == []
@@ -0,0 +1,54 @@
+"""The department resolver against the alias loops it replaced, on generated department queries."""
+import pytest
+
+import main_model
+from department_resolver import FUZZY_THRESHOLD, DepartmentResolver
+from tests.legacy import legacy_extract_requested_department
+from tests.synthetic import NEAR_MISS_QUERIES, department_query_corpus, synthetic_departments
+
+
+def _assert_resolver_matches_loops(aliases, departments):
+    """Both resolvers agree with the loops on every query, except a misspelt department the fuzzy step recovers."""
+    queries, misspelt = department_query_corpus(aliases, departments)
+    exact = DepartmentResolver(aliases, departments)
+    fuzzy = DepartmentResolver(aliases, departments, fuzzy_threshold=FUZZY_THRESHOLD)
+    mismatches = []
+    for query in queries:
+        expected = legacy_extract_requested_department(query, aliases)
+        without_fuzzy = exact.resolve(query)
+        with_fuzzy = fuzzy.resolve(query)
+        if expected is None and with_fuzzy == misspelt.get(query):
+            with_fuzzy = None
+        if without_fuzzy != expected or with_fuzzy != expected:
+            mismatches.append((query, expected, without_fuzzy, with_fuzzy))
+    assert mismatches == []
+
+
+def test_resolver_matches_loops():
+    _assert_resolver_matches_loops(main_model.DEPARTMENT_MAPPING, main_model.DEPARTMENTS)
+
+
+@pytest.mark.parametrize("count", [25, 250])
+def test_resolver_matches_loops_on_synthetic_aliases(count):
+    departments, aliases = synthetic_departments(count)
+    _assert_resolver_matches_loops(aliases, departments)
+
+
+def test_fuzzy_step_recovers_misspelt_departments():
+    queries, misspelt = department_query_corpus(main_model.DEPARTMENT_MAPPING, main_model.DEPARTMENTS)
+    resolver = DepartmentResolver(main_model.DEPARTMENT_MAPPING, main_model.DEPARTMENTS, fuzzy_threshold=FUZZY_THRESHOLD)
+    recovered = [query for query, dept in misspelt.items() if resolver.resolve(query) == dept]
+    assert recovered
+
+
+@pytest.mark.parametrize("query", NEAR_MISS_QUERIES)
+def test_fuzzy_step_ignores_words_outside_indicator_phrases(query):
+    resolver = DepartmentResolver(main_model.DEPARTMENT_MAPPING, main_model.DEPARTMENTS, fuzzy_threshold=FUZZY_THRESHOLD)
+    assert resolver.resolve(query) is None
+
+
+def test_fuzzy_step_is_off_by_default():
+    resolver = DepartmentResolver({"accounting": "Accounting"}, ["Accounting"])
+    assert resolver.resolve("I need data from acounting") is None
+    resolver = DepartmentResolver({"accounting": "Accounting"}, ["Accounting"], fuzzy_threshold=FUZZY_THRESHOLD)
+    assert resolver.resolve("I need data from acounting") == "Accounting"
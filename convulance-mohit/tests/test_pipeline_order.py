@@ -0,0 +1,54 @@
+"""Both pipeline orders against each other, with a stubbed classifier so no model is loaded."""
+import random
+
+import pytest
+
+import main_model
+from tests.synthetic import department_query_corpus
+
+CORPORATE = (True, "employee data request", 0.9, {"employee data request": 0.9})
+NOT_CORPORATE = (False, "personal question", 0.9, {"personal question": 0.9})
+
+
+def _department_queries():
+    return [f"Show me the performance reviews in the {dept} department" for dept in main_model.DEPARTMENTS]
+
+
+def _assert_orders_agree(user_ids, queries):
+    """Every user sends every query with the classifier forced each way; the results must match but for `stages`."""
+    mismatches = []
+    for user_id in user_ids:
+        for query in queries:
+            for forced in (CORPORATE, NOT_CORPORATE):
+                expected = main_model.process_user_query(
+                    user_id, query, classification=main_model._keyword_rejection(query) or forced,
+                    order="classify_first"
+                )
+                actual = main_model.process_user_query(user_id, query, classify=lambda _: forced, order="auth_first")
+                expected.pop("stages")
+                actual.pop("stages")
+                if actual != expected:
+                    mismatches.append((user_id, query, forced[0], expected, actual))
+    assert mismatches == []
+
+
+def test_orders_agree_on_mock_users(mock_users):
+    # Unknown ids on either side of the directory as well
+    user_ids = list(range(1, len(mock_users) + 1)) + [0, len(mock_users) + 1]
+    _assert_orders_agree(user_ids, main_model.EXAMPLE_QUERIES + _department_queries())
+
+
+def test_orders_agree_on_generated_users_and_queries(synthetic_users):
+    queries, _ = department_query_corpus(main_model.DEPARTMENT_MAPPING, main_model.DEPARTMENTS, seed=1)
+    _assert_orders_agree(range(1, len(synthetic_users) + 1), random.Random(1).sample(queries, 60))
+
+
+@pytest.mark.parametrize("forced, status", [(NOT_CORPORATE, "rejected"), (CORPORATE, "unauthorized")])
+def test_denied_request_has_same_status_in_both_orders(mock_users, forced, status):
+    # User 10 has 3 past violations, so the policy denies them every other department
+    user_id, query = 10, "Show me the salaries in the finance department"
+    expected = main_model.process_user_query(user_id, query, classification=forced, order="classify_first")
+    actual = main_model.process_user_query(user_id, query, classify=lambda _: forced, order="auth_first")
+    assert expected["status"] == actual["status"] == status
+    assert actual["label"] == forced[1]
+    assert actual["stages"][:4] == ["user_lookup", "keywords", "department", "authorization"]
@@ -0,0 +1,82 @@
+"""Train the small first-stage model of the classifier cascade.
+
+bart-large-mnli labels a query log through the normal decision rules, and a
+TF-IDF + logistic regression model learns to reproduce those labels.
+
+    python train_cascade_model.py --log queries.jsonl --output cascade_model.pkl
+"""
+import argparse
+import logging
+import pickle
+import random
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+import main_model
+from cascade import training_target
+from query_log import load_query_log
+
+logger = logging.getLogger(__name__)
+
+
+def label_queries(queries, classifier, batch_size=32, mode="sequential"):
+    """Label queries with the NLI pipeline, skipping those settled by keyword screening."""
+    queries = [query.strip() for query in queries if query.strip() and not main_model._keyword_rejection(query.strip())]
+    targets = []
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        results = main_model._nli_classify_batch(batch, classifier, 0.45, mode)
+        targets.extend(training_target(result, main_model.CORPORATE_LABELS) for result in results)
+        logger.info(f"Labelled {min(start + batch_size, len(queries))}/{len(queries)} queries")
+    return queries, targets
+
+
+def train_small_model(queries, targets):
+    """Fit a TF-IDF + logistic regression pipeline on the labelled queries."""
+    model = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, lowercase=True)),
+        ("classifier", LogisticRegression(max_iter=1000, class_weight="balanced")),
+    ])
+    model.fit(queries, targets)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the cascade's small model on bart-large-mnli labels")
+    parser.add_argument("--log", required=True, help="Query log (.txt, .jsonl or .csv)")
+    parser.add_argument("--output", default="cascade_model.pkl")
+    parser.add_argument("--model", default="facebook/bart-large-mnli", help="Zero-shot model providing the labels")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of queries held out for evaluation")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    classifier = main_model.load_classifier(args.model)
+    queries, targets = label_queries(load_query_log(args.log), classifier, batch_size=args.batch_size)
+
+    pairs = list(zip(queries, targets))
+    random.Random(42).shuffle(pairs)
+    split = int(len(pairs) * (1 - args.holdout))
+    train, test = pairs[:split], pairs[split:]
+
+    if test:
+        model = train_small_model([q for q, _ in train], [t for _, t in train])
+        predicted = model.predict([q for q, _ in test])
+        corporate = set(main_model.CORPORATE_LABELS)
+        same_label = sum(p == t for p, (_, t) in zip(predicted, test))
+        same_decision = sum((p in corporate) == (t in corporate) for p, (_, t) in zip(predicted, test))
+        print(f"Holdout agreement with bart-large-mnli: decision {same_decision / len(test):.1%}, "
+              f"label {same_label / len(test):.1%} ({len(test)} queries)")
+
+    # The shipped model is trained on every labelled query
+    model = train_small_model(queries, targets)
+    with open(args.output, "wb") as f:
+        pickle.dump(model, f)
+    print(f"Saved cascade model trained on {len(queries)} queries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import csv
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Columns the authorization path needs; everything else in the CSV is skipped
+USER_COLUMNS = ("id", "first_name", "last_name", "dept", "ip_address", "join_date", "past_violations")
+
+
+def _month_index(year, month):
+    return year * 12 + month - 1
+
+
+def _parse_join_date(value):
+    """Parse a DD/MM/YYYY join date, returning None when it is missing or invalid."""
+    try:
+        day, month, year = value.split("/")
+        return date(int(year), int(month), int(day))
+    except (ValueError, AttributeError):
+        return None
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+class UserRecord:
+    """One employee, keeping only the fields the authorization path uses."""
+
+    __slots__ = ("id", "first_name", "last_name", "dept", "ip_address", "join_date", "join_month", "past_violations")
+
+    def __init__(self, id, first_name, last_name, dept, ip_address, join_date, past_violations):
+        self.id = id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.dept = dept
+        self.ip_address = ip_address
+        self.join_date = join_date
+        # Month index of the join date, so months employed is a subtraction per lookup
+        self.join_month = _month_index(join_date.year, join_date.month) if join_date else None
+        self.past_violations = past_violations
+
+    def to_dict(self, today=None):
+        """Return the record as a new dict, including months_employed as of `today`."""
+        today = today or datetime.now()
+        return {
+            "id": self.id,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "dept": self.dept,
+            "ip_address": self.ip_address,
+            "join_date": self.join_date,
+            "months_employed": (
+                _month_index(today.year, today.month) - self.join_month if self.join_month is not None else None
+            ),
+            "past_violations": self.past_violations,
+        }
+
+
+def load_user_records(path):
+    """Read the user CSV into a dict of UserRecord by id, parsing each field once."""
+    records = {}
+    # Department names repeat across users, so keep one string per department
+    departments = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        missing = [column for column in ("id", "dept") if column not in header]
+        if missing:
+            raise ValueError(f"User data {path} is missing columns {missing}")
+        positions = [header.index(column) if column in header else None for column in USER_COLUMNS]
+        for row in reader:
+            if not row:
+                continue
+            id_, first_name, last_name, dept, ip_address, join_date, past_violations = (
+                row[i] if i is not None and i < len(row) else "" for i in positions
+            )
+            try:
+                past_violations = int(float(past_violations)) if past_violations else 0
+            except ValueError:
+                past_violations = 0
+            user_id = _parse_id(id_)
+            records[user_id] = UserRecord(
+                user_id,
+                first_name,
+                last_name,
+                departments.setdefault(dept, sys.intern(dept)) if dept else None,
+                ip_address,
+                _parse_join_date(join_date),
+                past_violations,
+            )
+    return records
+
+
+class UserDirectory:
+    """In-memory user directory with an id index, reloaded when the CSV changes.
+
+    The file's modification time is checked at most every `check_interval`
+    seconds. A changed file is parsed into a new index that replaces the old
+    one in a single assignment, so lookups never see a partly loaded
+    directory. If the new file cannot be read, the previous index stays.
+
+    Args:
+        path (str): User CSV file (e.g. MOCK_DATA.csv)
+        check_interval (float): Minimum seconds between modification time checks
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._records = {}
+        self._columns = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Load the CSV, replacing the current index."""
+        with self._reload_lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            start = time.perf_counter()
+            records = load_user_records(self.path)
+            self._records = records
+            self._mtime = mtime
+            logger.info(f"Loaded {len(records)} users from {self.path} in {time.perf_counter() - start:.2f}s")
+
+    def _check_for_changes(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime != self._mtime:
+                # A file that fails to load is retried only once it changes again
+                self._mtime = mtime
+                self.reload()
+        except Exception as e:
+            logger.error(f"Error reloading user data from {self.path}, keeping the loaded directory: {e}")
+
+    def get_record(self, user_id):
+        """Return the UserRecord for an id (numeric strings match integer ids), or None."""
+        self._check_for_changes()
+        record = self._records.get(user_id)
+        if record is None and isinstance(user_id, str):
+            record = self._records.get(_parse_id(user_id))
+        return record
+
+    def columns(self):
+        """Return the directory as numpy arrays, one per field, for vectorized evaluation.
+
+        Built on first use after each (re)load. Integer ids are also given as
+        `id_int`, with -1 for ids that are not integers; missing join months
+        are -1.
+        """
+        self._check_for_changes()
+        records = self._records
+        cached = self._columns
+        if cached is not None and cached[0] is records:
+            return cached[1]
+        values = list(records.values())
+        ids = [record.id for record in values]
+        columns = {
+            "id": np.array(ids, dtype=object),
+            "id_int": np.fromiter((i if isinstance(i, int) else -1 for i in ids), dtype=np.int64, count=len(ids)),
+            "dept": np.array([record.dept for record in values], dtype=object),
+            "ip_address": np.array([record.ip_address for record in values], dtype=object),
+            "join_month": np.fromiter(
+                (-1 if record.join_month is None else record.join_month for record in values),
+                dtype=np.int32, count=len(values)
+            ),
+            "past_violations": np.fromiter(
+                (record.past_violations for record in values), dtype=np.int64, count=len(values)
+            ),
+        }
+        self._columns = (records, columns)
+        return columns
+
+    def get(self, user_id):
+        """Return a user's fields as a new dict (see UserRecord.to_dict), or None if unknown."""
+        record = self.get_record(user_id)
+        if record is None:
+            logger.warning(f"User with ID {user_id} not found")
+            return None
+        return record.to_dict()
+
+    def __len__(self):
+        return len(self._records)
@@ -0,0 +1,762 @@
+"""Random Forest access classifier used by /classify-request and classify_request.
+
+Every feature the forest sees is a small integer: the label-encoded role,
+department, status, resource type and sensitivity, past violations and
+months of tenure. The forest can therefore be compiled into a table holding
+its output for every combination of inputs, built once when the model loads,
+so a request becomes one indexed read instead of 100 tree traversals.
+Requests the table does not cover (a missing join date, a fractional value)
+still go to the forest, which can itself be compiled into flat NumPy arrays
+that give the label and probabilities in one walk of the trees.
+
+Requests are encoded by FeatureEncoder with plain dict lookups and cached
+date parsing, straight into the feature array the forest takes, so no
+DataFrame is built per request and a batch is scored as one matrix.
+
+`python access_model.py convert` turns the pickled forest and encoders into
+a model artifact: a directory of .npy arrays and a manifest.json holding the
+format version and a SHA-256 of every file. Artifacts load memory-mapped,
+without unpickling or importing scikit-learn, so every worker process on a
+machine reads the same pages from the page cache.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# The forest is scored on arrays already in its feature_names_in_ order (see FeatureEncoder), not DataFrames
+warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+
+MODEL_PATH = os.getenv("ACCESS_MODEL_PATH", "random_forest_model_new.pkl")
+ENCODERS_PATH = os.getenv("ACCESS_ENCODERS_PATH", "label_encoders.pkl")
+# "sklearn" runs the pickled forest, "compiled" the same trees flattened into NumPy arrays (CompiledForest)
+ACCESS_MODEL_ENGINE = os.getenv("ACCESS_MODEL_ENGINE", "sklearn")
+# Model artifact written by `python access_model.py convert`, loaded instead of the pickles (runs the compiled engine)
+ACCESS_MODEL_ARTIFACT_DIR = os.getenv("ACCESS_MODEL_ARTIFACT_DIR")
+# Also check every artifact file against the SHA-256 in its manifest when loading, rather than
+# only the manifest's format version (`python access_model.py verify` checks them at deploy time)
+VERIFY_ARTIFACT_CHECKSUMS = os.getenv("VERIFY_ARTIFACT_CHECKSUMS", "false").lower() == "true"
+# Answer requests from the precomputed decision table instead of running the forest
+USE_DECISION_TABLE = os.getenv("ACCESS_DECISION_TABLE", "false").lower() == "true"
+# Random inputs the table is checked against the forest on after it is built
+DECISION_TABLE_VALIDATION_SAMPLES = int(os.getenv("DECISION_TABLE_VALIDATION_SAMPLES", "5000"))
+
+# Bumped whenever the artifact layout changes; older artifacts must be converted again
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_MANIFEST = "manifest.json"
+
+CATEGORICAL_COLUMNS = ['user_role', 'department', 'employee_status', 'resource_type', 'resource_sensitivity']
+NUMERIC_COLUMNS = ['past_violations', 'time_spent_months']
+REQUIRED_FIELDS = CATEGORICAL_COLUMNS + ['employee_join_date', 'past_violations']
+
+# Zero-padded formats parsed without pandas, tried in the order pd.to_datetime reads them
+_JOIN_DATE_FORMATS = ("%Y-%m-%d", "%m-%d-%Y", "%d-%m-%Y")
+# First and last dates in pd.Timestamp's nanosecond range; join dates outside it count as missing
+_FIRST_TIMESTAMP_DATE = datetime(1677, 9, 22)
+_LAST_TIMESTAMP_DATE = datetime(2262, 4, 11)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_join_date(value):
+    if len(value) == 10:
+        for date_format in _JOIN_DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+            return parsed if _FIRST_TIMESTAMP_DATE <= parsed <= _LAST_TIMESTAMP_DATE else None
+    import pandas as pd
+    parsed = pd.to_datetime(value, errors='coerce')
+    if pd.isna(parsed):
+        return None
+    if parsed.tzinfo is not None:
+        raise ValueError(f"Invalid employee_join_date '{value}': expected a date without a time zone")
+    return parsed
+
+
+def months_since(join_date, now):
+    """Whole 30-day months from join_date to now, NaN if join_date is not a date, as in training."""
+    if isinstance(join_date, str):
+        parsed = _parse_join_date(join_date)
+    else:
+        import pandas as pd
+        parsed = pd.to_datetime(join_date, errors='coerce')
+        parsed = None if pd.isna(parsed) else parsed
+    return np.nan if parsed is None else (now - parsed).days // 30
+
+
+def unknown_category_error(unknown):
+    """Error message for the first of the unknown categories FeatureEncoder.encode reported."""
+    col, value = next(iter(unknown.items()))
+    return f"Unknown category '{value}' in column '{col}'"
+
+
+def model_feature_names(model):
+    """Feature order a RandomForestClassifier or CompiledForest was fitted on."""
+    if isinstance(model, CompiledForest):
+        return model.feature_names
+    return [str(name) for name in getattr(model, "feature_names_in_", CATEGORICAL_COLUMNS + NUMERIC_COLUMNS)]
+
+
+class FeatureEncoder:
+    """Turn request dicts into rows of the forest's encoded features without pandas.
+
+    Each LabelEncoder becomes a dict of category -> code, built once, and
+    tenure comes from a cached parse of the join date, so encoding a request
+    costs a few microseconds. Categories the encoders were not fitted on are
+    reported instead of encoded.
+
+    Args:
+        label_encoders (dict): Column -> fitted LabelEncoder
+        feature_names (list): Feature order of the model, see model_feature_names
+    """
+
+    def __init__(self, label_encoders, feature_names=None):
+        self.feature_names = list(feature_names or CATEGORICAL_COLUMNS + NUMERIC_COLUMNS)
+        self.categories = {
+            col: {category: code for code, category in enumerate(label_encoders[col].classes_.tolist())}
+            for col in CATEGORICAL_COLUMNS
+        }
+
+    def encode(self, user_data, now=None):
+        """Encoded features of one request, in feature_names order.
+
+        Returns:
+            tuple: (list of float, dict of column -> value for every unknown category)
+
+        Raises:
+            ValueError: If a required field is missing or past_violations is not a number
+        """
+        for field in REQUIRED_FIELDS:
+            if field not in user_data:
+                raise ValueError(f"Missing required field: {field}")
+        features = {}
+        unknown = {}
+        for col, codes in self.categories.items():
+            value = user_data[col]
+            try:
+                features[col] = codes[value]
+            except (KeyError, TypeError):
+                unknown[col] = value
+        past_violations = user_data['past_violations']
+        try:
+            features['past_violations'] = np.nan if past_violations is None else float(past_violations)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value '{past_violations}' in column 'past_violations'") from None
+        features['time_spent_months'] = months_since(user_data['employee_join_date'], now or datetime.now())
+        return [features.get(name, np.nan) for name in self.feature_names], unknown
+
+    def encode_many(self, records, now=None):
+        """Encode a batch of requests into one matrix.
+
+        Returns:
+            tuple: (float64 array of shape (len(records), features), list with None for
+            every encoded row and an error dict for every row that could not be encoded)
+        """
+        now = now or datetime.now()
+        features = np.full((len(records), len(self.feature_names)), np.nan)
+        errors = []
+        for index, user_data in enumerate(records):
+            try:
+                if not isinstance(user_data, dict):
+                    raise ValueError("Each request must be a JSON object")
+                row, unknown = self.encode(user_data, now)
+            except ValueError as e:
+                errors.append({"error": str(e)})
+                continue
+            if unknown:
+                errors.append({"error": unknown_category_error(unknown), "unknown_categories": unknown})
+                continue
+            features[index] = row
+            errors.append(None)
+        return features, errors
+
+
+class CompiledForest:
+    """A fitted RandomForestClassifier flattened into contiguous node arrays and evaluated with NumPy.
+
+    The nodes of all trees are concatenated and every tree is walked one
+    level per step for all rows of a batch at once, until each (row, tree)
+    reaches a leaf. One walk gives both the label and the class
+    probabilities, bit for bit what predict and predict_proba return:
+    features are compared as float32 like scikit-learn does, missing values
+    follow each node's missing_go_to_left, and the leaf probabilities are
+    summed in tree order.
+
+    The arrays are written as .npy files by save() and can be memory-mapped by load().
+    """
+
+    ARRAYS = ("roots", "feature", "threshold", "children", "missing_left", "value", "classes", "feature_names")
+
+    def __init__(self, roots, feature, threshold, children, missing_left, value, classes, feature_names):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_left = missing_left
+        self.value = value
+        self.classes = classes
+        self.feature_names = [str(name) for name in feature_names]
+        # Leaves are their own children
+        self._leaf = children[:, 0] == np.arange(len(children))
+        self._children = children.reshape(-1)
+
+    @classmethod
+    def from_forest(cls, forest):
+        roots, feature, threshold, children, missing_left, value = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            children.append(offset + np.column_stack([
+                np.where(leaf, nodes, tree.children_left), np.where(leaf, nodes, tree.children_right)
+            ]))
+            missing = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool))
+            # Normalized the way DecisionTreeClassifier.predict_proba does it
+            proba = tree.value[:, 0, :].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(proba / normalizer)
+            offset += tree.node_count
+        return cls(
+            roots=np.array(roots, dtype=np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            missing_left=np.concatenate(missing_left),
+            value=np.concatenate(value),
+            classes=np.asarray(forest.classes_),
+            feature_names=np.array(getattr(forest, "feature_names_in_", CATEGORICAL_COLUMNS + NUMERIC_COLUMNS), dtype=str),
+        )
+
+    def save(self, directory):
+        """Write each array to directory/<name>.npy."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), np.asarray(getattr(self, name)))
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Load arrays written by save(), memory-mapped read-only by default so processes share the pages."""
+        return cls(**{name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in cls.ARRAYS})
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ("roots", "feature", "threshold", "children", "missing_left", "value"))
+
+    def predict_proba(self, X):
+        """Class probabilities for a 2-D array of features in feature_names order."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        rows, trees = len(X), len(self.roots)
+        has_missing = bool(np.isnan(X).any())
+        flat = X.reshape(-1)
+        # One entry per (row, tree); only the entries not yet at a leaf are advanced
+        node = np.tile(self.roots, rows)
+        row_start = np.repeat(np.arange(rows, dtype=np.intp) * X.shape[1], trees)
+        active = np.flatnonzero(~self._leaf[node])
+        while active.size:
+            current = node[active]
+            x = flat[row_start[active] + self.feature[current]]
+            left = x <= self.threshold[current]
+            if has_missing:
+                left |= np.isnan(x) & self.missing_left[current]
+            node[active] = following = self._children[2 * current + ~left]
+            active = active[~self._leaf[following]]
+        # Summed one tree at a time like ForestClassifier.predict_proba, so the floats match exactly
+        return np.cumsum(self.value[node].reshape(rows, trees, -1), axis=1)[:, -1] / trees
+
+    def predict_with_proba(self, X):
+        """Labels and class probabilities of a 2-D array of features from one walk of the trees."""
+        proba = self.predict_proba(X)
+        return self.classes[np.argmax(proba, axis=1)], proba
+
+    def predict_row(self, features):
+        """Label and class probabilities for a mapping of feature name -> encoded value."""
+        labels, proba = self.predict_with_proba([[features[name] for name in self.feature_names]])
+        return labels[0], proba[0]
+
+
+class _Axis:
+    """Integer values of one feature, grouped into the ranges the forest cannot tell apart.
+
+    Two values fall in the same range when no split threshold of any tree lies
+    between them, so the forest gives them the same output. Numeric features
+    are clamped to [lo, hi], beyond which every threshold compares the same
+    way; categorical codes outside [0, levels) are not covered.
+    """
+
+    def __init__(self, thresholds, lo, hi, clamp):
+        self.lo, self.hi, self.clamp = lo, hi, clamp
+        values = np.arange(lo, hi + 1)
+        # The trees compare float32 features with `x <= threshold`
+        buckets = np.searchsorted(np.sort(thresholds), values.astype(np.float32), side="left")
+        _, first, self.column_of = np.unique(buckets, return_index=True, return_inverse=True)
+        self.column_of = self.column_of.astype(np.intp)
+        self.values = values[first]
+
+    def column(self, value):
+        """Column of a feature value, or None if the table does not cover it."""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        if not value.is_integer():
+            return None
+        value = int(value)
+        if value < self.lo or value > self.hi:
+            if not self.clamp:
+                return None
+            value = min(max(value, self.lo), self.hi)
+        return self.column_of[value - self.lo]
+
+
+class DecisionTable:
+    """The forest's prediction and class probabilities for every input it can be given.
+
+    Outputs are deduplicated: each cell holds the index of its row in
+    `probabilities` and `predictions`, in the smallest unsigned type that
+    fits, so the table stays a few MB and lookups return exactly what the
+    forest computes.
+
+    Args:
+        forest: Fitted RandomForestClassifier over CATEGORICAL_COLUMNS + NUMERIC_COLUMNS, or its CompiledForest
+        label_encoders (dict): Column -> fitted LabelEncoder, giving the number of categories
+    """
+
+    def __init__(self, forest, label_encoders):
+        started = time.perf_counter()
+        self.forest = forest
+        compiled = forest if isinstance(forest, CompiledForest) else CompiledForest.from_forest(forest)
+        self.feature_names = compiled.feature_names
+        self.classes = compiled.classes
+
+        self.axes = []
+        for index, name in enumerate(self.feature_names):
+            thresholds = np.unique(compiled.threshold[(compiled.feature == index) & ~compiled._leaf])
+            if name in label_encoders:
+                self.axes.append(_Axis(thresholds, 0, len(label_encoders[name].classes_) - 1, clamp=False))
+            elif len(thresholds):
+                lo = int(np.floor(thresholds.min()))
+                hi = int(np.floor(thresholds.max())) + 1
+                self.axes.append(_Axis(thresholds, lo, hi, clamp=True))
+            else:
+                # Never split on, so any value gives the same output
+                self.axes.append(_Axis(thresholds, 0, 0, clamp=True))
+
+        shape = tuple(len(axis.values) for axis in self.axes)
+        self.strides = np.array([int(np.prod(shape[i + 1:])) for i in range(len(shape))], dtype=np.intp)
+        probabilities = np.zeros(shape + (len(self.classes),))
+        # Each tree splits the grid into boxes, one per leaf: add every leaf's probabilities to its box,
+        # tree by tree like ForestClassifier.predict_proba sums them
+        values = [axis.values.astype(np.float32).astype(np.float64) for axis in self.axes]
+        for root in compiled.roots:
+            stack = [(root, tuple((0, size) for size in shape))]
+            while stack:
+                node, box = stack.pop()
+                if compiled._leaf[node]:
+                    probabilities[tuple(slice(lo, hi) for lo, hi in box)] += compiled.value[node]
+                    continue
+                feature = compiled.feature[node]
+                lo, hi = box[feature]
+                split = min(max(int(np.searchsorted(values[feature], compiled.threshold[node], side="right")), lo), hi)
+                left, right = compiled.children[node]
+                if split > lo:
+                    stack.append((left, box[:feature] + ((lo, split),) + box[feature + 1:]))
+                if split < hi:
+                    stack.append((right, box[:feature] + ((split, hi),) + box[feature + 1:]))
+        probabilities = probabilities.reshape(-1, len(self.classes)) / len(compiled.roots)
+        # Deduplicate the rows as opaque byte strings, much faster than np.unique(axis=0)
+        rows = probabilities.view(np.dtype((np.void, probabilities.itemsize * probabilities.shape[1]))).ravel()
+        distinct, codes = np.unique(rows, return_inverse=True)
+        self.probabilities = distinct.view(probabilities.dtype).reshape(-1, probabilities.shape[1])
+        self.codes = codes.reshape(-1).astype(np.min_scalar_type(len(self.probabilities) - 1))
+        # predict() is the class with the highest mean probability
+        self.predictions = self.classes[np.argmax(self.probabilities, axis=1)]
+
+        self.shape = shape
+        self.build_seconds = time.perf_counter() - started
+        self.validation = None
+        self._lock = threading.Lock()
+        self._counts = {"lookups": 0, "fallbacks": 0}
+
+    @property
+    def nbytes(self):
+        return (self.codes.nbytes + self.probabilities.nbytes + self.predictions.nbytes
+                + sum(axis.column_of.nbytes + axis.values.nbytes for axis in self.axes))
+
+    def lookup(self, features):
+        """Prediction and class probabilities for a mapping of feature name -> encoded value.
+
+        Returns None when an input is outside the table, so the caller runs the forest.
+        """
+        index = 0
+        for name, axis, stride in zip(self.feature_names, self.axes, self.strides):
+            column = axis.column(features[name])
+            if column is None:
+                with self._lock:
+                    self._counts["fallbacks"] += 1
+                return None
+            index += column * stride
+        code = self.codes[index]
+        with self._lock:
+            self._counts["lookups"] += 1
+        return self.predictions[code], self.probabilities[code]
+
+    def lookup_many(self, features):
+        """Vectorised lookup() of a 2-D array of features in feature_names order.
+
+        Returns:
+            tuple: (boolean mask of the rows the table covers, their predictions, their probabilities)
+        """
+        features = np.asarray(features, dtype=np.float64)
+        covered = np.ones(len(features), dtype=bool)
+        index = np.zeros(len(features), dtype=np.intp)
+        for values, axis, stride in zip(features.T, self.axes, self.strides):
+            integer = np.isfinite(values) & (values == np.floor(values))
+            values = np.clip(np.where(integer, values, axis.lo), axis.lo - 1, axis.hi + 1).astype(np.intp)
+            if not axis.clamp:
+                integer &= (values >= axis.lo) & (values <= axis.hi)
+            covered &= integer
+            index += axis.column_of[np.clip(values, axis.lo, axis.hi) - axis.lo] * stride
+        codes = self.codes[index[covered]]
+        with self._lock:
+            self._counts["lookups"] += int(covered.sum())
+            self._counts["fallbacks"] += int(len(covered) - covered.sum())
+        return covered, self.predictions[codes], self.probabilities[codes]
+
+    def validate(self, samples=DECISION_TABLE_VALIDATION_SAMPLES, seed=0):
+        """Compare the table with the forest on random integer inputs, including values beyond the clamped range.
+
+        Returns:
+            dict: Samples checked, how many differ from the forest and the largest probability difference
+        """
+        rng = np.random.default_rng(seed)
+        columns = []
+        for axis in self.axes:
+            if axis.clamp:
+                margin = max(axis.hi - axis.lo, 1)
+                columns.append(rng.integers(axis.lo - margin, axis.hi + margin + 1, samples))
+            else:
+                columns.append(rng.integers(axis.lo, axis.hi + 1, samples))
+        features = np.column_stack(columns)
+        expected = self.forest.predict_proba(features)
+        mismatches = 0
+        max_difference = 0.0
+        for row, forest_proba in zip(features, expected):
+            prediction, probability = self.lookup(dict(zip(self.feature_names, row)))
+            difference = float(np.max(np.abs(probability - forest_proba)))
+            max_difference = max(max_difference, difference)
+            mismatches += difference > 0 or prediction != self.classes[np.argmax(forest_proba)]
+        self.validation = {"samples": samples, "mismatches": int(mismatches), "max_difference": max_difference}
+        with self._lock:
+            self._counts = dict.fromkeys(self._counts, 0)
+        return self.validation
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "shape": dict(zip(self.feature_names, self.shape)),
+            "cells": int(self.codes.size),
+            "distinct_outputs": len(self.probabilities),
+            "build_seconds": self.build_seconds,
+            "memory_mb": self.nbytes / 1e6,
+            "validation": self.validation,
+            **counts,
+        }
+
+
+def build_decision_table(model, label_encoders, validation_samples=DECISION_TABLE_VALIDATION_SAMPLES):
+    """Build and validate the decision table, or return None (logging a warning) if it disagrees with the forest."""
+    table = DecisionTable(model, label_encoders)
+    if validation_samples:
+        validation = table.validate(validation_samples)
+        if validation["mismatches"]:
+            logger.warning(f"Decision table disagrees with the forest on {validation['mismatches']} of "
+                           f"{validation['samples']} inputs, using the forest")
+            return None
+    stats = table.stats()
+    logger.info(f"Built decision table: {stats['cells']} cells, {stats['distinct_outputs']} distinct outputs, "
+                f"{stats['memory_mb']:.1f} MB in {stats['build_seconds']:.2f}s")
+    return table
+
+
+def compile_forest(forest, validation_samples=DECISION_TABLE_VALIDATION_SAMPLES, seed=0):
+    """Compile the forest, or return None (logging a warning) if the compiled trees disagree with it.
+
+    The check runs both on random inputs spanning every split threshold, a
+    tenth of the values missing.
+    """
+    compiled = CompiledForest.from_forest(forest)
+    if validation_samples:
+        rng = np.random.default_rng(seed)
+        columns = []
+        for index in range(len(compiled.feature_names)):
+            thresholds = compiled.threshold[(compiled.feature == index) & ~compiled._leaf]
+            lo, hi = (int(np.floor(thresholds.min())) - 2, int(np.ceil(thresholds.max())) + 2) if len(thresholds) else (0, 1)
+            values = rng.integers(lo, hi + 1, validation_samples).astype(np.float64)
+            values[rng.random(validation_samples) < 0.1] = np.nan
+            columns.append(values)
+        features = np.column_stack(columns)
+        expected = forest.predict_proba(features)
+        if not np.array_equal(compiled.predict_proba(features), expected):
+            logger.warning(f"Compiled forest disagrees with {type(forest).__name__} on random inputs, using the forest")
+            return None
+    logger.info(f"Compiled forest: {len(compiled.roots)} trees, {len(compiled.feature)} nodes, {compiled.nbytes / 1e6:.1f} MB")
+    return compiled
+
+
+class ArtifactLabelEncoder:
+    """The classes of a fitted LabelEncoder, read from a model artifact without scikit-learn."""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+        self._codes = {category: code for code, category in enumerate(classes.tolist())}
+
+    def transform(self, values):
+        try:
+            return np.array([self._codes[value] for value in values], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e.args[0]!r}") from None
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_model_artifact(directory, compiled, label_encoders, source=None):
+    """Write a compiled forest and its label encoders as a model artifact.
+
+    Layout: forest/<array>.npy (CompiledForest.save), encoders/<column>.npy
+    holding each encoder's classes, and manifest.json, written last, with
+    the format version and the SHA-256 of every file.
+
+    Args:
+        directory (str): Artifact directory, created if needed
+        compiled (CompiledForest): The forest to write
+        label_encoders (dict): Column -> fitted LabelEncoder
+        source (dict): Where the artifact came from, recorded in the manifest
+    """
+    compiled.save(os.path.join(directory, "forest"))
+    files = [f"forest/{name}.npy" for name in CompiledForest.ARRAYS]
+    os.makedirs(os.path.join(directory, "encoders"), exist_ok=True)
+    for col, encoder in label_encoders.items():
+        # Stored as fixed-width strings so loading never needs pickle
+        np.save(os.path.join(directory, "encoders", f"{col}.npy"), np.asarray(encoder.classes_, dtype=str))
+        files.append(f"encoders/{col}.npy")
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "feature_names": list(compiled.feature_names),
+        "classes": compiled.classes.tolist(),
+        "trees": len(compiled.roots),
+        "nodes": len(compiled.feature),
+        "encoders": list(label_encoders),
+        "source": source or {},
+        "files": {name: _sha256(os.path.join(directory, name)) for name in files},
+    }
+    with open(os.path.join(directory, ARTIFACT_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_artifact_manifest(directory):
+    """Return the manifest of a model artifact after checking its format version.
+
+    Raises:
+        ValueError: If there is no readable manifest or it is of another format version
+    """
+    try:
+        with open(os.path.join(directory, ARTIFACT_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"No model artifact manifest in '{directory}': {e}") from None
+    version = manifest.get("format_version")
+    if version != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Model artifact in '{directory}' has format version {version}, expected "
+                         f"{ARTIFACT_FORMAT_VERSION}; run `python access_model.py convert` again")
+    return manifest
+
+
+def load_model_artifact(directory, verify=VERIFY_ARTIFACT_CHECKSUMS):
+    """Load a model artifact, the forest memory-mapped read-only so processes share its pages.
+
+    Returns:
+        tuple: (CompiledForest, dict of column -> ArtifactLabelEncoder, manifest)
+
+    Only the manifest and its format version are checked unless `verify` is
+    set, which also hashes every file against its manifest checksum.
+
+    Raises:
+        ValueError: If the manifest is missing, of another format version, or (with verify) a checksum does not match
+    """
+    manifest = read_artifact_manifest(directory)
+    if verify:
+        for name, checksum in manifest["files"].items():
+            if _sha256(os.path.join(directory, name)) != checksum:
+                raise ValueError(f"Checksum mismatch for '{name}' in model artifact '{directory}'")
+    model = CompiledForest.load(os.path.join(directory, "forest"))
+    label_encoders = {
+        col: ArtifactLabelEncoder(np.load(os.path.join(directory, "encoders", f"{col}.npy")))
+        for col in manifest["encoders"]
+    }
+    return model, label_encoders, manifest
+
+
+def convert_to_artifact(model_path, encoders_path, directory):
+    """Compile the pickled forest, check it against scikit-learn and write it with the encoders as an artifact.
+
+    Returns:
+        dict: The manifest written, or None if the compiled forest disagrees with the pickle
+    """
+    with open(model_path, 'rb') as model_file:
+        forest = pickle.load(model_file)
+    with open(encoders_path, 'rb') as encoders_file:
+        label_encoders = pickle.load(encoders_file)
+    compiled = compile_forest(forest)
+    if compiled is None:
+        return None
+    import sklearn
+    source = {
+        "model": os.path.basename(model_path),
+        "model_sha256": _sha256(model_path),
+        "encoders": os.path.basename(encoders_path),
+        "encoders_sha256": _sha256(encoders_path),
+        "sklearn_version": sklearn.__version__,
+    }
+    return save_model_artifact(directory, compiled, label_encoders, source)
+
+
+def load_access_model(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH, use_table=USE_DECISION_TABLE,
+                      engine=ACCESS_MODEL_ENGINE, artifact_dir=ACCESS_MODEL_ARTIFACT_DIR):
+    """Load the Random Forest and its label encoders, and build the decision table if enabled.
+
+    When artifact_dir holds a usable model artifact the forest is loaded from
+    it as a CompiledForest, whatever the engine. Otherwise the pickles are
+    loaded and, with engine="compiled", the forest is compiled.
+
+    Returns:
+        tuple: (RandomForestClassifier or CompiledForest, label_encoders, DecisionTable or None)
+    """
+    if engine not in ("sklearn", "compiled"):
+        raise ValueError(f"Unknown access model engine '{engine}', expected 'sklearn' or 'compiled'")
+
+    if artifact_dir:
+        try:
+            model, label_encoders, manifest = load_model_artifact(artifact_dir)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot load model artifact: {e}; loading the pickles")
+        else:
+            logger.info(f"Loaded model artifact '{artifact_dir}' (format {manifest['format_version']}, "
+                        f"created {manifest['created']})")
+            table = build_decision_table(model, label_encoders) if use_table else None
+            return model, label_encoders, table
+
+    with open(encoders_path, 'rb') as encoders_file:
+        label_encoders = pickle.load(encoders_file)
+    with open(model_path, 'rb') as model_file:
+        model = pickle.load(model_file)
+
+    if engine == "compiled":
+        model = compile_forest(model) or model
+    table = build_decision_table(model, label_encoders) if use_table else None
+    return model, label_encoders, table
+
+
+def predict_access(model, features, table=None):
+    """Prediction (0 or 1) and class probabilities for one row of encoded features in the model's feature order.
+
+    Uses the decision table when it covers the row, the forest otherwise.
+    """
+    if table is not None:
+        result = table.lookup(dict(zip(table.feature_names, features)))
+        if result is not None:
+            return result
+    if isinstance(model, CompiledForest):
+        labels, proba = model.predict_with_proba([features])
+        return labels[0], proba[0]
+    proba = model.predict_proba(np.asarray([features], dtype=np.float64))[0]
+    return model.classes_[np.argmax(proba)], proba
+
+
+def predict_access_batch(model, features, table=None):
+    """Predictions and class probabilities for a 2-D array of encoded features, scored together.
+
+    Rows the decision table covers are read from it; the rest go through the
+    forest in one call. The label is the class with the highest probability,
+    which is what RandomForestClassifier.predict returns.
+    """
+    features = np.asarray(features, dtype=np.float64)
+    classes = model.classes if isinstance(model, CompiledForest) else model.classes_
+    predictions = np.empty(len(features), dtype=np.asarray(classes).dtype)
+    probabilities = np.empty((len(features), len(classes)))
+    remaining = np.ones(len(features), dtype=bool)
+    if table is not None and len(features):
+        covered, table_predictions, table_probabilities = table.lookup_many(features)
+        predictions[covered] = table_predictions
+        probabilities[covered] = table_probabilities
+        remaining = ~covered
+    if remaining.any():
+        if isinstance(model, CompiledForest):
+            proba = model.predict_proba(features[remaining])
+        else:
+            proba = model.predict_proba(features[remaining])
+        predictions[remaining] = np.asarray(classes)[np.argmax(proba, axis=1)]
+        probabilities[remaining] = proba
+    return predictions, probabilities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Access model utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Write the pickled model and encoders as a model artifact")
+    convert_parser.add_argument("--model", default=MODEL_PATH)
+    convert_parser.add_argument("--encoders", default=ENCODERS_PATH)
+    convert_parser.add_argument("--output", default=ACCESS_MODEL_ARTIFACT_DIR or "access_model_artifact")
+
+    verify_parser = subparsers.add_parser("verify", help="Check a model artifact's format version and checksums")
+    verify_parser.add_argument("--artifact", default=ACCESS_MODEL_ARTIFACT_DIR or "access_model_artifact")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "convert":
+        manifest = convert_to_artifact(args.model, args.encoders, args.output)
+        if manifest is None:
+            raise SystemExit(1)
+        print(f"Wrote {args.output} ({len(manifest['files'])} files, format {manifest['format_version']})")
+    elif args.command == "verify":
+        try:
+            model, _, manifest = load_model_artifact(args.artifact, verify=True)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"{args.artifact}: format {manifest['format_version']}, {manifest['trees']} trees, "
+              f"{len(manifest['files'])} files verified")
+
+
+if __name__ == "__main__":
+    main()
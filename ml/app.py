@@ -6,11 +6,11 @@ import os
 import warnings
 import requests
 import tempfile
-import pickle
-import pandas as pd
+import numpy as np
 from datetime import datetime
 from all_embeddings_of_files import setup_embeddings, answer_query
 from decision_logic_access_control import unified_access_control_logic, load_users
+from access_model import predict_access, predict_access_batch, unknown_category_error
 from langchain_community.vectorstores import Chroma
 
 warnings.filterwarnings("ignore")
@@ -21,12 +21,11 @@ app = Flask(__name__)
 # Configure CORS with more specific options
 CORS(app)
 
-# Load the saved Random Forest model and label encoders
-with open('random_forest_model_new.pkl', 'rb') as model_file:
-    model = pickle.load(model_file)
+# Reuse the Random Forest, label encoders, decision table and feature encoder decision_logic_access_control loaded
+from decision_logic_access_control import model, label_encoders, decision_table, feature_encoder
 
-with open('label_encoders.pkl', 'rb') as encoders_file:
-    label_encoders = pickle.load(encoders_file)
+# Most requests accepted by one call to /classify-request/batch
+MAX_CLASSIFY_BATCH = int(os.getenv("MAX_CLASSIFY_BATCH", "10000"))
 
 
 chroma_db = None
@@ -145,6 +144,14 @@ def call_endpoint():
     result = make_call()
     return jsonify(result)
 
+def prediction_response(prediction, probability):
+    """Response body for one classified request."""
+    return {
+        "prediction": int(prediction),  # Numeric prediction (0 or 1)
+        "prediction_label": "Approved" if prediction == 1 else "Not Approved",  # Label ("Approved" or "Not Approved")
+        "probability": probability.tolist()  # Probabilities for each class
+    }
+
 @app.route('/classify-request', methods=['POST'])
 def classify_request():
     """
@@ -164,53 +171,64 @@ def classify_request():
         # Get user data from the request
         user_data = request.get_json()
 
-        # Validate required fields
-        required_fields = ['user_role', 'department', 'employee_status', 'resource_type', 
-                           'resource_sensitivity', 'employee_join_date', 'past_violations']
-        for field in required_fields:
-            if field not in user_data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-
-        # Convert to DataFrame
-        user_df = pd.DataFrame([user_data])
-
-        # Preprocess the data (use saved encoders for consistency)
-        categorical_cols = ['user_role', 'department', 'employee_status', 'resource_type', 'resource_sensitivity']
-        for col in categorical_cols:
-            le = label_encoders[col]
-            # Handle unseen categories
-            if user_df[col].iloc[0] not in le.classes_:
-                return jsonify({"error": f"Unknown category '{user_df[col].iloc[0]}' in column '{col}'"}), 400
-            user_df[col] = le.transform(user_df[col])
-
-        # Feature engineering: derive time spent in months
-        current_date = pd.to_datetime('today')
-        user_df['employee_join_date'] = pd.to_datetime(user_df['employee_join_date'], errors='coerce')
-        user_df['time_spent_months'] = (current_date - user_df['employee_join_date']).dt.days // 30
-
-        # Drop the original 'employee_join_date'
-        user_df.drop('employee_join_date', axis=1, inplace=True)
-
-        # Predict using the Random Forest model
-        prediction = model.predict(user_df)[0]  # Get the numeric prediction (0 or 1)
-        probability = model.predict_proba(user_df)[0]  # Get the probability for each class
-
-        # Map numeric prediction to label
-        prediction_label = "Approved" if prediction == 1 else "Not Approved"
-
-        # Prepare the response
-        response = {
-            "prediction": int(prediction),  # Numeric prediction (0 or 1)
-            "prediction_label": prediction_label,  # Label ("Approved" or "Not Approved")
-            "probability": probability.tolist()  # Probabilities for each class
-        }
+        # Encode the categories and derive time spent in months
+        try:
+            features, unknown = feature_encoder.encode(user_data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Handle unseen categories
+        if unknown:
+            return jsonify({"error": unknown_category_error(unknown)}), 400
 
-        return jsonify(response), 200
+        # Predict using the Random Forest model (or its precomputed decision table)
+        prediction, probability = predict_access(model, features, decision_table)  # Numeric prediction (0 or 1) and the probability for each class
+
+        return jsonify(prediction_response(prediction, probability)), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
 
+@app.route('/classify-request/batch', methods=['POST'])
+def classify_request_batch():
+    """
+    Endpoint to classify many user requests in one call, scored together as one matrix.
+    a sample request body would be:
+    {
+        "requests": [
+            {'user_role': 'Admin', 'department': 'IT', 'employee_status': 'Terminated', 'resource_type': 'doc',
+             'resource_sensitivity': 'restricted', 'employee_join_date': '02-04-2020', 'past_violations': 0},
+            ...
+        ]
+    }
+    Results are in the order of the requests. A request that cannot be
+    encoded gets an "error" instead of a prediction, and "unknown_categories"
+    lists every column whose value the model was not trained on.
+    """
+    data = request.get_json(silent=True)
+    records = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "'requests' must be a non-empty list of request objects"}), 400
+    if len(records) > MAX_CLASSIFY_BATCH:
+        return jsonify({"error": f"At most {MAX_CLASSIFY_BATCH} requests can be classified per call"}), 413
+
+    try:
+        features, errors = feature_encoder.encode_many(records)
+        encoded = np.array([error is None for error in errors])
+        predictions, probabilities = predict_access_batch(model, features[encoded], decision_table)
+
+        scored = zip(predictions, probabilities)
+        results = [error or prediction_response(*next(scored)) for error in errors]
+        return jsonify({
+            "results": results,
+            "classified": int(encoded.sum()),
+            "rejected": int(len(errors) - encoded.sum())
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 @app.route('/create-embeddings', methods=['POST'])
 def create_embeddings():
@@ -0,0 +1,303 @@
+"""Benchmarks for the access classifier.
+
+Run from this directory, for example:
+
+    python benchmarks.py table
+    python benchmarks.py table --model random_forest_model_new.pkl --requests 2000
+    python benchmarks.py forest --batch-size 10000
+    python benchmarks.py encoding --engine compiled
+    python benchmarks.py artifact
+"""
+import argparse
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from access_model import (CATEGORICAL_COLUMNS, ENCODERS_PATH, MODEL_PATH, CompiledForest, DecisionTable,
+                          FeatureEncoder, convert_to_artifact, load_access_model, load_model_artifact,
+                          model_feature_names, predict_access, predict_access_batch)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def encode_access_data(path, label_encoders):
+    """Encode the training CSV the way final_classification_model_training.py does, keeping rows with bad dates."""
+    data = pd.read_csv(path)
+    data = data[CATEGORICAL_COLUMNS + ['employee_join_date', 'past_violations']].dropna()
+    for col in CATEGORICAL_COLUMNS:
+        data[col] = label_encoders[col].transform(data[col])
+    join_date = pd.to_datetime(data.pop('employee_join_date'), errors='coerce')
+    data['time_spent_months'] = (pd.to_datetime('today') - join_date).dt.days // 30
+    return data.reset_index(drop=True)
+
+
+def benchmark_decision_table(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH, data_path="synthetic_access_data_10000.csv",
+                             requests=1000):
+    """Decision table build time, memory, agreement with the forest and per-request prediction latency.
+
+    Agreement is checked on every row of the access data set, through the
+    same encoding as the endpoint; rows the table does not cover (invalid
+    join dates) count as fallbacks to the forest. Latency is the prediction
+    step of one request, given its encoded features.
+    """
+    model, label_encoders, _ = load_access_model(model_path, encoders_path, use_table=False)
+
+    print("\n===== DECISION TABLE BENCHMARK =====")
+    tracemalloc.start()
+    table = DecisionTable(model, label_encoders)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = table.stats()
+    print(f"Shape: {stats['shape']}")
+    print(f"Build: {stats['build_seconds']:.2f}s, peak {peak / 1e6:.0f} MB while building")
+    print(f"Table: {stats['cells']} cells, {stats['distinct_outputs']} distinct outputs, {stats['memory_mb']:.2f} MB")
+
+    validation = table.validate()
+    print(f"Random inputs: {validation['mismatches']} of {validation['samples']} differ from the forest "
+          f"(max probability difference {validation['max_difference']:.2g})")
+
+    data = encode_access_data(data_path, label_encoders)
+    expected = model.predict_proba(data[table.feature_names])
+    mismatches = fallbacks = 0
+    for row, forest_proba in zip(data.to_dict("records"), expected):
+        result = table.lookup(row)
+        if result is None:
+            fallbacks += 1
+        elif not np.array_equal(result[1], forest_proba):
+            mismatches += 1
+    print(f"Access data: {mismatches} of {len(data)} rows differ from the forest, {fallbacks} fall back to it")
+
+    features = data[table.feature_names].to_numpy(dtype=np.float64)
+    rows = [features[i % len(features)] for i in range(requests)]
+    for name, decision_table in (("forest", None), ("decision table", table)):
+        latencies = []
+        for row in rows:
+            start = time.perf_counter()
+            predict_access(model, row, decision_table)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"{name:16s} mean={statistics.mean(latencies):8.3f}ms  p50={_percentile(latencies, 50):8.3f}ms  "
+              f"p99={_percentile(latencies, 99):8.3f}ms")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def _timed(function, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def benchmark_compiled_forest(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH,
+                              data_path="synthetic_access_data_10000.csv", requests=1000, batch_size=10000, repeats=5):
+    """Compiled forest against scikit-learn: parity, load time, single-row latency and batch throughput.
+
+    The scikit-learn DataFrame row is what the endpoint used to do, predict
+    then predict_proba on a DataFrame; the array row is predict_access with
+    the sklearn engine, one predict_proba on an array; the compiled side gets
+    label and probabilities from one walk. Rows come from the access data set,
+    including those whose invalid join date leaves tenure missing.
+    """
+    with open(model_path, 'rb') as model_file:
+        forest = pickle.load(model_file)
+    with open(encoders_path, 'rb') as encoders_file:
+        label_encoders = pickle.load(encoders_file)
+    compiled = CompiledForest.from_forest(forest)
+    data = encode_access_data(data_path, label_encoders)[compiled.feature_names]
+    features = data.to_numpy(dtype=np.float64)
+
+    print("\n===== COMPILED FOREST BENCHMARK =====")
+    print(f"{len(compiled.roots)} trees, {len(compiled.feature)} nodes, {compiled.nbytes / 1e6:.1f} MB of node arrays")
+
+    labels, proba = compiled.predict_with_proba(features)
+    same_proba = np.array_equal(proba, forest.predict_proba(data))
+    same_labels = np.array_equal(labels, forest.predict(data))
+    print(f"Access data ({len(data)} rows): probabilities identical {same_proba}, labels identical {same_labels}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        compiled.save(directory)
+        pickle_ms = _timed(lambda: pickle.load(open(model_path, 'rb')), repeats)
+        mmap_ms = _timed(lambda: CompiledForest.load(directory), repeats)
+        print(f"Load: pickle {statistics.median(pickle_ms):8.2f}ms  memory-mapped arrays {statistics.median(mmap_ms):8.2f}ms")
+
+    rows = [data.iloc[[i % len(data)]] for i in range(requests)]
+    sklearn_ms = [_timed(lambda: (forest.predict(row)[0], forest.predict_proba(row)[0]), 1)[0] for row in rows]
+    array_ms = [_timed(lambda: predict_access(forest, row.to_numpy(dtype=np.float64)[0]), 1)[0] for row in rows]
+    compiled_ms = [_timed(lambda: compiled.predict_row(row.iloc[0]), 1)[0] for row in rows]
+    for name, latencies in (("sklearn frame", sklearn_ms), ("sklearn array", array_ms), ("compiled", compiled_ms)):
+        print(f"single row {name:13s} p50={_percentile(latencies, 50):8.3f}ms  p99={_percentile(latencies, 99):8.3f}ms")
+
+    batch = data.iloc[np.arange(batch_size) % len(data)]
+    batch_features = batch.to_numpy(dtype=np.float64)
+    sklearn_ms = _timed(lambda: (forest.predict(batch), forest.predict_proba(batch)), repeats)
+    compiled_ms = _timed(lambda: compiled.predict_with_proba(batch_features), repeats)
+    for name, latencies in (("scikit-learn", sklearn_ms), ("compiled", compiled_ms)):
+        seconds = statistics.median(latencies) / 1000
+        print(f"batch of {batch_size} {name:13s} {seconds * 1000:8.1f}ms  {batch_size / seconds:10.0f} rows/s")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def _encode_with_dataframe(user_data, label_encoders):
+    """How /classify-request encoded a request before FeatureEncoder: a one-row DataFrame per request."""
+    user_df = pd.DataFrame([user_data])
+    for col in CATEGORICAL_COLUMNS:
+        user_df[col] = label_encoders[col].transform(user_df[col])
+    current_date = pd.to_datetime('today')
+    user_df['employee_join_date'] = pd.to_datetime(user_df['employee_join_date'], errors='coerce')
+    user_df['time_spent_months'] = (current_date - user_df['employee_join_date']).dt.days // 30
+    return user_df.drop('employee_join_date', axis=1)
+
+
+def benchmark_encoding(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH, data_path="synthetic_access_data_10000.csv",
+                       requests=1000, batch_size=1000, engine="sklearn", use_table=False, repeats=5):
+    """Request encoding with FeatureEncoder against the per-request DataFrame, and batch against one-by-one scoring.
+
+    Parity is checked on every row of the access data set, raw request
+    fields in. Single-request latency is encoding alone; the batch compares
+    encode_many plus predict_access_batch with encoding and predicting each
+    request of the batch on its own.
+    """
+    model, label_encoders, table = load_access_model(model_path, encoders_path, use_table=use_table, engine=engine)
+    feature_names = model_feature_names(model)
+    encoder = FeatureEncoder(label_encoders, feature_names)
+    records = pd.read_csv(data_path)[CATEGORICAL_COLUMNS + ['employee_join_date', 'past_violations']].dropna()
+    records = records.to_dict("records")
+
+    print("\n===== REQUEST ENCODING BENCHMARK =====")
+    print(f"Engine: {type(model).__name__}, decision table {'on' if table is not None else 'off'}")
+
+    features, errors = encoder.encode_many(records)
+    expected = encode_access_data(data_path, label_encoders)[feature_names].to_numpy(dtype=np.float64)
+    same = np.array_equal(features, expected, equal_nan=True)
+    print(f"Access data ({len(records)} rows): features identical to the DataFrame encoding {same}, "
+          f"{sum(error is not None for error in errors)} rows rejected")
+
+    sample = [records[i % len(records)] for i in range(requests)]
+    dataframe_ms = [_timed(lambda: _encode_with_dataframe(user_data, label_encoders), 1)[0] for user_data in sample]
+    encoder_ms = [_timed(lambda: encoder.encode(user_data), 1)[0] for user_data in sample]
+    for name, latencies in (("DataFrame", dataframe_ms), ("FeatureEncoder", encoder_ms)):
+        print(f"encode one request {name:15s} p50={_percentile(latencies, 50):8.3f}ms  p99={_percentile(latencies, 99):8.3f}ms")
+
+    batch = [records[i % len(records)] for i in range(batch_size)]
+
+    def one_by_one():
+        for user_data in batch:
+            predict_access(model, encoder.encode(user_data)[0], table)
+
+    def together():
+        batch_features, _ = encoder.encode_many(batch)
+        predict_access_batch(model, batch_features, table)
+
+    for name, function in (("one by one", one_by_one), ("batch", together)):
+        seconds = statistics.median(_timed(function, repeats)) / 1000
+        print(f"score {batch_size} requests {name:11s} {seconds * 1000:9.1f}ms  {batch_size / seconds:10.0f} requests/s")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+# Loads the access model in a fresh interpreter and prints how long that took, imports included
+_COLD_LOAD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import access_model
+access_model.load_access_model(*sys.argv[1:3], use_table=False, engine=sys.argv[3], artifact_dir=sys.argv[4] or None)
+print(json.dumps({"seconds": time.perf_counter() - started, "sklearn_imported": "sklearn" in sys.modules,
+                  "pandas_imported": "pandas" in sys.modules}))
+"""
+
+
+def _cold_load(model_path, encoders_path, engine, artifact_dir, repeats):
+    results = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _COLD_LOAD_SCRIPT, model_path, encoders_path, engine, artifact_dir or ""],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return statistics.median(result["seconds"] for result in results), results[-1]
+
+
+def benchmark_artifact(model_path=MODEL_PATH, encoders_path=ENCODERS_PATH, repeats=5):
+    """Model artifact against the pickles: conversion, load time in a fresh process and in-process.
+
+    Cold loads run load_access_model in a new interpreter, imports included,
+    as a freshly started worker would.
+    """
+    print("\n===== MODEL ARTIFACT BENCHMARK =====")
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        manifest = convert_to_artifact(model_path, encoders_path, directory)
+        print(f"Convert: {time.perf_counter() - start:.2f}s, {len(manifest['files'])} files, "
+              f"{sum(os.path.getsize(os.path.join(directory, name)) for name in manifest['files']) / 1e6:.1f} MB")
+
+        for name, engine, artifact_dir in (("pickles", "sklearn", None), ("pickles, compiled", "compiled", None),
+                                           ("artifact", "compiled", directory)):
+            seconds, imported = _cold_load(model_path, encoders_path, engine, artifact_dir, repeats)
+            print(f"cold load {name:18s} {seconds * 1000:8.1f}ms  scikit-learn imported: {imported['sklearn_imported']}"
+                  f"  pandas imported: {imported['pandas_imported']}")
+
+        for name, verify in (("checksums verified", True), ("checksums skipped", False)):
+            latencies = _timed(lambda: load_model_artifact(directory, verify=verify), repeats)
+            print(f"in-process artifact load, {name:18s} {statistics.median(latencies):8.2f}ms")
+
+    print("\n===== END OF BENCHMARK =====")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Access classifier benchmarks")
+    parser.add_argument("--model", default=MODEL_PATH, help="Pickled RandomForestClassifier")
+    parser.add_argument("--encoders", default=ENCODERS_PATH, help="Pickled label encoders")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    table = subparsers.add_parser("table", help="Decision table build time, memory, parity and latency vs the forest")
+    table.add_argument("--data", default="synthetic_access_data_10000.csv")
+    table.add_argument("--requests", type=int, default=1000)
+
+    forest = subparsers.add_parser("forest", help="Compiled forest vs scikit-learn: single-row latency and batch throughput")
+    forest.add_argument("--data", default="synthetic_access_data_10000.csv")
+    forest.add_argument("--requests", type=int, default=1000)
+    forest.add_argument("--batch-size", type=int, default=10000)
+    forest.add_argument("--repeats", type=int, default=5)
+
+    encoding = subparsers.add_parser("encoding", help="FeatureEncoder vs per-request DataFrames, batch vs one-by-one scoring")
+    encoding.add_argument("--data", default="synthetic_access_data_10000.csv")
+    encoding.add_argument("--requests", type=int, default=1000)
+    encoding.add_argument("--batch-size", type=int, default=1000)
+    encoding.add_argument("--engine", choices=("sklearn", "compiled"), default="sklearn")
+    encoding.add_argument("--decision-table", action="store_true")
+    encoding.add_argument("--repeats", type=int, default=3)
+
+    artifact = subparsers.add_parser("artifact", help="Model artifact vs pickles: cold and in-process load time")
+    artifact.add_argument("--repeats", type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "table":
+        benchmark_decision_table(args.model, args.encoders, args.data, requests=args.requests)
+    elif args.benchmark == "forest":
+        benchmark_compiled_forest(args.model, args.encoders, args.data, requests=args.requests,
+                                  batch_size=args.batch_size, repeats=args.repeats)
+    elif args.benchmark == "encoding":
+        benchmark_encoding(args.model, args.encoders, args.data, requests=args.requests, batch_size=args.batch_size,
+                           engine=args.engine, use_table=args.decision_table, repeats=args.repeats)
+    elif args.benchmark == "artifact":
+        benchmark_artifact(args.model, args.encoders, repeats=args.repeats)
+
+
+if __name__ == "__main__":
+    main()
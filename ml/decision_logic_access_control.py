@@ -1,14 +1,11 @@
-import pandas as pd
-import pickle
 from datetime import datetime
 import json
+from access_model import FeatureEncoder, load_access_model, model_feature_names, predict_access, unknown_category_error
 
-# Load the saved Random Forest model and label encoders
-with open('random_forest_model_new.pkl', 'rb') as model_file:
-    model = pickle.load(model_file)
-
-with open('label_encoders.pkl', 'rb') as encoders_file:
-    label_encoders = pickle.load(encoders_file)
+# Load the saved Random Forest model and label encoders (and the decision table if ACCESS_DECISION_TABLE is set)
+model, label_encoders, decision_table = load_access_model()
+# Label encoders as dict lookups, encoding requests in the model's feature order
+feature_encoder = FeatureEncoder(label_encoders, model_feature_names(model))
 
 def classify_request(user_data, user_query):
     """
@@ -22,36 +19,15 @@ def classify_request(user_data, user_query):
         dict: A dictionary containing the prediction, prediction label, and probabilities.
     """
     try:
-        # Validate required fields
-        required_fields = ['user_role', 'department', 'employee_status', 'resource_type', 
-                           'resource_sensitivity', 'employee_join_date', 'past_violations']
-        for field in required_fields:
-            if field not in user_data:
-                raise ValueError(f"Missing required field: {field}")
-
-        # Convert to DataFrame
-        user_df = pd.DataFrame([user_data])
-
-        # Preprocess the data (use saved encoders for consistency)
-        categorical_cols = ['user_role', 'department', 'employee_status', 'resource_type', 'resource_sensitivity']
-        for col in categorical_cols:
-            le = label_encoders[col]
-            # Handle unseen categories
-            if user_df[col].iloc[0] not in le.classes_:
-                raise ValueError(f"Unknown category '{user_df[col].iloc[0]}' in column '{col}'")
-            user_df[col] = le.transform(user_df[col])
-
-        # Feature engineering: derive time spent in months
-        current_date = pd.to_datetime('today')
-        user_df['employee_join_date'] = pd.to_datetime(user_df['employee_join_date'], errors='coerce')
-        user_df['time_spent_months'] = (current_date - user_df['employee_join_date']).dt.days // 30
-
-        # Drop the original 'employee_join_date'
-        user_df.drop('employee_join_date', axis=1, inplace=True)
-
-        # Predict using the Random Forest model
-        prediction = model.predict(user_df)[0]  # Get the numeric prediction (0 or 1)
-        probability = model.predict_proba(user_df)[0]  # Get the probability for each class
+        # Encode the categories and derive time spent in months (raises on missing fields)
+        features, unknown = feature_encoder.encode(user_data)
+
+        # Handle unseen categories
+        if unknown:
+            raise ValueError(unknown_category_error(unknown))
+
+        # Predict using the Random Forest model (or its precomputed decision table)
+        prediction, probability = predict_access(model, features, decision_table)  # Numeric prediction (0 or 1) and the probability for each class
 
         # Map numeric prediction to label
         prediction_label = "Approved" if prediction == 1 else "Not Approved"